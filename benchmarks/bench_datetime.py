@@ -0,0 +1,96 @@
+"""
+Compares the cached HL7Datetime parsing with the previous implementation,
+which matched an uncompiled pattern and built a new datetime and timezone
+for every value. Two workloads are measured: the timestamps of an ORU^R01
+feed, where every OBX segment repeats a few timestamps, and unique
+timestamps, more than the cache holds, which always miss the cache.
+
+    python benchmarks/bench_datetime.py
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from hl7parser.hl7 import get_delimiters  # noqa: E402
+from hl7parser.hl7_data_types import HL7Datetime  # noqa: E402
+
+DELIMITERS = get_delimiters()
+
+# 50 messages with an OBR and 20 OBX timestamps each
+FEED = [
+    "2024010{0}{1:02d}3000+0100".format(1 + message % 5, 8 + message % 10)
+    for message in range(50)
+    for _ in range(21)
+]
+UNIQUE = [
+    "2024{0:02d}{1:02d}{2:02d}{3:02d}{4:02d}.{5:04d}+0100".format(
+        1 + i % 12, 1 + i % 28, i % 24, i % 60, (i // 60) % 60, i)
+    for i in range(5000)
+]
+
+
+def legacy(composite, delimiters, use_delimiter="component_separator"):
+    """ HL7Datetime.__init__ before the cache was added """
+    delimiter = getattr(delimiters, use_delimiter)
+    composite = composite.split(delimiter)
+    composite = composite[0]
+
+    m = re.match(r'(?P<base>\d+)(?P<microseconds>\.\d+)?(?P<timezone>[+-]\d+)?', composite)
+    if not m:
+        return None
+
+    precision = len(m.group('base'))
+    if m.group('microseconds'):
+        precision += len(m.group('microseconds')) - 1
+    year = int(composite[0:4])
+    month = int(composite[4:6]) if precision >= 6 else 1
+    day = int(composite[6:8]) if precision >= 8 else 1
+    hour = int(composite[8:10]) if precision >= 10 else 0
+    minute = int(composite[10:12]) if precision >= 12 else 0
+    second = int(composite[12:14]) if precision >= 14 else 0
+
+    microseconds = 0
+    tzinfo = None
+    if m.group("microseconds"):
+        microseconds = int(float(m.group("microseconds")) * 1_000_000)
+    if m.group("timezone"):
+        tz = m.group("timezone")
+        sign = -1 if tz[0] == "-" else 1
+        tzinfo = timezone(sign * timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])))
+
+    return datetime(year, month, day, hour, minute, second, microseconds, tzinfo)
+
+
+IMPLEMENTATIONS = {
+    "previous": legacy,
+    "cached": HL7Datetime,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, values in (("ORU feed", FEED), ("unique values", UNIQUE)):
+        rates = {}
+        for implementation, function in IMPLEMENTATIONS.items():
+            def run():
+                for value in values:
+                    function(value, DELIMITERS)
+            best = min(timeit.repeat(run, number=5, repeat=args.repeat))
+            rates[implementation] = 5 * len(values) / best
+        print(name)
+        for implementation, rate in rates.items():
+            print("  {0:10s}{1:12.0f} values/s  speedup {2:6.1f}".format(
+                implementation, rate, rate / rates["previous"]))
+
+
+if __name__ == "__main__":
+    main()
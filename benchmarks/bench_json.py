@@ -0,0 +1,92 @@
+"""
+Compares `to_json` with a naive recursive walk of the parsed message.
+
+The naive walk visits the segments, the named fields of their `field_map`
+and the `input_fields` of generic data types with `getattr`, like exporters
+built on top of the object model do. Both are measured on parsed messages
+and from raw messages (parsing included).
+
+    python benchmarks/bench_json.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import corpus  # noqa: E402
+from hl7parser.hl7 import HL7Message  # noqa: E402
+from hl7parser.hl7_data_types import HL7Datetime, HL7RepeatingField  # noqa: E402
+from hl7parser.hl7_json import to_json  # noqa: E402
+
+
+def walk(value):
+    if isinstance(value, HL7RepeatingField):
+        return [walk(repetition) for repetition in value]
+    if isinstance(value, HL7Datetime):
+        return value.isoformat() or None
+    if value.field_map:
+        result = {}
+        for name, _ in value.field_map:
+            component = getattr(value, name)
+            if component is not None:
+                converted = walk(component)
+                if converted:
+                    result[name] = converted
+        return result
+    if hasattr(value, "value"):
+        return str(value.value)
+    return [walk(component) for component in value.input_fields]
+
+
+def naive_json(message):
+    result = {}
+    for segment_type, segment in message.segments:
+        names = {index: name for name, index in segment.named_fields.items()}
+        fields = {}
+        for index in range(len(segment)):
+            converted = walk(segment[index])
+            if converted:
+                fields[names.get(index, str(index + 1))] = converted
+        result.setdefault(segment_type, []).append(fields)
+    return json.dumps(result)
+
+
+def best(function, argument, repeat, min_time=0.2):
+    """ returns the best number of calls per second """
+    rates = []
+    for _ in range(repeat):
+        count = 0
+        start = time.perf_counter()
+        while True:
+            function(argument)
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        rates.append(count / elapsed)
+    return max(rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{0:18} {1:>12} {2:>12} {3:>8} {4:>12} {5:>12} {6:>8}".format(
+        "message", "naive", "to_json", "speedup", "raw naive", "raw to_json", "speedup"))
+    for name, raw in corpus.load().items():
+        # separate messages, the naive walk parses all fields
+        naive = best(naive_json, HL7Message(raw), args.repeat)
+        fast = best(to_json, HL7Message(raw), args.repeat)
+        raw_naive = best(lambda raw: naive_json(HL7Message(raw)), raw, args.repeat)
+        raw_fast = best(to_json, raw, args.repeat)
+        print("{0:18} {1:10.0f}/s {2:10.0f}/s {3:7.1f}x {4:10.0f}/s {5:10.0f}/s {6:7.1f}x".format(
+            name, naive, fast, fast / naive, raw_naive, raw_fast, raw_fast / raw_naive))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures the scaling of `parse_many` with the number of worker processes.
+
+Every message is fully parsed in the workers and all of its fields are
+converted to strings, only the number of fields is sent back. This is
+compared with a loop doing the same work in a single process.
+
+    python benchmarks/bench_parse_many.py --messages 20000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from hl7parser.hl7 import HL7Message  # noqa: E402
+from hl7parser.hl7_parallel import parse_many  # noqa: E402
+
+HEADER = (
+    "MSH|^~\\&|LAB|FACILITY|RECEIVER|FACILITY|20240101120000||ORU^R01^ORU_R01|{0}|P|2.5\r"
+    "PID|1||{0}^^^HOSP^MR||DOE^JANE^Q||19700101|F|||1 MAIN ST^^SPRINGFIELD^IL^62701\r"
+    "PV1|1|I|W^389^1^UABH||||12345^MORGAN^REX^J|||MED||||A0\r"
+    "OBR|1|{0}|{0}|CBC^Blood count|||20240101113000"
+)
+OBX = "OBX|{0}|NM|GLU^Glucose^LN||{1}|mg/dl|70-110|N|||F|||20240101113000"
+
+
+def make_message(number, observations=20):
+    segments = [HEADER.format(number)]
+    segments.extend(OBX.format(i + 1, 80 + i) for i in range(observations))
+    return "\r".join(segments)
+
+
+def count_fields(message):
+    count = 0
+    for _, segment in message.segments:
+        for index in range(len(segment)):
+            str(segment[index])
+            count += 1
+    return count
+
+
+def run(raw, baseline, args):
+    print("single process {0:10.0f} messages/s".format(baseline))
+    for workers in args.workers:
+        start = time.perf_counter()
+        for _ in parse_many(raw, count_fields, workers=workers, chunksize=args.chunksize):
+            pass
+        rate = args.messages / (time.perf_counter() - start)
+        print("{0:2d} worker(s)    {1:10.0f} messages/s  speedup {2:5.2f}".format(
+            workers, rate, rate / baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--chunksize", type=int, default=64)
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    raw = [make_message(i) for i in range(args.messages)]
+
+    start = time.perf_counter()
+    for message in raw:
+        count_fields(HL7Message(message))
+    baseline = args.messages / (time.perf_counter() - start)
+    run(raw, baseline, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares pickling messages as their raw text with pickling the whole object
+graph of the parsed message (segments, data types and delimiters), which is
+what the default pickling of objects with `__slots__` does.
+
+Sizes and round trips (dumps and loads) are measured for eagerly parsed
+messages.
+
+    python benchmarks/bench_pickle.py --repeat 5
+"""
+
+import argparse
+import copyreg
+import io
+import os
+import pickle
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import corpus  # noqa: E402
+from hl7parser.hl7 import HL7Delimiters, HL7Message, HL7Segment  # noqa: E402
+from hl7parser.hl7_data_types import (  # noqa: E402
+    HL7DataType, HL7RepeatingField, HL7Schema, compile_schema)
+
+
+def _restore(obj, slots):
+    for name, value in slots.items():
+        object.__setattr__(obj, name, value)
+
+
+class GraphPickler(pickle.Pickler):
+    """ pickles the slots of all objects of the message """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, HL7Schema):
+            return (compile_schema, (obj.definitions,))
+        if not isinstance(
+                obj, (HL7Message, HL7Segment, HL7DataType, HL7RepeatingField, HL7Delimiters)):
+            return NotImplemented
+        state = dict(getattr(obj, "__dict__", {}))
+        state.update(
+            (name, getattr(obj, name))
+            for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ())
+            if hasattr(obj, name)
+        )
+        return (copyreg.__newobj__, (type(obj),), state, None, None, _restore)
+
+
+def graph_dumps(message):
+    fp = io.BytesIO()
+    GraphPickler(fp, pickle.HIGHEST_PROTOCOL).dump(message)
+    return fp.getvalue()
+
+
+def compact_dumps(message):
+    return pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("{0:18} {1:>10} {2:>10} {3:>12} {4:>12} {5:>8}".format(
+        "message", "compact", "graph", "compact", "graph", "speedup"))
+    for name, raw in corpus.load().items():
+        message = HL7Message(raw)
+        times = {}
+        for method, dumps in (("compact", compact_dumps), ("graph", graph_dumps)):
+            times[method] = min(timeit.repeat(
+                lambda: pickle.loads(dumps(message)), number=20, repeat=args.repeat)) / 20
+        print("{0:18} {1:10d} {2:10d} {3:10.0f}us {4:10.0f}us {5:7.1f}x".format(
+            name, len(compact_dumps(message)), len(graph_dumps(message)),
+            times["compact"] * 1e6, times["graph"] * 1e6, times["graph"] / times["compact"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures the throughput of `HL7Pipeline` with the number of worker threads.
+
+The handler waits `--latency` milliseconds for every message, like a handler
+writing to a database. Events of the patients are randomly interleaved and
+the order per patient is checked after every run.
+
+    python benchmarks/bench_pipeline.py --patients 1000 --latency 1 --workers 1 8 32
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from hl7parser.hl7_pipeline import HL7Pipeline  # noqa: E402
+
+MESSAGE = (
+    "MSH|^~\\&|ADT|HOSP|LAB|HOSP|20240101120000||ADT^{0}|{1}|P|2.5\r"
+    "EVN|{0}|20240101120000\r"
+    "PID|1||P{2}^^^HOSP^MR||DOE^JANE^Q||19700101|F\r"
+    "PV1|1|I|W^389^1^UABH||||12345^MORGAN^REX^J|||MED||||A0"
+)
+EVENTS = ["A01", "A08", "A03"]
+
+
+def make_messages(patients):
+    remaining = {patient: list(EVENTS) for patient in range(patients)}
+    rng = random.Random(0)
+    messages = []
+    while remaining:
+        patient = rng.choice(list(remaining))
+        event = remaining[patient].pop(0)
+        if not remaining[patient]:
+            del remaining[patient]
+        messages.append(MESSAGE.format(event, len(messages), patient))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=1.0, help="milliseconds")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    raw = make_messages(args.patients)
+    latency = args.latency / 1000
+
+    for workers in args.workers:
+        events = {}
+        lock = threading.Lock()
+
+        def handler(message):
+            time.sleep(latency)
+            patient = str(message.pid.patient_identifier_list[0].id_number)
+            with lock:
+                events.setdefault(patient, []).append(str(message.evn[0]))
+
+        start = time.perf_counter()
+        with HL7Pipeline(handler, workers=workers, lazy=True) as pipeline:
+            for message in raw:
+                pipeline.submit(message)
+        rate = len(raw) / (time.perf_counter() - start)
+        ordered = all(value == EVENTS for value in events.values())
+        print("{0:3d} worker(s)  {1:10.0f} messages/s  ordered: {2}".format(
+            workers, rate, ordered))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compares full, lazy and projection parsing of a typical ADT^A01 and an
+ORU^R01 with 200 OBX segments. In every run MSH-9, MSH-10, PID-3 and PV1-19
+are read from the parsed message.
+
+    python benchmarks/bench_projection.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from corpus import ADT_A01, ORU_R01_LARGE as ORU_R01  # noqa: E402
+from hl7parser.hl7 import HL7Message  # noqa: E402
+
+FIELDS = ["MSH-9", "MSH-10", "PID-3", "PV1-19"]
+
+
+def read(message):
+    return (
+        message.msh.message_type,
+        message.msh.message_control_id,
+        message.pid.patient_identifier_list,
+        message.pv1.visit_number,
+    )
+
+
+MODES = {
+    "full": lambda raw: read(HL7Message(raw)),
+    "lazy": lambda raw: read(HL7Message(raw, lazy=True)),
+    "projection": lambda raw: read(HL7Message(raw, fields=FIELDS)),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, raw in (("ADT^A01", ADT_A01), ("ORU^R01 (200 OBX)", ORU_R01)):
+        number = 2000 if raw is ADT_A01 else 50
+        rates = {}
+        for mode, function in MODES.items():
+            best = min(timeit.repeat(
+                lambda: function(raw), number=number, repeat=args.repeat))
+            rates[mode] = number / best
+        print(name)
+        for mode, rate in rates.items():
+            print("  {0:12s}{1:10.0f} messages/s  speedup {2:6.1f}".format(
+                mode, rate, rate / rates["full"]))
+
+
+if __name__ == "__main__":
+    main()
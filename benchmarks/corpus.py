@@ -0,0 +1,128 @@
+"""
+Messages used by the benchmarks: realistic ADT, ORU, ORM and DFT messages of
+different sizes, the ORF sample in `tests/messages/OBR.hl7` and a synthetic
+lab result created by `HL7Generator`.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from hl7parser.hl7_generator import HL7Generator  # noqa: E402
+
+SAMPLE_PATH = os.path.join(
+    os.path.dirname(__file__), os.pardir, "tests", "messages", "OBR.hl7")
+
+ADT_A01 = "\r".join([
+    "MSH|^~\\&|MegaReg|XYZHospC|SuperOE|XYZImgCtr|20060529090131-0500||ADT^A01^ADT_A01|01052901|P|2.5",
+    "EVN||200605290901||||200605290900",
+    "PID|||56782445^^^UAReg^PI||KLEINSAMPLE^BARRY^Q^JR||19620910|M||2028-9^^HL70005^RA99113^^XYZ|"
+    "260 GOODWIN CREST DRIVE^^BIRMINGHAM^AL^35209^^M~NICKELL'S PICKLES^10000 W 100TH AVE^BIRMINGHAM^AL^35200^^O"
+    "|||||||0105I30001^^^99DEF^AN",
+    "PV1||I|W^389^1^UABH^^^^3||||12345^MORGAN^REX^J^^^MD^0010^UAMC^L||67890^GRAINGER^LUCY^X^^^MD^0010^UAMC^L"
+    "|MED|||||A0||13579^POTTER^SHERMAN^T^^^MD^0010^UAMC^L|||V1000|||||||||||||||||||||||||200605290900",
+    "OBX|1|NM|^Body Height||1.80|m^Meter^ISO+|||||F",
+    "OBX|2|NM|^Body Weight||79|kg^Kilogram^ISO+|||||F",
+    "AL1|1||^ASPIRIN",
+    "DG1|1||786.50^CHEST PAIN, UNSPECIFIED^I9|||A",
+])
+
+# update with next of kin, allergies, diagnoses and insurances
+ADT_A08 = "\r".join([
+    "MSH|^~\\&|ADT|HOSP|LAB|HOSP|20240312081512+0100||ADT^A08^ADT_A01|ADT20240312081512|P|2.5|||AL|NE||8859/1",
+    "EVN|A08|20240312081500|||jdoe^DOE^JOHN",
+    "PID|1||4711^^^HOSP^MR~123-45-6789^^^USSSA^SS||MUSTERMANN^MAX^J^^DR||19650412|M|||"
+    "HAUPTSTRASSE 1^^BERLIN^^10115^DE^H~POSTFACH 12^^BERLIN^^10001^DE^M||030-123456^PRN^PH|||M|RC|V4711",
+] + [
+    "NK1|{0}|MUSTERMANN^ERIKA{0}|SPO^SPOUSE|HAUPTSTRASSE 1^^BERLIN^^10115^DE|030-1234{0}".format(i)
+    for i in range(1, 4)
+] + [
+    "PV1|1|I|STATION 3^312^1^HOSP||||1234^ARZT^ANNA^^^DR|||INN||||A|||1234^ARZT^ANNA^^^DR|S|V4711"
+    "|||||||||||||||||||HOSP||||||20240310074500",
+    "PV2|||^CHEST PAIN",
+] + [
+    "AL1|{0}|DA|{1}^{2}^L|MO|RASH".format(i, 1000 + i, name)
+    for i, name in enumerate(["PENICILLIN", "SULFA", "LATEX", "IODINE"], 1)
+] + [
+    "DG1|{0}||I2{0}.9^DIAGNOSIS {0}^I10||20240310|W".format(i) for i in range(1, 7)
+] + [
+    "IN1|1|PPO^Private|12345^INSURANCE CO|INSURANCE CO^^^^^|PO BOX 1^^BERLIN^^10001^DE||030-999|G123"
+    "|||||20240101|20241231|||MUSTERMANN^MAX|SEL|19650412|HAUPTSTRASSE 1^^BERLIN^^10115^DE",
+    "IN1|2|PPO^Private|67890^OTHER CO|OTHER CO|PO BOX 2^^HAMBURG^^20001^DE||040-999|G456",
+])
+
+
+def oru_r01(observations):
+    """ returns a lab result with `observations` OBX segments """
+    return "\r".join([
+        "MSH|^~\\&|LAB|FACILITY|EHR|FACILITY|20240101120000||ORU^R01^ORU_R01|MSG0001|P|2.5",
+        "PID|1||4711^^^HOSP^MR||DOE^JANE^Q||19700101|F|||1 MAIN ST^^SPRINGFIELD^IL^62701",
+        "PV1|1|I|W^389^1^UABH||||12345^MORGAN^REX^J|||MED||||A0||||V2000",
+        "ORC|RE|4711|4711||CM",
+        "OBR|1|4711|4711|CBC^Blood count|||20240101113000",
+    ] + [
+        "OBX|{0}|NM|GLU^Glucose^LN||{1}|mg/dl|70-110|N|||F|||20240101113000".format(
+            i + 1, 80 + i % 40)
+        for i in range(observations)
+    ] + [
+        "NTE|1|L|Specimen slightly hemolyzed",
+    ])
+
+
+ORU_R01 = oru_r01(5)
+ORU_R01_LARGE = oru_r01(200)
+
+ORM_O01 = "\r".join([
+    "MSH|^~\\&|CPOE|HOSP|RIS|HOSP|20240215103000||ORM^O01^ORM_O01|ORD000123|P|2.3",
+    "PID|1||4711^^^HOSP^MR||DOE^JOHN^A||19800101|M|||12 ELM ST^^SPRINGFIELD^IL^62701||217-555-0100",
+    "PV1|1|O|RAD^^^HOSP||||5678^SMITH^ALICE^^^DR|||RAD||||1|||5678^SMITH^ALICE^^^DR|OP|V3000",
+    "ORC|NW|ORD000123^CPOE||GRP123^CPOE|SC||1^ONCE^^20240215110000^^R||20240215103000|"
+    "jdoe^DOE^JANE|||RAD^^^HOSP",
+    "OBR|1|ORD000123^CPOE||71020^CHEST 2 VIEWS^CPT4|R|20240215103000|20240215110000"
+    "||||||CHEST PAIN|||5678^SMITH^ALICE^^^DR",
+    "DG1|1||R07.9^CHEST PAIN, UNSPECIFIED^I10",
+    "NTE|1||Patient is claustrophobic",
+])
+
+DFT_P03 = "\r".join([
+    "MSH|^~\\&|BILLING|HOSP|FIN|HOSP|20240401230000||DFT^P03^DFT_P03|DFT0001|P|2.5",
+    "EVN|P03|20240401230000",
+    "PID|1||4711^^^HOSP^MR||DOE^JANE^Q||19700101|F|||1 MAIN ST^^SPRINGFIELD^IL^62701",
+    "PV1|1|I|W^389^1^UABH||||12345^MORGAN^REX^J|||MED||||A0||||V2000",
+] + [
+    "FT1|{0}|||20240401|20240401|CG|{1}^CHARGE {0}^CPT4|||1|{2}.00||||||||||||12345^MORGAN^REX^J".format(
+        i, 99200 + i, 25 * i)
+    for i in range(1, 21)
+] + [
+    "IN1|1|PPO^Private|12345^INSURANCE CO|INSURANCE CO||||G123",
+    "GT1|1||DOE^JANE^Q||1 MAIN ST^^SPRINGFIELD^IL^62701",
+])
+
+
+def read_sample():
+    with open(SAMPLE_PATH, encoding="utf-8") as f:
+        return f.read()
+
+
+def generated():
+    """ returns a synthetic lab result with 20 OBX segments """
+    generator = HL7Generator(
+        seed=2016, segments=["EVN", "PID", "PV1", "IN1", "OBR"], observations=20,
+        escape_ratio=0.1,
+    )
+    return generator.message()
+
+
+def load():
+    """ returns a dict of all messages by name """
+    return {
+        "ADT_A01": ADT_A01,
+        "ADT_A08": ADT_A08,
+        "ORU_R01": ORU_R01,
+        "ORU_R01_200_OBX": ORU_R01_LARGE,
+        "ORM_O01": ORM_O01,
+        "DFT_P03": DFT_P03,
+        "ORF_OBR_SAMPLE": read_sample(),
+        "GENERATED_ORU": generated(),
+    }
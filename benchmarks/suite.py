@@ -0,0 +1,269 @@
+"""
+Benchmark suite for parsing, field access and serialization.
+
+Every benchmark runs on every message of the corpus (see `corpus.py`) and
+reports the operations (i.e. messages) per second of the best of `--repeat`
+runs together with the memory allocated by a single operation, measured with
+tracemalloc: the peak and the memory still held afterwards (e.g. by the
+parsed message).
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --compare results.json --benchmark parse
+
+Results written with `--output` can be compared with later runs (e.g. of
+another commit) with `--compare`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import corpus  # noqa: E402
+from hl7parser.hl7 import HL7Message  # noqa: E402
+from hl7parser.hl7_data_types import HL7Datetime  # noqa: E402
+from hl7parser.hl7_path import compile_path  # noqa: E402
+from hl7parser.hl7_dedup import HL7DedupCache  # noqa: E402
+from hl7parser.hl7_json import to_json  # noqa: E402
+from hl7parser.hl7_routing import peek_header  # noqa: E402
+from hl7parser.hl7_tokenizer import tokenize  # noqa: E402
+
+# fields read by the named field access benchmark, if the message has them
+NAMED_FIELDS = [
+    ("msh", "message_type"),
+    ("msh", "message_control_id"),
+    ("msh", "message_datetime"),
+    ("pid", "patient_identifier_list"),
+    ("pid", "patient_name"),
+    ("pid", "datetime_of_birth"),
+    ("pv1", "visit_number"),
+    ("obr", "observation_datetime"),
+]
+
+# paths read by the path benchmarks
+PATHS = [compile_path(path) for path in ["MSH-9", "MSH-10", "PID-3.1", "PV1-19"]]
+
+
+def _first(message, segment_type):
+    segment = getattr(message, segment_type)
+    return segment[0] if isinstance(segment, list) else segment
+
+
+def setup_parsed(raw):
+    return HL7Message(raw)
+
+
+def setup_named_access(raw):
+    message = HL7Message(raw)
+    fields = [
+        (segment_type, name) for segment_type, name in NAMED_FIELDS
+        if segment_type in message.segment_position
+        and name in _first(message, segment_type).named_fields
+    ]
+    return message, fields
+
+
+def named_access(prepared):
+    message, fields = prepared
+    for segment_type, name in fields:
+        getattr(_first(message, segment_type), name)
+
+
+def setup_repeated_access(raw):
+    message = HL7Message(raw)
+    segment_types = [
+        segment_type for segment_type, positions in message.segment_position.items()
+        if isinstance(positions, list)
+    ]
+    if not segment_types:
+        return None
+    return message, segment_types
+
+
+def repeated_access(prepared):
+    message, segment_types = prepared
+    for segment_type in segment_types:
+        for segment in getattr(message, segment_type):
+            segment[0]
+
+
+def read_paths(message):
+    return [path(message) for path in PATHS]
+
+
+def round_trip(raw):
+    message = HL7Message(raw)
+    message.msh[1] = "BENCHMARK"
+    return HL7Message(str(message))
+
+
+def setup_datetimes(raw):
+    message = HL7Message(raw, lazy=True)
+    values = []
+    for _, segment in message.segments:
+        for index, data_type in enumerate(segment.schema.types[:len(segment)]):
+            value = segment.raw_field(index)
+            if issubclass(data_type, HL7Datetime) and value:
+                values.append(value)
+    if not values:
+        return None
+    return values, message.delimiters
+
+
+def parse_datetimes(prepared):
+    values, delimiters = prepared
+    return [HL7Datetime(value, delimiters) for value in values]
+
+
+# name: (setup, function), the function is called with the result of setup,
+# messages for which setup returns None are skipped
+def setup_duplicate(raw):
+    cache = HL7DedupCache()
+    cache.is_duplicate(raw)
+    return cache, raw
+
+
+def check_duplicate(prepared):
+    cache, raw = prepared
+    return cache.is_duplicate(raw)
+
+
+BENCHMARKS = {
+    "parse": (str, HL7Message),
+    "parse_lazy": (str, lambda raw: HL7Message(raw, lazy=True)),
+    "parse_bytes_lazy": (str.encode, lambda raw: HL7Message(raw, lazy=True)),
+    "named_access": (setup_named_access, named_access),
+    "repeated_segment_access": (setup_repeated_access, repeated_access),
+    "str": (setup_parsed, str),
+    "round_trip": (str, round_trip),
+    "tokenize": (str, tokenize),
+    "peek_header": (str, peek_header),
+    "duplicate": (setup_duplicate, check_duplicate),
+    "to_json": (str, to_json),
+    "paths_lazy": (str, lambda raw: read_paths(HL7Message(raw, lazy=True))),
+    "paths_tokenized": (str, lambda raw: read_paths(tokenize(raw))),
+    "datetime": (setup_datetimes, parse_datetimes),
+}
+
+
+def measure(function, argument, repeat, min_time):
+    """ returns the best number of calls per second and the allocations """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function(argument)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function(argument)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(argument)  # noqa: F841
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": number / best,
+        "peak_bytes": peak - before,
+        "retained_bytes": current - before,
+    }
+
+
+def run(benchmarks, messages, repeat, min_time):
+    results = []
+    for benchmark in benchmarks:
+        setup, function = BENCHMARKS[benchmark]
+        for name, raw in messages.items():
+            prepared = setup(raw)
+            if prepared is None:
+                continue
+            result = {"benchmark": benchmark, "message": name}
+            result.update(measure(function, prepared, repeat, min_time))
+            results.append(result)
+            report(result)
+    return results
+
+
+def report(result, baseline=None):
+    line = (
+        "{benchmark:24s}{message:16s}{ops_per_sec:10.0f} ops/s"
+        "{peak_bytes:10d} B peak{retained_bytes:10d} B held"
+    ).format(**result)
+    if baseline is not None:
+        line += "  {0:6.2f}x".format(result["ops_per_sec"] / baseline["ops_per_sec"])
+    print(line)
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, path):
+    with open(path) as f:
+        baseline = {
+            (result["benchmark"], result["message"]): result
+            for result in json.load(f)["results"]
+        }
+    print("\ncompared with {0}".format(path))
+    for result in results:
+        key = (result["benchmark"], result["message"])
+        if key in baseline:
+            report(result, baseline[key])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--benchmark", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--message", nargs="+", help="only run on these messages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="minimal duration of a run in seconds")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+
+    messages = corpus.load()
+    if args.message:
+        messages = {name: messages[name] for name in args.message}
+
+    results = run(args.benchmark, messages, args.repeat, args.min_time)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"metadata": metadata(), "results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,2 @@
 from hl7parser.hl7 import HL7Delimiters, HL7Segment, HL7Message
+from hl7parser.hl7_stream import HL7StreamParser, iter_messages, write_messages
@@ -27,7 +27,11 @@ ADAM
 ADT^A01^ADT_A01
 """
 
+import codecs
+import io
 import re
+import threading
+import time
 
 import hl7parser.hl7_data_types as data_types
 from hl7parser.hl7_segments import segment_maps
@@ -35,7 +39,18 @@ from hl7parser.hl7_segments import segment_maps
 class HL7Delimiters:
     """
         Represents a set of different separators as defined by the HL7 standard
+
+        Delimiters are immutable, they are shared by all messages using the
+        same characters (see `get_delimiters`).
     """
+    __slots__ = (
+        "field_separator",
+        "component_separator",
+        "rep_separator",
+        "escape_char",
+        "subcomponent_separator",
+    )
+
     def __init__(
         self,
         field_separator,
@@ -44,56 +59,390 @@ class HL7Delimiters:
         escape_char,
         subcomponent_separator
     ):
-        self.field_separator = field_separator
-        self.component_separator = component_separator
-        self.rep_separator = rep_separator
-        self.escape_char = escape_char
-        self.subcomponent_separator = subcomponent_separator
+        set_ = super().__setattr__
+        set_("field_separator", field_separator)
+        set_("component_separator", component_separator)
+        set_("rep_separator", rep_separator)
+        set_("escape_char", escape_char)
+        set_("subcomponent_separator", subcomponent_separator)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HL7Delimiters objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("HL7Delimiters objects are immutable")
 
     def __str__(self):
         return (self.field_separator + self.component_separator +
                 self.rep_separator + self.escape_char +
                 self.subcomponent_separator)
 
+    def __reduce__(self):
+        # unpickled as the shared instance
+        return (get_delimiters, (str(self),))
+
+
+# shared delimiter objects by their encoding characters
+_delimiters = {}
+# maximum number of shared delimiter objects, further ones aren't cached
+_MAX_DELIMITERS = 64
+
+
+def get_delimiters(characters="|^~\\&"):
+    """
+        Returns the shared HL7Delimiters instance for the five delimiter
+        characters (field, component, repetition, escape and subcomponent
+        separator) given in `characters`, e.g. `"|^~\\&"`.
+
+        The returned (immutable) object is shared by all segments and
+        messages using the same delimiters.
+    """
+    try:
+        return _delimiters[characters]
+    except KeyError:
+        delimiters = HL7Delimiters(*characters)
+        if len(_delimiters) < _MAX_DELIMITERS:
+            _delimiters[characters] = delimiters
+        return delimiters
+
+
+def escape(value, delimiters):
+    """
+        Replaces the delimiters in `value` by HL7 escape sequences so the
+        string can be used as the content of a single (sub)component.
+
+        >>> print(escape("A|B^C", get_delimiters()))
+        A\\F\\B\\S\\C
+    """
+    escape_char = delimiters.escape_char
+    result = value.replace(escape_char, "{0}E{0}".format(escape_char))
+    for delimiter, code in (
+        (delimiters.field_separator, "F"),
+        (delimiters.component_separator, "S"),
+        (delimiters.subcomponent_separator, "T"),
+        (delimiters.rep_separator, "R"),
+    ):
+        result = result.replace(delimiter, "{0}{1}{0}".format(escape_char, code))
+    return result
+
+
+# Python codecs of the character sets of HL7 table 0211 (MSH-18)
+CHARACTER_SETS = {
+    "ASCII": "ascii",
+    "ISO IR6": "ascii",
+    "8859/1": "iso8859-1",
+    "ISO IR100": "iso8859-1",
+    "8859/2": "iso8859-2",
+    "8859/3": "iso8859-3",
+    "8859/4": "iso8859-4",
+    "8859/5": "iso8859-5",
+    "8859/6": "iso8859-6",
+    "8859/7": "iso8859-7",
+    "8859/8": "iso8859-8",
+    "8859/9": "iso8859-9",
+    "8859/15": "iso8859-15",
+    "ISO IR14": "shift_jis",
+    "ISO IR87": "iso2022_jp",
+    "ISO IR159": "iso2022_jp_2",
+    "GB 18030-2000": "gb18030",
+    "KS X 1001": "euc_kr",
+    "BIG-5": "big5",
+    "UNICODE": "utf-16",
+    "UNICODE UTF-8": "utf-8",
+    "ISO IR192": "utf-8",
+    "UNICODE UTF-16": "utf-16",
+    "UNICODE UTF-32": "utf-32",
+}
+
+# codecs which never contain the bytes of the (ASCII) delimiters inside of
+# other characters, messages using them can be split before decoding
+_BYTE_SAFE_CODECS = {"ascii", "utf-8"} | {
+    codecs.lookup("iso8859-{0}".format(part)).name for part in range(1, 16) if part != 12
+}
+
+# raw bytes of unparsed fields are kept as memoryview
+_RAW_FIELD_TYPES = (str, memoryview)
+
+_LINE_SEPARATOR = re.compile(rb"\r\n|[\r\n]")
+_SEPARATORS = {}
+
+
+def get_codec(character_set, default="utf-8"):
+    """
+        Returns the name of the Python codec for a character set as given in
+        MSH-18, `default` if the character set is empty or unknown.
+    """
+    if not character_set:
+        return default
+    try:
+        return CHARACTER_SETS[character_set]
+    except KeyError:
+        pass
+    try:
+        return codecs.lookup(character_set).name
+    except LookupError:
+        return default
+
+
+def _split_bytes(data, separator):
+    """
+        Splits the memoryview `data` at the bytes matched by the compiled
+        regular expression `separator` without copying the contents.
+    """
+    parts = []
+    start = 0
+    for match in separator.finditer(data):
+        parts.append(data[start:match.start()])
+        start = match.end()
+    parts.append(data[start:])
+    return parts
+
+
+def _get_separator(character):
+    """ returns the compiled regular expression matching a delimiter byte """
+    try:
+        return _SEPARATORS[character]
+    except KeyError:
+        separator = _SEPARATORS[character] = re.compile(
+            re.escape(character.encode("ascii")))
+        return separator
+
+
+def _trim_separators(text, separator):
+    """ replaces trailing field separators by a single one """
+    trimmed = text.rstrip(separator)
+    if len(trimmed) < len(text):
+        trimmed += separator
+    return trimmed
+
+
+def _render_line(line, field_separator):
+    """
+        returns the representation of the raw segment `line` (str or bytes)
+        without creating the segment
+    """
+    if _is_padded(line, field_separator):
+        # missing fields are padded when the segment is created
+        line += field_separator
+    return _trim_separators(line, field_separator)
+
+
+def _is_padded(line, field_separator):
+    """
+        returns whether the raw segment `line` (str or bytes) has less fields
+        than its definition
+    """
+    segment_type = line.partition(field_separator)[0]
+    if isinstance(segment_type, bytes):
+        segment_type = segment_type.decode("ascii")
+    schema = data_types.compile_schema(segment_maps.get(segment_type, ()))
+    return len(schema) > line.count(field_separator)
+
+
+class HL7Stats:
+    """
+        Counters and timers of the parsing phases, installed with
+        `enable_stats`. While no statistics are installed, parsing only
+        checks a module global.
+
+        The timers of the phases overlap: `parse` is the construction of
+        messages, which includes `split` (splitting messages into segments
+        and segments into fields) and `fields` (parsing fields into their
+        data types). `serialize` is the time spent in `str()` and
+        `write_to` of messages. The time of every segment type and data
+        type is counted as well, e.g. `HL7Datetime` shows the time spent in
+        datetime fields.
+
+        :param slow_threshold:
+            Seconds after which parsing a message is reported to
+            `on_slow_message`
+        :param on_slow_message:
+            Called with the message and the seconds it took to parse it
+    """
+
+    PHASES = ("parse", "split", "fields", "serialize")
+
+    def __init__(self, slow_threshold=None, on_slow_message=None):
+        self.slow_threshold = slow_threshold
+        self.on_slow_message = on_slow_message
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ sets all counters and timers to zero """
+        with self._lock:
+            # name: [count, seconds]
+            self.phases = {phase: [0, 0.0] for phase in self.PHASES}
+            self.segments = {}
+            self.data_types = {}
+            self.slow_messages = 0
+
+    def _add(self, timers, name, seconds):
+        with self._lock:
+            try:
+                timer = timers[name]
+            except KeyError:
+                timer = timers[name] = [0, 0.0]
+            timer[0] += 1
+            timer[1] += seconds
+
+    def _message(self, message, seconds):
+        self._add(self.phases, "parse", seconds)
+        if self.slow_threshold is not None and seconds >= self.slow_threshold:
+            with self._lock:
+                self.slow_messages += 1
+            if self.on_slow_message is not None:
+                self.on_slow_message(message, seconds)
+
+    def snapshot(self):
+        """
+            Returns the current statistics as dict of plain values, e.g. to
+            export them as JSON.
+
+            >>> stats = HL7Stats()
+            >>> stats.snapshot()["phases"]["parse"]
+            {'count': 0, 'seconds': 0.0}
+        """
+        def export(timers):
+            return {
+                name: {"count": count, "seconds": seconds}
+                for name, (count, seconds) in timers.items()
+            }
+
+        with self._lock:
+            return {
+                "phases": export(self.phases),
+                "segments": export(self.segments),
+                "data_types": export(self.data_types),
+                "slow_messages": self.slow_messages,
+            }
+
+
+# statistics of parsing, None if disabled
+_stats = None
+
+
+def enable_stats(stats=None):
+    """
+        Installs `stats` (a new `HL7Stats` object if not given) to collect
+        statistics of all messages and segments parsed from now on and
+        returns it.
+    """
+    global _stats
+    if stats is None:
+        stats = HL7Stats()
+    _stats = stats
+    return stats
+
+
+def disable_stats():
+    """ stops collecting statistics and returns the installed ones """
+    global _stats
+    stats, _stats = _stats, None
+    return stats
+
 
 class HL7Segment:
+    """
+        A single segment of a HL7 message.
+
+        By default all fields are parsed into their data types when the
+        segment is constructed. If `lazy` is set, the raw field contents are
+        kept and a field is only parsed the first time it is accessed by
+        index or named attribute. Untouched fields are written back verbatim
+        by `str()`.
+
+        The segment may also be given as bytes-like object, in which case the
+        fields are decoded using `encoding` when they are parsed.
+
+        The raw text of the segment is kept and `str()` only renders fields
+        which were modified and splices them into the raw text. Fields which
+        were set are always rendered, fields returned by index or named
+        attribute only if their rendered text changed since they were
+        returned. Accessing the `fields` list directly renders all fields
+        again.
+
+        Segments are pickled as their raw text with modified fields rendered
+        and split again when they are unpickled.
+    """
+    __slots__ = (
+        "delimiters", "type", "lazy", "encoding", "schema", "_fields", "_input_length",
+        "_raw", "_dirty", "_returned")
+
+    def __init__(self, segment, delimiters=None, lazy=False, encoding="utf-8"):
+        stats = _stats
+        if stats is not None:
+            start = time.perf_counter()
 
-    def __init__(self, segment, delimiters=None):
         if delimiters is None:
-            self.delimiters = HL7Delimiters(*"|^~\\&")
+            self.delimiters = get_delimiters()
         else:
             self.delimiters = delimiters
 
+        self._raw = segment
+        # bit mask of the fields which were set and need to be rendered by
+        # `str()`, -1 if all fields have to be rendered
+        self._dirty = 0
+        # rendered text of the returned fields by index, they need to be
+        # rendered if it changed
+        self._returned = None
+
         # split initial content into individual fields
-        initial_content = segment.split(self.delimiters.field_separator)
+        if isinstance(segment, str):
+            initial_content = segment.split(self.delimiters.field_separator)
+            self.encoding = None
+        else:
+            initial_content = _split_bytes(
+                memoryview(segment), _get_separator(self.delimiters.field_separator))
+            initial_content[0] = str(initial_content[0], "ascii")
+            self.encoding = encoding
+        if stats is not None:
+            stats._add(stats.phases, "split", time.perf_counter() - start)
 
         # the type of the segment is defined in the first field
         self.type = initial_content[0]
-        self.fields = []
-
-        # get the standard definitions for this type
-        self.field_definitions = segment_maps.get(self.type, [])
-        self.named_fields = {}
-
-        # iterate over predefined fields, remember index in `named_fields`
-        # and initialize fields
-        index_override_found = False
-        for index, definition in enumerate(self.field_definitions):
-            if definition[1]["index"] is not None:
-                definition_index = definition[1]["index"]
-                index_override_found = True
-            else:
-                if index_override_found:
-                    raise Exception("Regular cell type after one with index override found")
-                definition_index = index
-            self.named_fields[definition[0]] = definition_index
-            while len(self.fields) != definition_index:
-                self.fields.append(data_types.HL7DataType("", self.delimiters))
-            self.fields.append(definition[1]["type"]("", self.delimiters))
-
-        # fill fields with initial content
-        for index, content in enumerate(initial_content[1:]):
-            self[index] = content
+        self.lazy = lazy
+
+        # get the compiled standard definitions for this type
+        self.schema = data_types.compile_schema(segment_maps.get(self.type, ()))
+
+        # unparsed fields are kept as raw strings until they are accessed
+        self._fields = initial_content[1:]
+        self._input_length = len(self._fields)
+        if len(self.schema) > self._input_length:
+            self._fields.extend([""] * (len(self.schema) - self._input_length))
+
+        if not lazy:
+            for index in range(len(self._fields)):
+                self._materialize(index)
+
+        if stats is not None:
+            stats._add(stats.segments, self.type, time.perf_counter() - start)
+
+    @property
+    def fields(self):
+        """
+            list of the fields, raw (str or memoryview) if they weren't
+            parsed yet
+        """
+        # the list may be modified by the caller
+        self._dirty = -1
+        return self._fields
+
+    @fields.setter
+    def fields(self, fields):
+        self._dirty = -1
+        self._fields = fields
+
+    @property
+    def field_definitions(self):
+        """ the `segment_maps` entry of this segment type """
+        return self.schema.definitions
+
+    @property
+    def named_fields(self):
+        """ mapping of field names to their index """
+        return self.schema.named_fields
 
     def __str__(self):
         """
@@ -101,21 +450,155 @@ class HL7Segment:
             Trailing empty segments will be cut off.
         """
         field_separator = self.delimiters.field_separator
-        result = field_separator.join(map(str, [self.type] + self.fields))
-        result = re.sub(
-            "{0}+$".format(re.escape(field_separator)),
-            field_separator,
-            result
-        )
-        return result
+        if not self._modified():
+            raw = self._raw
+            if not isinstance(raw, str):
+                raw = str(raw, self.encoding)
+            # unmodified, only add the padding of the missing fields
+            if len(self._fields) > self._input_length:
+                raw += field_separator
+            return _trim_separators(raw, field_separator)
+        parts = self.raw_fields()
+        parts.insert(0, self.type)
+        return _trim_separators(field_separator.join(parts), field_separator)
+
+    def raw_fields(self):
+        """
+            Returns the contents of all fields as list of strings without
+            parsing them, fields which may have been modified are rendered.
+        """
+        fields = self._fields
+        dirty = self._modified()
+        if dirty == -1:
+            return [self.raw_field(index) for index in range(len(fields))]
+        raw = self._raw
+        if not isinstance(raw, str):
+            raw = str(raw, self.encoding)
+        parts = raw.split(self.delimiters.field_separator)
+        del parts[0]
+        if not dirty:
+            # only add the padding of the missing fields
+            parts.extend([""] * (len(fields) - len(parts)))
+            return parts
+        for index in range(len(fields)):
+            if index < len(parts):
+                if dirty >> index & 1:
+                    parts[index] = self.raw_field(index)
+            else:
+                parts.append(self.raw_field(index))
+        return parts
+
+    def _encode(self, encoding, field_separator=None):
+        """
+            Returns the encoded representation of the segment. If the encoded
+            `field_separator` is given, the raw bytes of an unmodified segment
+            are used as they are (without copying them if possible).
+        """
+        if field_separator is None or not isinstance(self._raw, memoryview) or self._modified():
+            return str(self).encode(encoding)
+        raw = self._raw
+        if len(self._fields) > self._input_length:
+            # missing fields are padded
+            return _trim_separators(raw.tobytes() + field_separator, field_separator)
+        if raw[-1:] == field_separator:
+            return _trim_separators(raw.tobytes(), field_separator)
+        return raw
+
+    def raw_field(self, index):
+        """
+            Returns the content of the field at `index` as string without
+            parsing it, an empty string if the segment is shorter. Fields
+            which were modified are rendered, all others are read from the
+            raw text.
+        """
+        if index >= len(self._fields):
+            return ""
+        field = self._fields[index]
+        if isinstance(field, memoryview):
+            return str(field, self.encoding)
+        if isinstance(field, str):
+            return field
+        if index < self._input_length and not self._field_modified(index):
+            # rendering drops components which the data type doesn't define
+            raw = self._raw
+            if isinstance(raw, str):
+                return raw.split(self.delimiters.field_separator, index + 2)[index + 1]
+            parts = _split_bytes(memoryview(raw), _get_separator(self.delimiters.field_separator))
+            return str(parts[index + 1], self.encoding)
+        return str(field)
 
     def __getitem__(self, idx):
         """ returns the requested component """
-        return self.fields[idx]
+        if isinstance(idx, slice):
+            return [self[index] for index in range(*idx.indices(len(self)))]
+        field = self._fields[idx]
+        if idx < 0:
+            idx += len(self._fields)
+        if isinstance(field, _RAW_FIELD_TYPES):
+            field = self._materialize(idx)
+        # the returned object may be modified, remember its text to find out
+        returned = self._returned
+        if returned is None:
+            returned = self._returned = {}
+        if idx not in returned and not self._dirty >> idx & 1:
+            returned[idx] = str(field)
+        return field
+
+    def _field_modified(self, index):
+        """ returns whether the field at `index` needs to be rendered """
+        dirty = self._dirty
+        if dirty == -1 or dirty >> index & 1:
+            return True
+        returned = self._returned
+        return bool(returned) and index in returned and (
+            str(self._fields[index]) != returned[index])
+
+    def _modified(self):
+        """
+            returns the bit mask of the fields which need to be rendered, -1
+            for all fields
+        """
+        dirty = self._dirty
+        returned = self._returned
+        if returned and dirty != -1:
+            fields = self._fields
+            for index, text in returned.items():
+                if str(fields[index]) != text:
+                    dirty |= 1 << index
+        return dirty
+
+    def _materialize(self, index):
+        """
+            Parses the raw content of the field at position `index` into
+            its data type and returns the resulting object.
+        """
+        stats = _stats
+        if stats is not None:
+            start = time.perf_counter()
+
+        if index < self._input_length:
+            value = self._fields[index]
+            if not isinstance(value, str):
+                value = str(value, self.encoding)
+            self._set(index, value)
+        else:
+            # fields not present in the input are initialized empty
+            self._fields[index] = self.schema.types[index]("", self.delimiters)
+
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            data_type = (
+                self.schema.types[index] if index < len(self.schema) else data_types.HL7DataType)
+            stats._add(stats.phases, "fields", seconds)
+            stats._add(stats.data_types, data_type.__name__, seconds)
+        return self._fields[index]
 
     def __getattr__(self, attr):
+        if attr == "schema":
+            # not initialized, e.g. on objects created by `copy`
+            raise AttributeError(attr)
         try:
-            return self[self.named_fields[attr]]
+            return self[self.schema.named_fields[attr]]
         except (KeyError, IndexError):
             raise AttributeError(attr)
 
@@ -132,36 +615,97 @@ class HL7Segment:
         if length < len(self):
             return
         for _ in range(length - len(self)):
-            self.fields.append(data_types.HL7DataType("", self.delimiters))
+            self._dirty |= 1 << len(self._fields)
+            self._fields.append(data_types.HL7DataType("", self.delimiters))
 
     def __setitem__(self, attr, value):
         if isinstance(attr, int):
+            if attr < 0:
+                attr += len(self._fields)
             self.require_length(attr + 1)
-
-            try:
-                field_definition = self.field_definitions[attr][1]
-            except IndexError:
-                data_type = data_types.HL7DataType
-                repeats = self.delimiters.rep_separator in value
-            else:
-                data_type = field_definition["type"]
-                repeats = field_definition["repeats"]
-
-            if not repeats:
-                self.fields[attr] = data_type(value, self.delimiters)
-            else:
-                self.fields[attr] = data_types.HL7RepeatingField(
-                    data_type, value, self.delimiters
-                )
+            self._set(attr, value)
+            self._dirty |= 1 << attr
         else:
             raise TypeError("Segment indexes must be integers.")
 
+    def _set(self, index, value):
+        """ parses `value` into the data type of the field at `index` """
+        if index < len(self.schema):
+            data_type = self.schema.types[index]
+            repeats = self.schema.repeats[index]
+        else:
+            data_type = data_types.HL7DataType
+            repeats = None
+        if repeats is None:
+            # undefined fields repeat if the input contains repetitions
+            repeats = self.delimiters.rep_separator in value
+
+        if not repeats:
+            self._fields[index] = data_type(value, self.delimiters)
+        else:
+            self._fields[index] = data_types.HL7RepeatingField(
+                data_type, value, self.delimiters
+            )
+
     def __len__(self):
-        return len(self.fields)
+        return len(self._fields)
+
+    def _raw_text(self):
+        """
+            returns the raw text (str or bytes) of the segment, rendered if
+            fields were modified
+        """
+        if self._modified():
+            return str(self)
+        raw = self._raw
+        return raw if isinstance(raw, str) else bytes(raw)
+
+    def __getstate__(self):
+        return (self._raw_text(), str(self.delimiters), self.lazy, self.encoding or "utf-8")
+
+    def __setstate__(self, state):
+        text, characters, lazy, encoding = state
+        self.__init__(text, get_delimiters(characters), lazy, encoding)
 
 
 class HL7Message:
-    def __init__(self, message):
+    """
+        A HL7 message, given as string or bytes-like object.
+
+        Messages given as bytes are split into segments and fields without
+        decoding or copying them, a field is only decoded when it is parsed.
+        The encoding is read from MSH-18 (character_set) unless `encoding`
+        is given, utf-8 is used if neither is set. Messages in encodings
+        which may contain the delimiter bytes inside of other characters
+        (e.g. UTF-16 or BIG-5) are decoded as a whole.
+
+        `fields` restricts parsing to a projection of the message, given as
+        list of segment types and fields, e.g. `["MSH-9", "PID-3", "OBX"]`.
+        The listed fields (or all fields of listed segments) are parsed
+        immediately, all other fields of these segments are parsed lazily.
+        Segments which aren't listed are kept as raw text until they are
+        accessed. The MSH segment is always available.
+
+        Messages are pickled as their raw text with modified segments
+        rendered. Unpickled messages keep the segments as raw text until they
+        are accessed.
+    """
+
+    def __init__(self, message, lazy=False, encoding=None, fields=None):
+        stats = _stats
+        if stats is None:
+            self._parse(message, lazy, encoding, fields)
+        else:
+            start = time.perf_counter()
+            self._parse(message, lazy, encoding, fields)
+            stats._message(self, time.perf_counter() - start)
+
+    def _parse(self, message, lazy, encoding, fields):
+        """ splits the message into segments and parses them """
+        stats = _stats
+        if stats is not None:
+            start = time.perf_counter()
+
         self.message = message
         # list of segments of this message
         # => list of tupels (segment_type, HL7Segment object)
@@ -169,14 +713,40 @@ class HL7Message:
         # dictionary which saves the position of the seqments in the
         # list for fast lookup in __getattr__
         self.segment_position = {}
-        self.delimiters = HL7Delimiters(*message[3:8])
+        self.encoding = encoding
 
-        for segment in message.splitlines():
-            # create an HLSegment object from the raw data of this segment
-            # (i.e. line)
-            segment = HL7Segment(segment, self.delimiters)
+        if isinstance(message, str):
+            self.delimiters = get_delimiters(message[3:8])
+            lines = message.splitlines()
+        else:
+            message = memoryview(message)
+            if self.encoding is None:
+                self.encoding = self._read_character_set(message)
+            if codecs.lookup(self.encoding).name in _BYTE_SAFE_CODECS:
+                self.delimiters = get_delimiters(str(message[3:8], "ascii"))
+                lines = _split_bytes(message, _LINE_SEPARATOR)
+                if not lines[-1]:
+                    lines.pop()
+            else:
+                message = str(message, self.encoding)
+                self.delimiters = get_delimiters(message[3:8])
+                lines = message.splitlines()
+        if stats is not None:
+            stats._add(stats.phases, "split", time.perf_counter() - start)
+
+        self.lazy = lazy
+        projection = None if fields is None else _parse_projection(fields)
+
+        for segment in lines:
+            if projection is None:
+                # create an HLSegment object from the raw data of this segment
+                # (i.e. line)
+                segment = HL7Segment(
+                    segment, self.delimiters, lazy=lazy, encoding=self.encoding)
+                segment_type = segment.type.lower()
+            else:
+                segment, segment_type = self._project(segment, projection)
             # append it to the list of segments
-            segment_type = segment.type.lower()
             segments.append((segment_type, segment))
 
             position = len(segments) - 1
@@ -195,23 +765,211 @@ class HL7Message:
             else:
                 self.segment_position[segment_type] = position
 
-        self.segments = segments
+        self._segments = segments
 
         self.header = self.msh
-        self.type = self.header.fields[8]
+        self.type = self.header[8]
+
+    def __getstate__(self):
+        lines = []
+        binary = False
+        for _, segment in self._segments:
+            if isinstance(segment, HL7Segment):
+                segment = segment._raw_text()
+            elif not isinstance(segment, str):
+                segment = bytes(segment)
+            binary = binary or not isinstance(segment, str)
+            lines.append(segment)
+        if binary:
+            # the raw segments of a message in a byte safe encoding
+            text = b"\r".join([
+                line.encode(self.encoding) if isinstance(line, str) else line
+                for line in lines
+            ])
+        else:
+            text = "\r".join(lines)
+        return (text, self.lazy, self.encoding)
+
+    def __setstate__(self, state):
+        text, lazy, encoding = state
+        # only the MSH segment is created
+        self._parse(text, lazy, encoding, ())
+        if not lazy:
+            header = self.header
+            for index, field in enumerate(header._fields):
+                if isinstance(field, _RAW_FIELD_TYPES):
+                    header._materialize(index)
+
+    @staticmethod
+    def _read_character_set(message):
+        """
+            returns the codec for the first character set in MSH-18 of the
+            raw message
+        """
+        end = _LINE_SEPARATOR.search(message)
+        header = str(message[:end.start() if end else len(message)], "latin-1")
+        fields = header.split(header[3:4])
+        if len(fields) < 18:
+            return get_codec(None)
+        return get_codec(fields[17].split(header[5:6])[0].strip())
+
+    def _project(self, line, projection):
+        """
+            Creates the segment for `line` if it is part of the projection and
+            parses the requested fields, other lines are returned as they are.
+            Returns the segment and its (lower case) type.
+        """
+        if isinstance(line, str):
+            segment_type = line.partition(self.delimiters.field_separator)[0]
+        else:
+            separator = _get_separator(self.delimiters.field_separator).search(line)
+            segment_type = str(line[:separator.start() if separator else len(line)], "ascii")
+
+        if segment_type not in projection and segment_type != "MSH":
+            return line, segment_type.lower()
+
+        segment = HL7Segment(line, self.delimiters, lazy=True, encoding=self.encoding)
+        indexes = projection.get(segment_type, ())
+        if indexes is None:
+            indexes = range(len(segment))
+        for index in indexes:
+            if index < len(segment):
+                # parse the requested field
+                segment._materialize(index)
+        return segment, segment_type.lower()
+
+    def _segment(self, position):
+        """ returns the segment at `position`, creating it from raw text """
+        segment_type, segment = self._segments[position]
+        if not isinstance(segment, HL7Segment):
+            segment = HL7Segment(
+                segment, self.delimiters, lazy=self.lazy, encoding=self.encoding)
+            self._segments[position] = (segment_type, segment)
+        return segment
+
+    @property
+    def segments(self):
+        """ list of tuples (segment type, HL7Segment object) """
+        for position in range(len(self._segments)):
+            self._segment(position)
+        return self._segments
 
     def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "segment_position":
+            # not initialized, e.g. on objects created by `copy`
+            raise AttributeError(attr)
         if attr in self.segment_position:
             positions = self.segment_position[attr]
             if isinstance(positions, list):
-                return [self.segments[p][1] for p in positions]
+                return [self._segment(p) for p in positions]
             else:
-                return self.segments[positions][1]
+                return self._segment(positions)
         else:
             raise AttributeError(
                 "{0!r} object has no attribute {1!r}"
                 .format(self.__class__, attr)
             )
 
-    def __str__(self):  # pragma: no cover
-        return "\n".join([str(x[1]) for x in self.segments])
+    def __str__(self):
+        """
+            Generates the string representation of this message, segments
+            which weren't created are written from their raw text.
+        """
+        stats = _stats
+        if stats is not None:
+            start = time.perf_counter()
+        text = "\n".join([
+            str(segment) if isinstance(segment, HL7Segment) else self._render_raw(segment)
+            for _, segment in self._segments
+        ])
+        if stats is not None:
+            stats._add(stats.phases, "serialize", time.perf_counter() - start)
+        return text
+
+    def _render_raw(self, line):
+        """ returns the string representation of the raw segment `line` """
+        if not isinstance(line, str):
+            line = str(line, self.encoding)
+        return _render_line(line, self.delimiters.field_separator)
+
+    def to_dict(self):
+        """ returns the message as dict, see `hl7parser.hl7_json` """
+        # imported here, hl7_json depends on this module
+        from hl7parser.hl7_json import to_dict
+        return to_dict(self)
+
+    def to_json(self, **kwargs):
+        """ returns the message as JSON, see `hl7parser.hl7_json` """
+        from hl7parser.hl7_json import to_json
+        return to_json(self, **kwargs)
+
+    def write_to(self, fp, encoding=None, separator="\r"):
+        """
+            Writes the message segment by segment to the file-like object
+            `fp`, every segment is terminated by `separator`.
+
+            Binary files get the message encoded with `encoding`, which
+            defaults to the encoding of the message or utf-8. Unmodified
+            segments of messages given as bytes are written without decoding
+            them if the encodings match.
+        """
+        stats = _stats
+        if stats is None:
+            self._write(fp, encoding, separator)
+        else:
+            start = time.perf_counter()
+            self._write(fp, encoding, separator)
+            stats._add(stats.phases, "serialize", time.perf_counter() - start)
+
+    def _write(self, fp, encoding, separator):
+        write = fp.write
+        if isinstance(fp, io.TextIOBase):
+            for _, segment in self._segments:
+                if isinstance(segment, HL7Segment):
+                    write(str(segment))
+                else:
+                    write(self._render_raw(segment))
+                write(separator)
+            return
+
+        if encoding is None:
+            encoding = self.encoding or "utf-8"
+        copy_raw = (
+            self.encoding is not None
+            and codecs.lookup(encoding).name == codecs.lookup(self.encoding).name
+        )
+        field_separator = self.delimiters.field_separator.encode(encoding)
+        raw_separator = field_separator if copy_raw else None
+        separator = separator.encode(encoding)
+        for _, segment in self._segments:
+            if isinstance(segment, HL7Segment):
+                write(segment._encode(encoding, raw_separator))
+            elif copy_raw and isinstance(segment, memoryview):
+                write(_render_line(segment.tobytes(), field_separator))
+            else:
+                write(self._render_raw(segment).encode(encoding))
+            write(separator)
+
+
+def _parse_projection(fields):
+    """
+        Converts a list of field specifications like `["PID-3", "OBX"]` into a
+        dict mapping segment types to the indexes of the requested fields,
+        or None if the whole segment is requested.
+    """
+    projection = {}
+    for spec in fields:
+        segment_type, _, number = spec.partition("-")
+        if not number:
+            projection[segment_type] = None
+            continue
+        if not number.isdigit():
+            raise ValueError("Invalid field specification {0!r}".format(spec))
+        # the field separator is MSH-1, so MSH-2 is the first field
+        index = int(number) - (2 if segment_type == "MSH" else 1)
+        if index < 0:
+            raise ValueError("Invalid field specification {0!r}".format(spec))
+        indexes = projection.setdefault(segment_type, [])
+        if indexes is not None:
+            indexes.append(index)
+    return projection
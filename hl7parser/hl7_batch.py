@@ -0,0 +1,112 @@
+"""
+Random access to the messages of large (batch) files.
+
+`HL7BatchFile` memory maps a file, scans it once for the start of every
+message and keeps an index of the message offsets together with their
+message type (MSH-9) and control id (MSH-10). Messages are only read and
+parsed when they are requested by index or slice. Batch envelope segments
+(FHS, BHS, BTS and FTS) are collected in `envelope`.
+"""
+
+import collections
+import mmap
+import re
+
+from hl7parser.hl7 import HL7Message
+
+# index entry of a single message, `start` and `end` are byte offsets
+HL7BatchEntry = collections.namedtuple(
+    "HL7BatchEntry", ["start", "end", "message_type", "control_id"])
+
+# start of a message header or envelope segment at the beginning of a line
+_SEGMENT_START = re.compile(rb"(?<![^\r\n\x0b])(MSH|FHS|BHS|BTS|FTS)")
+_LINE_END = re.compile(rb"[\r\n\x1c]|$")
+# trailing bytes stripped from messages, i.e. line and MLLP frame ends
+_MESSAGE_END = b"\r\n\x1c\x0b"
+
+
+class HL7BatchFile:
+    """
+        Indexes the messages of the file at `path`. Use it as a sequence of
+        HL7Message objects. `encoding` and `lazy` are used when parsing the
+        messages.
+
+        >>> with HL7BatchFile("tests/messages/OBR.hl7") as batch:
+        ...     print(len(batch), batch.index[0].message_type)
+        ...     print(batch[0].msa.acknowledgement_code)
+        1 ORF
+        AA
+    """
+
+    def __init__(self, path, encoding="utf-8", lazy=False):
+        self.path = path
+        self.encoding = encoding
+        self.lazy = lazy
+        # list of HL7BatchEntry objects
+        self.index = []
+        # raw envelope segments in order of appearance
+        self.envelope = []
+
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can't be mapped
+            self._mmap = b""
+        self._scan()
+
+    def _scan(self):
+        data = self._mmap
+        start = None
+        for match in _SEGMENT_START.finditer(data):
+            position = match.start()
+            if start is not None:
+                self._add_message(start, position)
+                start = None
+            if match.group(1) == b"MSH":
+                start = position
+            else:
+                end = _LINE_END.search(data, position).start()
+                self.envelope.append(data[position:end].decode(self.encoding))
+        if start is not None:
+            self._add_message(start, len(data))
+
+    def _add_message(self, start, end):
+        data = self._mmap
+        while end > start and data[end - 1] in _MESSAGE_END:
+            end -= 1
+
+        header_end = _LINE_END.search(data, start, end).start()
+        header = data[start:header_end].decode(self.encoding)
+        fields = header.split(header[3:4])
+        fields += [""] * (10 - len(fields))
+
+        self.index.append(HL7BatchEntry(start, end, fields[8], fields[9]))
+
+    def get_raw(self, index):
+        """ returns the undecoded content of the message at `index` """
+        entry = self.index[index]
+        return self._mmap[entry.start:entry.end]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return HL7Message(self.get_raw(index).decode(self.encoding), lazy=self.lazy)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,161 @@
+"""
+Columnar export of messages.
+
+`to_columns` collects the segments of many messages into one table per
+segment type. A table is a dict mapping column names to lists of values,
+ready to be passed to e.g. `pyarrow.table` or `pandas.DataFrame`. With
+`as_numpy=True` the columns are converted to NumPy arrays (NumPy has to be
+installed, e.g. with `pip install hl7parser[numpy]`).
+
+Every table has the key columns
+
+* `message_index`: position of the message in the input
+* `message_control_id`: MSH-10 of the message
+* `segment_index`: position of the segment in the message
+
+followed by one column per field, named after the field in `segment_maps`
+(e.g. `pid.patient_name`) or its number (e.g. `zb0.2`) if it has no name.
+Fields hold their raw string value, empty fields are None. Datetime fields
+are int64 microseconds since the epoch (naive datetimes are taken as UTC),
+in NumPy arrays missing datetimes are NaT, i.e. the smallest int64.
+
+>>> tables = to_columns([
+...     "MSH|^~\\\\&|LAB|FAC|EHR|FAC|20240101120000||ORU^R01|MSG1|P|2.5\\r"
+...     "OBX|1|NM|GLU||95\\rOBX|2|NM|HGB||13"
+... ])
+>>> tables["obx"]["obx.observation_value"]
+['95', '13']
+>>> tables["msh"]["msh.message_datetime"]
+[1704110400000000]
+"""
+
+from datetime import datetime, timezone
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_data_types import (
+    HL7Datetime, _parse_datetime, field_layout, field_number)
+
+KEY_COLUMNS = ("message_index", "message_control_id", "segment_index")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+# NumPy's NaT
+_MISSING_DATETIME = -(2 ** 63)
+
+# list of (index, column name, is datetime) per segment type and schema
+_layouts = {}
+
+
+def _layout(segment):
+    """ returns the columns of the predefined fields of `segment` """
+    key = (segment.type, segment.schema)
+    try:
+        return _layouts[key]
+    except KeyError:
+        pass
+    layout = _layouts[key] = [
+        (index, _column_name(segment.type, name), issubclass(data_type, HL7Datetime))
+        for index, name, data_type, _ in field_layout(segment.type, segment.schema)
+    ]
+    return layout
+
+
+def _column_name(segment_type, name):
+    return "{0}.{1}".format(segment_type.lower(), name)
+
+
+def _timestamp(value):
+    """ returns a datetime as microseconds since the epoch """
+    if value.tzinfo is None:
+        delta = value - _NAIVE_EPOCH
+    else:
+        delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _datetime_value(segment, index):
+    # the first component of the first repetition, like HL7Datetime
+    delimiters = segment.delimiters
+    value = segment.raw_field(index).partition(delimiters.rep_separator)[0]
+    parsed = _parse_datetime(value.partition(delimiters.component_separator)[0])
+    if parsed is None:
+        return None
+    return _timestamp(parsed[0])
+
+
+def _raw_value(segment, index):
+    return segment.raw_field(index) or None
+
+
+def to_columns(messages, segment_types=None, as_numpy=False):
+    """
+        Returns a dict mapping (lower case) segment types to tables of the
+        segments in `messages`, an iterable of HL7Message objects or raw
+        messages (which are parsed lazily).
+
+        :param segment_types:
+            Only export the segments of these (lower case) types
+        :param as_numpy:
+            Return NumPy arrays instead of lists
+    """
+    tables = {}
+    # number of rows per table
+    rows = {}
+    datetime_columns = set()
+
+    for message_index, message in enumerate(messages):
+        if not isinstance(message, HL7Message):
+            message = HL7Message(message, lazy=True)
+        control_id = _raw_value(message.header, 8)
+
+        for segment_index, (segment_type, segment) in enumerate(message.segments):
+            if segment_types is not None and segment_type not in segment_types:
+                continue
+
+            row = {
+                "message_index": message_index,
+                "message_control_id": control_id,
+                "segment_index": segment_index,
+            }
+            layout = _layout(segment)
+            for index, column, is_datetime in layout[:len(segment)]:
+                if is_datetime:
+                    row[column] = _datetime_value(segment, index)
+                    datetime_columns.add(column)
+                else:
+                    row[column] = _raw_value(segment, index)
+            for index in range(len(layout), len(segment)):
+                row[_column_name(segment.type, field_number(segment.type, index))] = (
+                    _raw_value(segment, index))
+
+            table = tables.setdefault(segment_type, {})
+            count = rows.get(segment_type, 0)
+            for column, values in table.items():
+                values.append(row.pop(column, None))
+            for column, value in row.items():
+                table[column] = [None] * count + [value]
+            rows[segment_type] = count + 1
+
+    if as_numpy:
+        tables = {
+            segment_type: _to_numpy(table, datetime_columns)
+            for segment_type, table in tables.items()
+        }
+    return tables
+
+
+def _to_numpy(table, datetime_columns):
+    import numpy
+
+    arrays = {}
+    for column, values in table.items():
+        if column in datetime_columns:
+            arrays[column] = numpy.array(
+                [_MISSING_DATETIME if value is None else value for value in values],
+                dtype=numpy.int64,
+            )
+        elif column in ("message_index", "segment_index"):
+            arrays[column] = numpy.array(values, dtype=numpy.int64)
+        else:
+            arrays[column] = numpy.array(values, dtype=object)
+    return arrays
@@ -1,6 +1,10 @@
 # -*- encoding: utf-8 -*-
+import functools
 import re
 from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+
+import hl7parser.hl7_intern as interning
 
 
 def make_cell_type(name, options=None, index=None):
@@ -21,6 +25,117 @@ def make_cell_type(name, options=None, index=None):
     return (name, default_options)
 
 
+class HL7Schema:
+    """
+    Compiled form of a list of field definitions as created with
+    make_cell_type, i.e. a `segment_maps` entry or a `field_map`.
+
+    Positions which are skipped by an index override are gaps of the generic
+    HL7DataType whose repetition is detected from the input.
+
+    Schemas are immutable and shared by all objects using the same
+    definitions, use compile_schema to get the schema of a definition list.
+    """
+    __slots__ = ("definitions", "types", "repeats", "named_fields", "fields")
+
+    def __init__(self, definitions):
+        # data type and repeat flag per position
+        types = []
+        repeats = []
+        # (position, name, data type) for every defined field
+        fields = []
+        named_fields = {}
+
+        index_override_found = False
+        for index, (name, options) in enumerate(definitions):
+            if options["index"] is not None:
+                position = options["index"]
+                index_override_found = True
+            else:
+                if index_override_found:
+                    raise Exception("Regular cell type after one with index override found")
+                position = index
+            if position < len(types):
+                raise Exception(
+                    "Cell type {0!r} overlaps a previous cell type".format(name))
+            while len(types) != position:
+                types.append(HL7DataType)
+                repeats.append(None)
+            types.append(options["type"])
+            repeats.append(options["repeats"])
+            fields.append((position, name, options["type"]))
+            named_fields[name] = position
+
+        set_ = super().__setattr__
+        set_("definitions", definitions)
+        set_("types", tuple(types))
+        set_("repeats", tuple(repeats))
+        set_("fields", tuple(fields))
+        set_("named_fields", MappingProxyType(named_fields))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HL7Schema objects are immutable")
+
+    def __len__(self):
+        return len(self.types)
+
+
+# compiled schemas by id of their definition list, the schema keeps a
+# reference to its definitions so the id can't be reused
+_schemas = {}
+
+
+def compile_schema(definitions):
+    """
+    returns the (cached) HL7Schema for a list of field definitions
+    """
+    try:
+        return _schemas[id(definitions)]
+    except KeyError:
+        schema = _schemas[id(definitions)] = HL7Schema(definitions)
+        return schema
+
+
+def field_number(segment_type, index):
+    """
+    returns the number of the field at `index` of a segment as used in the
+    HL7 standard, e.g. 9 for the message type of MSH segments
+    """
+    return index + (2 if segment_type == "MSH" else 1)
+
+
+# (index, name, data type, repeats) of the fields by segment type and schema
+_field_layouts = {}
+
+
+def field_layout(segment_type, schema):
+    """
+    returns the (cached) list of (index, name, data type, repeats) of every
+    position of `schema` in segments of `segment_type`, positions without name
+    are named by their field number, e.g. "2"
+    """
+    key = (segment_type, schema)
+    try:
+        return _field_layouts[key]
+    except KeyError:
+        pass
+    names = {index: name for index, name, _ in schema.fields}
+    layout = _field_layouts[key] = [
+        (index, names.get(index) or str(field_number(segment_type, index)), data_type,
+         schema.repeats[index])
+        for index, data_type in enumerate(schema.types)
+    ]
+    return layout
+
+
+def field_slots(field_map):
+    """
+    returns the __slots__ for a HL7DataType subclass with the given field_map,
+    i.e. one slot per named (sub)field
+    """
+    return tuple(name for _, name, _ in compile_schema(field_map).fields)
+
+
 class HL7DataType:
     """ Generic HL7 data type, can be used as field data type or subfield data
     type. You can inherit from this class to define your own data types. Simply
@@ -30,7 +145,15 @@ class HL7DataType:
     A field_map entry is provided as a tuple ('field_name', options) with
     options being a dict with entries 'required', 'repeats', 'type'. You can
     use make_cell_type as a helper method to create field_map entries.
+
+    Data types don't have an instance __dict__. Subclasses should declare
+    `__slots__ = field_slots(field_map)` to store their (sub)fields compactly.
+
+    Data types are pickled as their string representation and parsed again
+    when they are unpickled.
     """
+    __slots__ = ("delimiters", "delimiter", "input_fields", "value")
+
     field_map = None
 
     def __init__(
@@ -40,13 +163,19 @@ class HL7DataType:
         self.delimiter = getattr(self.delimiters, use_delimiter)
 
         self.input_fields = composite.split(self.delimiter)
+        pool = interning._pool
+        if pool is not None and (
+                len(self.input_fields) > 1 or use_delimiter == "component_separator"):
+            # a single subcomponent was interned with the components already
+            pool.intern_all(self.input_fields)
 
         if self.field_map:
             self.set_attributes(self.field_map, self.input_fields)
         else:
             # if no field_map is given, treat this as a generic data type
             if not self.delimiter in composite:
-                self.value = composite
+                # the (possibly shared) value
+                self.value = self.input_fields[0]
             else:
                 for index, value in enumerate(self.input_fields):
                     self.input_fields[index] = HL7DataType(
@@ -67,15 +196,23 @@ class HL7DataType:
                     str(x) for x in self.input_fields)
         else:
             attrs = []
-            # collect all attributes which are defined
-            for attr, options in self.field_map:
+            # collect all attributes which are defined, at their positions
+            for index, attr, _ in compile_schema(self.field_map).fields:
                 value = getattr(self, attr)
-                if value is not None:
-                    attrs.append(value)
-                else:
+                if value is None:
                     break
+                # gaps of index overrides keep their input
+                attrs.extend(self.input_fields[len(attrs):index])
+                attrs.append(value)
             return self.delimiter.join(map(str, attrs))
 
+    def __reduce__(self):
+        delimiters = self.delimiters
+        use_delimiter = next(
+            name for name in type(delimiters).__slots__
+            if getattr(delimiters, name) == self.delimiter)
+        return (type(self), (str(self), delimiters, use_delimiter))
+
     def set_attributes(self, field_definitions, field_input):
         """
             sets the data in field_input to instance attributes
@@ -83,10 +220,8 @@ class HL7DataType:
         """
 
         input_length = len(field_input)
-        for index, definition in enumerate(field_definitions):
-            name = definition[0]
+        for index, name, DataType in compile_schema(field_definitions).fields:
             if index < input_length:
-                DataType = definition[1]["type"]
                 setattr(
                     self, name,
                     DataType(
@@ -116,6 +251,8 @@ class HL7DataType:
 
 class HL7RepeatingField:
     """ generic repeating field """
+    __slots__ = ("delimiters", "list_")
+
     def __init__(self, Type, composite, delimiters):
 
         self.delimiters = delimiters
@@ -134,6 +271,9 @@ class HL7RepeatingField:
     def __str__(self):
         return self.delimiters.rep_separator.join(map(str, self.list_))
 
+    def __reduce__(self):
+        return (type(self), (type(self.list_[0]), str(self), self.delimiters))
+
 class HL7_ExtendedPersonName(HL7DataType):
     """
         extended person name
@@ -151,6 +291,54 @@ class HL7_ExtendedPersonName(HL7DataType):
         make_cell_type('name_representation_code'),
         make_cell_type('name_context')
     ]
+    __slots__ = field_slots(field_map)
+
+
+_DATETIME = re.compile(r'(?P<base>\d+)(?P<microseconds>\.\d+)?(?P<timezone>[+-]\d+)?')
+
+
+@functools.lru_cache(maxsize=64)
+def _get_timezone(offset):
+    """ returns the shared timezone for an offset like +0100 """
+    sign = -1 if offset[0] == "-" else 1
+    return timezone(sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_datetime(value):
+    """
+    Parses a DTM value and returns a tuple of the datetime, its precision and
+    whether it has microseconds and timezone information, None if the value
+    is empty or invalid.
+
+    Feeds usually repeat the same timestamps (e.g. in every OBX segment), so
+    the results for the most recently used values are cached. datetime
+    objects are immutable and can be shared by all HL7Datetime instances.
+    """
+    m = _DATETIME.match(value)
+    if not m:
+        return None
+
+    base, fraction, offset = m.groups()
+    precision = len(base)
+    if fraction:
+        precision += len(fraction) - 1
+
+    year = int(value[0:4])
+    month = int(value[4:6]) if precision >= 6 else 1
+    day = int(value[6:8]) if precision >= 8 else 1
+    hour = int(value[8:10]) if precision >= 10 else 0
+    minute = int(value[10:12]) if precision >= 12 else 0
+    second = int(value[12:14]) if precision >= 14 else 0
+    microseconds = int(float(fraction) * 1_000_000) if fraction else 0
+    tzinfo = _get_timezone(offset) if offset else None
+
+    return (
+        datetime(year, month, day, hour, minute, second, microseconds, tzinfo),
+        precision,
+        bool(fraction),
+        bool(offset),
+    )
 
 
 class HL7Datetime(HL7DataType):
@@ -165,62 +353,27 @@ class HL7Datetime(HL7DataType):
         example input:
             198808181126
     """
+    __slots__ = (
+        "datetime", "isNull", "hasTimeZoneInfo", "hasMicrosecondsInfo", "precision")
+
     component_map = ['datetime']
 
-    datetime = None
+    # pickled with the parsed datetime, datetimes don't keep their delimiters
+    __reduce__ = object.__reduce__
 
     def __init__(self, composite, delimiters, use_delimiter="component_separator"):
         delimiter = getattr(delimiters, use_delimiter)
-        composite = composite.split(delimiter)
-        composite = composite[0]
-
-        self.hasTimeZoneInfo = False
-        self.hasMicrosecondsInfo = False
+        parsed = _parse_datetime(composite.partition(delimiter)[0])
 
-        m = re.match(r'(?P<base>\d+)(?P<microseconds>\.\d+)?(?P<timezone>[+-]\d+)?', composite)
-
-        if not m:
+        if parsed is None:
+            self.datetime = None
             self.isNull = True
+            self.hasTimeZoneInfo = False
+            self.hasMicrosecondsInfo = False
             return
 
-        precision = len(m.group('base'))
-        if m.group('microseconds'):
-            self.hasMicrosecondsInfo = True
-            precision += len(m.group('microseconds')) - 1
-        year = int(composite[0:4])
-
-        if precision >= 6: month = int(composite[4:6])  # noqa
-        else: month = 1  #noqa
-
-        if precision >= 8: day = int(composite[6:8])  # noqa
-        else: day = 1  #noqa
-
-        if precision >= 10: hour = int(composite[8:10])  #noqa
-        else: hour = 0  #noqa
-
-        if precision >= 12: minute = int(composite[10:12])  # noqa
-        else: minute = 0  # noqa
-
-        if precision >= 14: second = int(composite[12:14])  # noqa
-        else: second = 0  # noqa
-
-        # parse timezone and microsecond information
-        microseconds = 0
-        tzinfo = None
-
-        if m.group("microseconds"):
-            microseconds = int(float(m.group("microseconds")) * 1_000_000)
-        if m.group("timezone"):
-            self.hasTimeZoneInfo = True
-            tz = m.group("timezone")
-            sign = -1 if tz[0] == "-" else 1
-            tzinfo = timezone(sign * timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])))
-
-        self.datetime = datetime(
-            year, month, day, hour, minute, second, microseconds, tzinfo
-        )
+        self.datetime, self.precision, self.hasMicrosecondsInfo, self.hasTimeZoneInfo = parsed
         self.isNull = False
-        self.precision = precision
 
     def isoformat(self):
         if self.isNull:
@@ -255,6 +408,8 @@ class HL7Datetime(HL7DataType):
 
 
 class HL7_SI(HL7DataType):
+    __slots__ = ()
+
     component_map = ['sequence_id']
 
 
@@ -275,6 +430,7 @@ class HL7_ExtendedCompositeId(HL7DataType):
         make_cell_type('security_check'),
         make_cell_type('security_check_scheme')
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_CodedWithException(HL7DataType):
@@ -293,6 +449,7 @@ class HL7_CodedWithException(HL7DataType):
         # NOTE: standard defines more fields which can be added if needed in
         # the future
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_StreetAddress(HL7DataType):
@@ -303,6 +460,7 @@ class HL7_StreetAddress(HL7DataType):
         make_cell_type('street_name'),
         make_cell_type('dwelling_number')
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_ExtendedAddress(HL7DataType):
@@ -331,6 +489,7 @@ class HL7_ExtendedAddress(HL7DataType):
         make_cell_type('protection_code'),
         make_cell_type('address_identifier')
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_ProcessingType(HL7DataType):
@@ -339,6 +498,7 @@ class HL7_ProcessingType(HL7DataType):
         make_cell_type('processing_id', options={"required": True}),
         make_cell_type('processing_mode')
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_VersionIdentifier(HL7DataType):
@@ -352,6 +512,7 @@ class HL7_VersionIdentifier(HL7DataType):
                        options={"type": HL7_CodedWithException}),
 
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_MessageType(HL7DataType):
@@ -362,6 +523,7 @@ class HL7_MessageType(HL7DataType):
         make_cell_type('trigger_event', options={"required": True}),
         make_cell_type('message_structure', options={"required": True})
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_PersonLocation(HL7DataType):
@@ -380,6 +542,7 @@ class HL7_PersonLocation(HL7DataType):
         make_cell_type('comprehensive_location_identifier'),
         make_cell_type('assigning_authority_for_location'),
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_XCN_ExtendedCompositeID(HL7DataType):
@@ -395,6 +558,7 @@ class HL7_XCN_ExtendedCompositeID(HL7DataType):
         # NOTE: standard defines more fields which can be added if needed in
         # the future
     ]
+    __slots__ = field_slots(field_map)
 
 
 class HL7_FinancialClass(HL7DataType):
@@ -403,3 +567,4 @@ class HL7_FinancialClass(HL7DataType):
         make_cell_type("financial_class_code", options={"type": HL7_CodedWithException}),
         make_cell_type("effective_date", options={"type": HL7Datetime}),
     ]
+    __slots__ = field_slots(field_map)
@@ -0,0 +1,248 @@
+"""
+Detecting retransmitted messages.
+
+Senders resend messages whose acknowledgement got lost or timed out.
+`HL7DedupCache` remembers the messages seen within `ttl` seconds by sending
+application, sending facility and message control id (MSH-3, MSH-4 and
+MSH-10). The key of a raw message is read with `peek_header`, so duplicates
+are detected without parsing them.
+
+The cache keeps at most `max_size` keys in memory, the least recently seen
+ones are evicted first. `SQLiteDedupCache` stores the keys in a sqlite
+database instead, which keeps them across restarts.
+
+>>> cache = HL7DedupCache(max_size=1000, ttl=3600)
+>>> raw = "MSH|^~\\\\&|LAB|HOSP|EHR|HOSP|20240101120000||ORU^R01|MSG1|P|2.5"
+>>> cache.is_duplicate(raw), cache.is_duplicate(raw)
+(False, True)
+>>> cache.hits, cache.misses
+(1, 1)
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_routing import peek_header
+
+# field indexes of MSH-3, MSH-4 and MSH-10 in HL7Segment
+_KEY_FIELDS = (1, 2, 8)
+
+
+def message_key(message, encoding=None):
+    """
+        Returns the deduplication key of a message (str, bytes-like object or
+        HL7Message), None if it has no message control id.
+    """
+    if isinstance(message, HL7Message):
+        header = message.msh
+    else:
+        header, _ = peek_header(message, encoding, lazy=True)
+    sending_application, sending_facility, control_id = [
+        header.raw_field(index) for index in _KEY_FIELDS]
+    if not control_id:
+        return None
+    # NUL can't be part of a field, unlike the field separator of messages
+    # using other delimiters
+    return "\x00".join((sending_application, sending_facility, control_id))
+
+
+class HL7DedupCache:
+    """
+        Remembers the keys (see `message_key`) of messages for `ttl` seconds
+        (None to remember them until they are evicted), at most `max_size`
+        of them. Seeing a key again restarts its time to live.
+
+        `hits` counts the duplicates found, `misses` the keys which weren't
+        found, `evictions` the keys removed because the cache was full and
+        `expirations` those removed after their time to live.
+
+        :param clock:
+            Function returning the current time in seconds
+    """
+
+    def __init__(self, max_size=100000, ttl=3600.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        # key: expiry time, in the order the keys were last seen, which is
+        # the order they expire in as well
+        self._keys = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expires(self, now):
+        return math.inf if self.ttl is None else now + self.ttl
+
+    def seen(self, key):
+        """ returns whether `key` was seen and didn't expire yet """
+        with self._lock:
+            now = self.clock()
+            if self._touch(key, now):
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key):
+        """ remembers `key` """
+        with self._lock:
+            self._add(key, self.clock())
+
+    def discard(self, key):
+        """
+            forgets `key`, e.g. if processing the message failed and a
+            retransmission should be processed again
+        """
+        with self._lock:
+            self._discard(key)
+
+    def is_duplicate(self, message, encoding=None):
+        """
+            Returns whether the message (str, bytes-like object or
+            HL7Message) was seen before and remembers it otherwise. Messages
+            without message control id are never duplicates.
+        """
+        key = message_key(message, encoding)
+        if key is None:
+            return False
+        with self._lock:
+            now = self.clock()
+            if self._touch(key, now):
+                self.hits += 1
+                return True
+            self.misses += 1
+            self._add(key, now)
+            return False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def snapshot(self):
+        """ returns the counters and the number of keys as dict """
+        with self._lock:
+            return {
+                "size": len(self),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # the storage, called with the lock held
+
+    def _touch(self, key, now):
+        """ returns whether `key` is stored and restarts its time to live """
+        keys = self._keys
+        expires = keys.get(key)
+        if expires is None:
+            return False
+        if expires <= now:
+            del keys[key]
+            self.expirations += 1
+            return False
+        keys[key] = self._expires(now)
+        keys.move_to_end(key)
+        return True
+
+    def _add(self, key, now):
+        keys = self._keys
+        keys[key] = self._expires(now)
+        keys.move_to_end(key)
+        while keys:
+            oldest = next(iter(keys))
+            if keys[oldest] <= now:
+                self.expirations += 1
+            elif len(keys) > self.max_size:
+                self.evictions += 1
+            else:
+                break
+            del keys[oldest]
+
+    def _discard(self, key):
+        self._keys.pop(key, None)
+
+
+class SQLiteDedupCache(HL7DedupCache):
+    """
+        `HL7DedupCache` storing the keys in the sqlite database `path`, in
+        the order they were last seen by rowid. The time to live is measured
+        with the wall clock by default, so keys expire while no process uses
+        the database.
+    """
+
+    def __init__(self, path, max_size=1000000, ttl=86400.0, clock=time.time):
+        super().__init__(max_size, ttl, clock)
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            # keys survive crashes of the application, only a power loss may
+            # lose the most recent ones
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS hl7_dedup (key TEXT PRIMARY KEY, expires REAL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS hl7_dedup_expires ON hl7_dedup (expires)")
+        self._size = self._connection.execute("SELECT COUNT(*) FROM hl7_dedup").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def _touch(self, key, now):
+        connection = self._connection
+        row = connection.execute(
+            "SELECT expires FROM hl7_dedup WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        with connection:
+            if row[0] <= now:
+                connection.execute("DELETE FROM hl7_dedup WHERE key = ?", (key,))
+                self._size -= 1
+                self.expirations += 1
+                return False
+            # a new rowid makes it the most recently seen key
+            connection.execute(
+                "INSERT OR REPLACE INTO hl7_dedup VALUES (?, ?)", (key, self._expires(now)))
+        return True
+
+    def _add(self, key, now):
+        connection = self._connection
+        with connection:
+            self._size -= connection.execute(
+                "DELETE FROM hl7_dedup WHERE key = ?", (key,)).rowcount
+            connection.execute(
+                "INSERT INTO hl7_dedup VALUES (?, ?)", (key, self._expires(now)))
+            self._size += 1
+            expired = connection.execute(
+                "DELETE FROM hl7_dedup WHERE expires <= ?", (now,)).rowcount
+            self._size -= expired
+            self.expirations += expired
+            excess = self._size - self.max_size
+            if excess > 0:
+                connection.execute(
+                    "DELETE FROM hl7_dedup WHERE key IN "
+                    "(SELECT key FROM hl7_dedup ORDER BY rowid LIMIT ?)", (excess,))
+                self._size -= excess
+                self.evictions += excess
+
+    def _discard(self, key):
+        with self._connection:
+            self._size -= self._connection.execute(
+                "DELETE FROM hl7_dedup WHERE key = ?", (key,)).rowcount
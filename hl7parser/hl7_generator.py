@@ -0,0 +1,255 @@
+"""
+Generating synthetic messages, e.g. for load tests.
+
+`HL7Generator` creates fake messages from the definitions in `segment_maps`
+and the `field_map`s of the data types, so every generated message can be
+parsed. The output only depends on the seed and the configuration:
+
+* `segments` and `observations` define the shape of the message, i.e. the
+  segments following MSH and the number of OBX segments appended to them
+* `fill_ratio` is the probability of an optional field or component to be
+  filled, required ones always are
+* repeating fields get between one and `max_repeats` repetitions
+* `escape_ratio` is the probability of a text value to contain delimiters,
+  which are escaped
+* timestamps have `datetime_precision` digits (4 for the year up to 14 for
+  seconds, more add fractions of a second) and `timezone` is appended
+* if `variants` is set, only that many different segments are generated per
+  segment type and set id and then reused, which is a lot faster. Control
+  ids and MSH segments are still unique.
+
+>>> generator = HL7Generator(seed=1, segments=["PID"], observations=2)
+>>> message = generator.message()
+>>> message.split("\\r")[0]
+'MSH|^~\\\\&|LAB|HOSP|EHR|HOSP|20040111092352||ORU^R01^ORU_R01|00000001|P|2.5'
+>>> [line[:3] for line in message.split("\\r")]
+['MSH', 'PID', 'OBX', 'OBX']
+"""
+
+import random
+
+from hl7parser.hl7 import escape, get_delimiters
+from hl7parser.hl7_data_types import HL7Datetime, compile_schema
+from hl7parser.hl7_segments import segment_maps
+from hl7parser.hl7_stream import write_messages
+
+FAMILY_NAMES = [
+    "SMITH", "MUELLER", "GARCIA", "NGUYEN", "SCHMIDT", "JOHNSON", "ROSSI", "KOWALSKI",
+    "DUBOIS", "JANSEN", "SILVA", "WAGNER", "BROWN", "FISCHER", "LOPEZ", "WEBER",
+]
+GIVEN_NAMES = [
+    "ANNA", "JOHN", "MARIA", "PETER", "SOFIA", "DAVID", "LENA", "PAUL",
+    "EMMA", "LUCAS", "JULIA", "FELIX", "CLARA", "JONAS", "MIA", "NOAH",
+]
+CITIES = ["BERLIN", "SPRINGFIELD", "HAMBURG", "BIRMINGHAM", "MUNICH", "LYON", "PORTO"]
+STREETS = ["MAIN ST", "HAUPTSTRASSE", "ELM ST", "BAHNHOFSTR", "OAK AVE", "RUE DE LA PAIX"]
+UNITS = ["mg/dl", "mmol/l", "g/dl", "%", "U/l", "10*9/l"]
+WORDS = [
+    "GLUCOSE", "HEMOGLOBIN", "CHEST", "ROUTINE", "STAT", "WARD", "CLINIC", "REVIEW",
+    "NORMAL", "FOLLOW UP", "SAMPLE", "RESULT", "ORDER", "VISIT", "NOTE", "CARDIOLOGY",
+]
+
+# values for fields and components by name
+_CHOICES = {
+    "family_name": FAMILY_NAMES,
+    "given_name": GIVEN_NAMES,
+    "second_name": GIVEN_NAMES,
+    "middle_name": GIVEN_NAMES,
+    "city": CITIES,
+    "street_or_mailing_address": STREETS,
+    "units": UNITS,
+    "administrative_sex": ["F", "M", "U"],
+    "value_type": ["NM"],
+    "abnormal_flags": ["N", "H", "L"],
+    "observation_result_status": ["F", "P", "C"],
+    "country": ["DE", "US", "FR"],
+}
+
+
+class HL7Generator:
+    """
+        Generates messages consisting of a MSH segment, the `segments`
+        following it and `observations` OBX segments. Segments have to be
+        defined in `segment_maps`.
+
+        :param seed:
+            Seed of the random numbers, the same seed and configuration
+            always generate the same messages
+    """
+
+    def __init__(
+        self,
+        seed=None,
+        segments=("EVN", "PID", "PV1", "OBR"),
+        observations=5,
+        message_type="ORU^R01^ORU_R01",
+        fill_ratio=0.5,
+        max_repeats=2,
+        escape_ratio=0.0,
+        datetime_precision=14,
+        timezone="",
+        delimiters=None,
+        variants=None,
+    ):
+        for segment_type in segments:
+            if segment_type not in segment_maps or segment_type == "MSH":
+                raise ValueError("Can't generate {0!r} segments".format(segment_type))
+        if not 4 <= datetime_precision <= 18:
+            raise ValueError("datetime_precision has to be between 4 and 18")
+
+        self.random = random.Random(seed)
+        self.structure = list(segments) + ["OBX"] * observations
+        self.message_type = message_type
+        self.fill_ratio = fill_ratio
+        self.max_repeats = max_repeats
+        self.escape_ratio = escape_ratio
+        self.datetime_precision = datetime_precision
+        self.timezone = timezone
+        self.delimiters = delimiters or get_delimiters()
+        self.variants = variants
+        # number of generated messages, used as control id
+        self.count = 0
+        # functions generating the fields of a segment type
+        self._plans = {}
+        # generated segments by segment type and set id if `variants` is set
+        self._pools = {}
+
+    def message(self):
+        """ returns a new message with carriage returns as segment separators """
+        self.count += 1
+        separator = self.delimiters.field_separator
+        segments = [separator.join([
+            "MSH",
+            str(self.delimiters)[1:],
+            "LAB", "HOSP", "EHR", "HOSP",
+            self._timestamp(),
+            "",
+            self.message_type,
+            "{0:08d}".format(self.count),
+            "P",
+            "2.5",
+        ])]
+        occurrences = {}
+        for segment_type in self.structure:
+            set_id = occurrences[segment_type] = occurrences.get(segment_type, 0) + 1
+            if self.variants is None:
+                segments.append(self.segment(segment_type, set_id))
+                continue
+            pool = self._pools.setdefault((segment_type, set_id), [])
+            if len(pool) < self.variants:
+                pool.append(self.segment(segment_type, set_id))
+                segments.append(pool[-1])
+            else:
+                segments.append(self._choice(pool))
+        return "\r".join(segments)
+
+    def messages(self, count=None):
+        """ yields `count` new messages, endlessly if no count is given """
+        generated = 0
+        while count is None or generated < count:
+            yield self.message()
+            generated += 1
+
+    def write(self, fp, count, framing="newline", encoding="utf-8"):
+        """
+            Writes `count` new messages to the file-like object `fp`, see
+            `write_messages` for the framings.
+        """
+        return write_messages(fp, self.messages(count), framing, encoding)
+
+    def segment(self, segment_type, set_id=1):
+        """ returns a new segment of type `segment_type` """
+        try:
+            plan = self._plans[segment_type]
+        except KeyError:
+            plan = self._plans[segment_type] = self._plan(
+                segment_maps[segment_type], 0, segment_type)
+        fields = plan(set_id)
+        return self.delimiters.field_separator.join([segment_type] + fields)
+
+    def _plan(self, definitions, depth, segment_type=None):
+        """
+            Returns a function generating the list of (sub)components or
+            fields defined by `definitions`.
+        """
+        schema = compile_schema(definitions)
+        options = dict(definitions)
+        parts = []
+        for position, name, data_type in schema.fields:
+            # set ids are always filled to number repeated segments
+            required = options[name]["required"] or name.startswith("set_id")
+            repeats = segment_type is not None and schema.repeats[position]
+            parts.append((position, required, repeats, self._value(name, data_type, depth)))
+        length = len(schema)
+        random = self.random.random
+        fill_ratio = self.fill_ratio
+        max_repeats = self.max_repeats
+        rep_separator = self.delimiters.rep_separator
+
+        def generate(set_id):
+            values = [""] * length
+            last = -1
+            for position, required, repeats, value in parts:
+                if not required and random() >= fill_ratio:
+                    continue
+                if repeats:
+                    values[position] = rep_separator.join([
+                        value(set_id) for _ in range(1 + int(random() * max_repeats))])
+                else:
+                    values[position] = value(set_id)
+                last = position
+            # trailing empty values are left out
+            del values[last + 1:]
+            return values
+
+        return generate
+
+    def _value(self, name, data_type, depth):
+        """ returns a function generating the value of a (sub)component """
+        if issubclass(data_type, HL7Datetime):
+            return lambda set_id: self._timestamp()
+        if data_type.field_map:
+            plan = self._plan(data_type.field_map, depth + 1)
+            if depth == 0:
+                separator = self.delimiters.component_separator
+            else:
+                separator = self.delimiters.subcomponent_separator
+            return lambda set_id: separator.join(plan(set_id))
+        random = self.random.random
+        if name.startswith("set_id"):
+            return str
+        if name in _CHOICES:
+            return lambda set_id, choices=_CHOICES[name]: self._choice(choices)
+        if name == "observation_value":
+            return lambda set_id: "{0:.1f}".format(1 + random() * 199)
+        if name.endswith(("_id", "_number", "id_number", "identifier")):
+            return lambda set_id: str(10000 + int(random() * 99990000))
+        return self._text
+
+    def _choice(self, choices):
+        # faster than random.choice
+        return choices[int(self.random.random() * len(choices))]
+
+    def _text(self, set_id):
+        value = self._choice(WORDS)
+        if self.escape_ratio and self.random.random() < self.escape_ratio:
+            # one of the delimiters or the escape character
+            value += self._choice(str(self.delimiters)) + self._choice(WORDS)
+            value = escape(value, self.delimiters)
+        return value
+
+    def _timestamp(self):
+        # seconds within 30 years of 12 months with 28 days each
+        seconds = int(self.random.random() * 30 * 12 * 28 * 86400)
+        days, seconds = divmod(seconds, 86400)
+        months, day = divmod(days, 28)
+        year, month = divmod(months, 12)
+        hour, seconds = divmod(seconds, 3600)
+        minute, second = divmod(seconds, 60)
+        value = "{0:04d}{1:02d}{2:02d}{3:02d}{4:02d}{5:02d}".format(
+            2000 + year, month + 1, day + 1, hour, minute, second,
+        )[:self.datetime_precision]
+        if self.datetime_precision > 14:
+            value += ".{0:04d}".format(int(self.random.random() * 10000))[
+                :self.datetime_precision - 13]
+        return value + self.timezone
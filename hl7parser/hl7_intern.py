@@ -0,0 +1,124 @@
+"""
+Sharing repeated field values between parsed messages.
+
+Values like coding systems, units, facilities or status codes repeat in
+almost every message, but every parsed message holds its own copy of them.
+While a `HL7InternPool` is installed, short component and subcomponent
+values are looked up in the pool when data types split their fields, and
+equal values of all messages parsed from now on share a single string.
+
+The pool is bounded: once it holds `max_size` values, new values are no
+longer added, values already in the pool are still shared. Interning is
+applied to all messages parsed in the process while the pool is installed,
+with `with pool:` only within the block.
+
+>>> from hl7parser.hl7 import HL7Message
+>>> raw = "MSH|^~\\\\&|LAB|HOSP|||20240101||ORU^R01|{0}|P|2.5\\rOBX|1|NM|GLU||95|mg/dl"
+>>> with HL7InternPool() as pool:
+...     first, second = HL7Message(raw.format(1)), HL7Message(raw.format(2))
+>>> first.obx.units.input_fields[0] is second.obx.units.input_fields[0]
+True
+>>> pool.hits > 0, pool.saved_bytes > 0
+(True, True)
+"""
+
+from sys import getsizeof
+
+
+class HL7InternPool:
+    """
+        Pool of shared strings, see the module documentation.
+
+        `hits` counts the values replaced by a shared one, `misses` those
+        which weren't in the pool yet and `saved_bytes` the size of the
+        replaced strings. The counters are approximate if messages are
+        parsed in several threads.
+
+        :param max_size:
+            Maximal number of values in the pool
+        :param max_length:
+            Only values of 2 to `max_length` characters are interned, single
+            characters and empty strings are shared by Python anyway
+    """
+
+    def __init__(self, max_size=100000, max_length=32):
+        self.max_size = max_size
+        self.max_length = max_length
+        self._values = {}
+        self._previous = []
+        self.hits = 0
+        self.misses = 0
+        self.saved_bytes = 0
+
+    def intern(self, value):
+        """ returns the shared string equal to `value` """
+        return self.intern_all([value])[0]
+
+    def intern_all(self, values):
+        """ replaces the strings in the list `values` by shared ones """
+        pool = self._values
+        max_length = self.max_length
+        index = 0
+        for value in values:
+            if 1 < len(value) <= max_length:
+                shared = pool.get(value)
+                if shared is not value:
+                    if shared is None:
+                        self.misses += 1
+                        if len(pool) < self.max_size:
+                            pool[value] = value
+                    else:
+                        values[index] = shared
+                        self.hits += 1
+                        self.saved_bytes += getsizeof(value)
+            index += 1
+        return values
+
+    def clear(self):
+        """ removes all values from the pool and resets the counters """
+        self._values = {}
+        self.hits = self.misses = self.saved_bytes = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def snapshot(self):
+        """ returns the counters and the number of values as dict """
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_bytes": self.saved_bytes,
+        }
+
+    def __enter__(self):
+        # pools may be nested
+        self._previous.append(_pool)
+        return enable_interning(self)
+
+    def __exit__(self, *exc_info):
+        global _pool
+        _pool = self._previous.pop()
+
+
+# the installed pool, None if interning is disabled
+_pool = None
+
+
+def enable_interning(pool=None):
+    """
+        Installs `pool` (a new `HL7InternPool` if not given) for all
+        messages parsed from now on and returns it.
+    """
+    global _pool
+    if pool is None:
+        pool = HL7InternPool()
+    _pool = pool
+    return pool
+
+
+def disable_interning():
+    """ stops interning values and returns the installed pool """
+    global _pool
+    pool, _pool = _pool, None
+    return pool
@@ -0,0 +1,215 @@
+"""
+Converting messages to dicts and JSON.
+
+`to_dict` converts a message into a dict mapping the (lower case) segment
+types to lists of their segments. A segment is a dict of its non-empty
+fields, named after the field in `segment_maps` or numbered (e.g. `"2"`) if
+the field has no name. The values are:
+
+* data types with a `field_map` (e.g. `HL7_ExtendedPersonName`): dicts of
+  their non-empty components
+* `HL7Datetime`: ISO 8601 strings (see `HL7Datetime.isoformat`)
+* other values: their raw string (HL7 escape sequences are kept), values
+  containing components or subcomponents become lists of them
+* repeating fields: lists of their repetitions
+
+The fields are converted from their raw text with converters compiled once
+per data type from the `segment_maps` and `field_map` definitions, the data
+type objects aren't created. Modified fields are rendered first.
+
+>>> message = to_dict(
+...     "MSH|^~\\\\&|LAB|FAC|EHR|FAC|20240101120000||ORU^R01|MSG1|P|2.5\\r"
+...     "PID|1||4711^^^HOSP^MR||DOE^JANE\\r"
+...     "OBX|1|NM|GLU^Glucose||95|mg/dl")
+>>> message["pid"][0]["patient_name"]
+[{'family_name': 'DOE', 'given_name': 'JANE'}]
+>>> message["msh"][0]["message_datetime"]
+['2024-01-01T12:00:00']
+>>> message["obx"][0]["observation_identifier"]
+['GLU', 'Glucose']
+"""
+
+import io
+import json
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_data_types import (
+    HL7DataType, HL7Datetime, compile_schema, field_layout, field_number)
+
+# converters by data type
+_converters = {}
+# list of (index, key, converter, repeats) per segment type and schema
+_layouts = {}
+
+
+def _convert_generic(value, delimiters, use_delimiter):
+    delimiter = getattr(delimiters, use_delimiter)
+    if delimiter not in value:
+        return value
+    subcomponent_separator = delimiters.subcomponent_separator
+    return [
+        part if subcomponent_separator not in part else part.split(subcomponent_separator)
+        for part in value.split(delimiter)
+    ]
+
+
+def _convert_datetime(data_type):
+    def convert(value, delimiters, use_delimiter):
+        return data_type(value, delimiters, use_delimiter).isoformat()
+    return convert
+
+
+def _convert_composite(field_map):
+    fields = [
+        (index, name, _converter(data_type))
+        for index, name, data_type in compile_schema(field_map).fields
+    ]
+
+    def convert(value, delimiters, use_delimiter):
+        parts = value.split(getattr(delimiters, use_delimiter))
+        length = len(parts)
+        result = {}
+        for index, name, converter in fields:
+            if index < length and parts[index]:
+                converted = converter(parts[index], delimiters, "subcomponent_separator")
+                if converted:
+                    result[name] = converted
+        return result
+    return convert
+
+
+def _convert_object(data_type):
+    def convert(value, delimiters, use_delimiter):
+        return _from_object(data_type(value, delimiters, use_delimiter))
+    return convert
+
+
+def _from_object(value):
+    """ converts a data type object with a custom constructor """
+    if not value.field_map:
+        return str(value)
+    result = {}
+    for _, name, _ in compile_schema(value.field_map).fields:
+        component = getattr(value, name)
+        if component is not None:
+            converted = _from_object(component)
+            if converted:
+                result[name] = converted
+    return result
+
+
+def _converter(data_type):
+    """
+        returns the function converting the raw value of `data_type`, called
+        with the value, the delimiters and the name of the delimiter
+        separating its components
+    """
+    try:
+        return _converters[data_type]
+    except KeyError:
+        pass
+    if issubclass(data_type, HL7Datetime):
+        converter = _convert_datetime(data_type)
+    elif data_type.__init__ is not HL7DataType.__init__:
+        converter = _convert_object(data_type)
+    elif data_type.field_map:
+        converter = _convert_composite(data_type.field_map)
+    else:
+        converter = _convert_generic
+    converter = _converters[data_type] = converter
+    return converter
+
+
+def _layout(segment):
+    """ returns the converters of the predefined fields of `segment` """
+    key = (segment.type, segment.schema)
+    try:
+        return _layouts[key]
+    except KeyError:
+        pass
+    layout = _layouts[key] = [
+        (index, name, _converter(data_type), repeats)
+        for index, name, data_type, repeats in field_layout(segment.type, segment.schema)
+    ]
+    return layout
+
+
+def segment_to_dict(segment):
+    """ returns the dict of the non-empty fields of the HL7Segment `segment` """
+    delimiters = segment.delimiters
+    rep_separator = delimiters.rep_separator
+    layout = _layout(segment)
+    defined = len(layout)
+    values = segment.raw_fields()
+    result = {}
+    if segment.type == "MSH" and values and values[0]:
+        # the encoding characters aren't structured by the delimiters
+        result[layout[0][1]] = values[0]
+        values[0] = ""
+    for index, value in enumerate(values):
+        if not value:
+            continue
+        if index < defined:
+            _, key, converter, repeats = layout[index]
+        else:
+            key = str(field_number(segment.type, index))
+            converter, repeats = _convert_generic, None
+        if repeats is None:
+            # undefined fields repeat if the input contains repetitions
+            repeats = rep_separator in value
+        if repeats:
+            converted = [
+                converter(repetition, delimiters, "component_separator")
+                for repetition in value.split(rep_separator)
+            ]
+            if not any(converted):
+                continue
+        else:
+            converted = converter(value, delimiters, "component_separator")
+            if not converted:
+                continue
+        result[key] = converted
+    return result
+
+
+def to_dict(message):
+    """
+        Returns the dict of the HL7Message `message` (raw messages are parsed
+        lazily), see the module documentation.
+    """
+    if not isinstance(message, HL7Message):
+        message = HL7Message(message, lazy=True)
+    result = {}
+    for segment_type, segment in message.segments:
+        converted = segment_to_dict(segment)
+        try:
+            result[segment_type].append(converted)
+        except KeyError:
+            result[segment_type] = [converted]
+    return result
+
+
+def to_json(message, **kwargs):
+    """
+        Returns the JSON representation of `to_dict(message)`, `kwargs` are
+        passed on to `json.dumps`.
+    """
+    return json.dumps(to_dict(message), **kwargs)
+
+
+def write_ndjson(fp, messages, encoding="utf-8"):
+    """
+        Writes the HL7Message objects (or raw messages) of the iterable
+        `messages` as newline delimited JSON to the file-like object `fp`,
+        one line per message, and returns the number of written messages.
+
+        :param encoding:
+            The encoding used for binary files
+    """
+    text = isinstance(fp, io.TextIOBase)
+    count = 0
+    for message in messages:
+        line = json.dumps(to_dict(message), ensure_ascii=False) + "\n"
+        fp.write(line if text else line.encode(encoding))
+        count += 1
+    return count
@@ -0,0 +1,243 @@
+"""
+asyncio based MLLP server.
+
+`MLLPServer` accepts connections using the minimal lower layer protocol,
+parses every received message into an `HL7Message`, passes it to an async
+handler and replies with an acknowledgement built from the inbound MSH
+segment:
+
+* `AA` if the handler returned successfully
+* `AE` if the handler raised an exception
+* `AR` if the message couldn't be parsed
+
+The text of `AE` and `AR` acknowledgements (MSA-3) is fixed, the exception is
+only logged. Pass `error_text` to send e.g. the message of exceptions raised
+by the handler.
+
+The handler may return its own response (a `HL7Message` or string) which is
+sent instead of the generated acknowledgement. Messages are serialized with
+`HL7Message.write_to`, i.e. modifications are included.
+
+Received messages are decoded with the character set given in MSH-18 unless
+an `encoding` is given, responses are encoded in their own encoding (utf-8
+for strings and generated acknowledgements).
+
+Messages of a connection are processed one after another and the next data
+is only read once the response was sent, so slow handlers push back on the
+senders. `max_concurrency` limits the number of handlers running at the same
+time across all connections. Connections sending a message larger than
+`max_message_size` bytes are closed.
+
+With a `dedup` cache (see `hl7parser.hl7_dedup`) retransmitted messages which
+were handled successfully before are acknowledged with `AA` without parsing
+and handling them again.
+"""
+
+import asyncio
+import io
+import logging
+import uuid
+from datetime import datetime
+
+from hl7parser.hl7 import HL7Message, HL7Segment, escape, get_delimiters
+from hl7parser.hl7_dedup import message_key
+from hl7parser.hl7_stream import MLLP_END, MLLP_START, _MessageFramer
+
+logger = logging.getLogger(__name__)
+
+# MSA-3 of acknowledgements for messages which couldn't be parsed and those
+# whose handler failed
+REJECT_TEXT = "Message could not be parsed"
+ERROR_TEXT = "Message could not be processed"
+
+
+def make_ack(header, ack_code="AA", text=None, control_id=None):
+    """
+        Builds the acknowledgement for the message with the MSH segment
+        `header`. Sending and receiving application and facility are swapped
+        and the control id of the message is echoed in the MSA segment.
+
+        :param ack_code:
+            The acknowledgement code (MSA-1), e.g. AA, AE or AR
+        :param text:
+            An optional text message (MSA-3)
+        :param control_id:
+            The control id of the acknowledgement, a random one is generated
+            if none is given
+        :rtype:
+            HL7Message
+    """
+    delimiters = header.delimiters
+    trigger_event = header.message_type.trigger_event
+    if control_id is None:
+        control_id = uuid.uuid4().hex[:20]
+
+    msh = [
+        "MSH",
+        str(delimiters)[1:],
+        str(header.receiving_application),
+        str(header.receiving_facility),
+        str(header.sending_application),
+        str(header.sending_facility),
+        datetime.now().strftime("%Y%m%d%H%M%S"),
+        "",
+        delimiters.component_separator.join(
+            ["ACK", "" if trigger_event is None else str(trigger_event), "ACK"]),
+        control_id,
+        str(header.processing_id),
+        str(header.version_id),
+    ]
+    msa = ["MSA", ack_code, str(header.message_control_id)]
+    if text is not None:
+        msa.append(escape(text, delimiters))
+
+    return HL7Message("\r".join(
+        delimiters.field_separator.join(segment) for segment in (msh, msa)))
+
+
+def _fallback_header(text):
+    """
+        Reads the MSH segment of a message which couldn't be parsed, an empty
+        one is returned if there is no usable MSH segment.
+    """
+    if text.startswith("MSH") and len(text) >= 8:
+        return HL7Segment(text.splitlines()[0], get_delimiters(text[3:8]), lazy=True)
+    return HL7Segment("MSH|^~\\&", lazy=True)
+
+
+class MLLPServer:
+    """
+        Receives MLLP framed messages and passes them to `handler`, an async
+        function called with the parsed HL7Message.
+
+        >>> async def handler(message):
+        ...     print(message.msh.message_control_id)
+        >>> async def main():
+        ...     async with MLLPServer(handler, port=2575) as server:
+        ...         await server.serve_forever()
+        >>> asyncio.run(main())  # doctest: +SKIP
+
+        :param encoding:
+            The encoding of received messages and responses, by default
+            messages are decoded with the character set in MSH-18 and
+            responses are encoded in their own encoding
+        :param error_text:
+            Function called with the exception raised by the handler, returns
+            the text of the `AE` acknowledgement (MSA-3). `ERROR_TEXT` is sent
+            if none is given.
+    """
+
+    def __init__(
+        self,
+        handler,
+        host="127.0.0.1",
+        port=2575,
+        encoding=None,
+        lazy=False,
+        max_concurrency=100,
+        chunk_size=65536,
+        max_message_size=None,
+        dedup=None,
+        error_text=None,
+    ):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.encoding = encoding
+        self.lazy = lazy
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.max_message_size = max_message_size
+        self.dedup = dedup
+        self.error_text = error_text
+        self._server = None
+        self._semaphore = None
+
+    async def start(self):
+        """ starts listening, use port 0 to pick a free port """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _handle_connection(self, reader, writer):
+        framer = _MessageFramer(self.max_message_size)
+        try:
+            while True:
+                chunk = await reader.read(self.chunk_size)
+                if not chunk:
+                    break
+                try:
+                    messages = framer.feed(chunk)
+                except ValueError as error:
+                    logger.warning("Closing connection: %s", error)
+                    break
+                for data in messages:
+                    response = await self._process(data)
+                    writer.write(MLLP_START + self._encode(response) + MLLP_END)
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _process(self, data):
+        """
+            parses and handles a message, returns the response to send (a
+            HL7Message or string)
+        """
+        key = None
+        if self.dedup is not None:
+            try:
+                key = message_key(data, self.encoding)
+            except Exception:
+                # rejected below
+                pass
+            if key is not None and self.dedup.seen(key):
+                return make_ack(_fallback_header(self._decode(data)))
+
+        try:
+            message = HL7Message(data, lazy=self.lazy, encoding=self.encoding)
+        except Exception:
+            logger.warning("Rejecting message which could not be parsed", exc_info=True)
+            return make_ack(_fallback_header(self._decode(data)), "AR", REJECT_TEXT)
+
+        try:
+            async with self._semaphore:
+                response = await self.handler(message)
+        except Exception as error:
+            logger.exception("Error handling message %s", message.header.message_control_id)
+            text = ERROR_TEXT if self.error_text is None else self.error_text(error)
+            return make_ack(message.header, "AE", text)
+
+        if key is not None:
+            self.dedup.add(key)
+        if response is None:
+            return make_ack(message.header)
+        return response
+
+    def _decode(self, data):
+        """ decodes a message which couldn't be parsed as far as possible """
+        return data.decode(self.encoding or "utf-8", errors="replace")
+
+    def _encode(self, response):
+        """ returns the bytes of the response (HL7Message or string) """
+        if isinstance(response, HL7Message):
+            buffer = io.BytesIO()
+            response.write_to(buffer, self.encoding)
+            return buffer.getvalue()
+        return response.encode(self.encoding or "utf-8")
@@ -0,0 +1,55 @@
+"""
+Parsing messages on multiple cores.
+
+`parse_many` distributes raw messages to a pool of worker processes, which
+parse them and call `func` with every parsed message. Only the (picklable)
+result of `func` is sent back, so the work which should run in parallel,
+e.g. reading fields from the message, belongs in `func`. Returning the
+parsed messages themselves gains nothing: they would have to be pickled as
+their raw text and parsed again in the calling process. Parse errors are
+raised in the calling process.
+"""
+
+import functools
+import multiprocessing
+import os
+
+from hl7parser.hl7 import HL7Message
+
+
+def _parse(func, lazy, raw):
+    """ parses a message in a worker process """
+    return func(HL7Message(raw, lazy=lazy))
+
+
+def parse_many(
+    raw_messages, func, workers=None, chunksize=64, ordered=True, lazy=False
+):
+    """
+        Parses the raw (string) messages of the iterable `raw_messages` in
+        `workers` processes and yields the results of `func`.
+
+        :param func:
+            Function called in the worker with every parsed message, its
+            return value is yielded. Has to be picklable, i.e. defined at
+            module level.
+        :param workers:
+            Number of worker processes, defaults to the number of CPUs
+        :param chunksize:
+            Number of messages sent to a worker at once
+        :param ordered:
+            If False, results are yielded as soon as they are ready instead
+            of in the order of `raw_messages`
+        :param lazy:
+            Parse the messages lazily in the workers
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    worker = functools.partial(_parse, func, lazy)
+    with multiprocessing.Pool(workers) as pool:
+        if ordered:
+            results = pool.imap(worker, raw_messages, chunksize)
+        else:
+            results = pool.imap_unordered(worker, raw_messages, chunksize)
+        yield from results
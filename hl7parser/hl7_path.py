@@ -0,0 +1,203 @@
+"""
+Path expressions to read values from messages.
+
+A path selects a segment, field, repetition, component and subcomponent:
+
+    SEG[occurrence]-FIELD[repetition].COMPONENT.SUBCOMPONENT
+
+Field numbers follow the HL7 standard (MSH-9 is the message type), all other
+numbers are 1-based and default to the first occurrence or repetition. `*`
+selects all occurrences or repetitions, the path then returns a list.
+Everything after the segment is optional, e.g. `PID-3[*].1`, `OBX[2]-5` or
+`MSH-9.2`.
+
+Paths are compiled once by `compile_path` (which keeps the most recently
+used paths in a cache) and work on the raw field contents, i.e. no data type
+objects are created for fields which weren't parsed yet. Values are returned
+as strings, missing values as empty string. Whole segments are returned as
+their raw text unless they were modified.
+
+Paths also read from raw messages (str or bytes) and `HL7Tokens`, which are
+only tokenized (see `hl7parser.hl7_tokenizer`) instead of being parsed. To
+read several paths, tokenize the message once and pass the tokens.
+
+>>> from hl7parser.hl7 import HL7Message
+>>> message = HL7Message(
+...     "MSH|^~\\\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01|MSG1|P|2.7\\r"
+...     "PID|1||PATID1234^5^M11~123456789^^^USSSA^SS||EVERYMAN^ADAM\\r"
+...     "OBX|1|NM|GLU||95\\rOBX|2|NM|HGB||13", lazy=True)
+>>> evaluate(message, "MSH-9.2")
+'A01'
+>>> evaluate(message, "PID-3[*].1")
+['PATID1234', '123456789']
+>>> evaluate(message, "OBX[2]-5")
+'13'
+>>> evaluate(message.message, "PID-3[2].4")
+'USSSA'
+"""
+
+import functools
+import re
+
+from hl7parser.hl7 import HL7Segment
+from hl7parser.hl7_tokenizer import HL7Tokens, tokenize
+
+# marks a selection of all occurrences or repetitions
+ALL = "*"
+
+_PATH = re.compile(
+    r"^(?P<segment>[A-Z][A-Z0-9]{2})(?:\[(?P<occurrence>\*|\d+)\])?"
+    r"(?:-(?P<field>\d+)(?:\[(?P<repetition>\*|\d+)\])?"
+    r"(?:\.(?P<component>\d+)(?:\.(?P<subcomponent>\d+))?)?)?$"
+)
+
+
+def _index(value, default=0):
+    """ converts a 1-based number of the path to a 0-based index """
+    if value is None:
+        return default
+    if value == ALL:
+        return ALL
+    index = int(value) - 1
+    if index < 0:
+        raise ValueError("Numbers in paths start at 1")
+    return index
+
+
+class HL7Path:
+    """
+        A compiled path expression, call it with a HL7Message to get the
+        selected value(s).
+    """
+    __slots__ = (
+        "expression", "segment_type", "occurrence", "field", "repetition",
+        "component", "subcomponent", "multiple",
+    )
+
+    def __init__(self, expression):
+        match = _PATH.match(expression)
+        if match is None:
+            raise ValueError("Invalid path {0!r}".format(expression))
+
+        self.expression = expression
+        self.segment_type = match.group("segment").lower()
+        self.occurrence = _index(match.group("occurrence"))
+        self.field = None
+        if match.group("field") is not None:
+            # MSH-1 is the field separator, so MSH-2 is the first field
+            offset = 2 if self.segment_type == "msh" else 1
+            self.field = int(match.group("field")) - offset
+            if self.field < -1 or (self.field == -1 and offset == 1):
+                raise ValueError("Invalid field in path {0!r}".format(expression))
+        self.repetition = _index(match.group("repetition"))
+        self.component = _index(match.group("component"), None)
+        self.subcomponent = _index(match.group("subcomponent"), None)
+        self.multiple = ALL in (self.occurrence, self.repetition)
+
+    def __repr__(self):
+        return "HL7Path({0!r})".format(self.expression)
+
+    def __call__(self, message):
+        if isinstance(message, (str, bytes, bytearray, memoryview)):
+            message = tokenize(message)
+        if isinstance(message, HL7Tokens):
+            return self._read_tokens(message)
+
+        positions = message.segment_position.get(self.segment_type, ())
+        if isinstance(positions, int):
+            positions = (positions,)
+        if self.occurrence != ALL:
+            positions = positions[self.occurrence:self.occurrence + 1]
+
+        values = []
+        for position in positions:
+            if self.field is None:
+                values.append(_segment_text(message, position))
+            else:
+                self._read(message._segment(position), message.delimiters, values)
+
+        if self.multiple:
+            return values
+        return values[0] if values else ""
+
+    def _read(self, segment, delimiters, values):
+        """ appends the selected value(s) of `segment` to `values` """
+        if self.field == -1:
+            values.append(delimiters.field_separator)
+            return
+
+        value = segment.raw_field(self.field)
+        if self.field == 0 and segment.type == "MSH":
+            # the encoding characters contain the delimiters
+            values.append(value)
+            return
+
+        repetitions = value.split(delimiters.rep_separator)
+        if self.repetition != ALL:
+            repetitions = repetitions[self.repetition:self.repetition + 1] or [""]
+        for repetition in repetitions:
+            if self.component is not None:
+                repetition = _part(repetition, delimiters.component_separator, self.component)
+                if self.subcomponent is not None:
+                    repetition = _part(
+                        repetition, delimiters.subcomponent_separator, self.subcomponent)
+            values.append(repetition)
+
+
+    def _read_tokens(self, tokens):
+        """ returns the selected value(s) of a tokenized message """
+        positions = tokens.find(self.segment_type.upper())
+        if self.occurrence != ALL:
+            positions = positions[self.occurrence:self.occurrence + 1]
+
+        values = []
+        for position in positions:
+            if self.field is None:
+                values.append(tokens.segment(position))
+            elif self.field == -1:
+                values.append(tokens.delimiters.field_separator)
+            elif self.repetition == ALL:
+                values.extend(
+                    tokens.value(
+                        position, self.field, repetition, self.component, self.subcomponent)
+                    for repetition in range(max(1, tokens.repetitions(position, self.field)))
+                )
+            else:
+                values.append(tokens.value(
+                    position, self.field, self.repetition, self.component, self.subcomponent))
+
+        if self.multiple:
+            return values
+        return values[0] if values else ""
+
+
+def _segment_text(message, position):
+    """
+        returns the raw text of the segment at `position` of `message`, the
+        same as read from its tokens, rendered if it was modified
+    """
+    segment = message._segments[position][1]
+    if isinstance(segment, HL7Segment):
+        segment = segment._raw_text()
+    if not isinstance(segment, str):
+        segment = str(segment, message.encoding)
+    return segment
+
+
+def _part(value, separator, index):
+    parts = value.split(separator)
+    return parts[index] if index < len(parts) else ""
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_path(expression):
+    """
+        Returns the compiled HL7Path for `expression`. The most recently used
+        paths are cached.
+    """
+    return HL7Path(expression)
+
+
+def evaluate(message, expression):
+    """ returns the value(s) selected by the path `expression` in `message` """
+    return compile_path(expression)(message)
@@ -0,0 +1,178 @@
+"""
+Processing messages in parallel while keeping their order per patient.
+
+`HL7Pipeline` passes submitted messages to a handler running in a pool of
+worker threads. Messages with the same partition key (by default the first
+patient identifier, PID-3.1) are processed one after another in the order
+they were submitted, messages of different keys in parallel. The key is read
+from the raw message without parsing it (see `hl7parser.hl7_path`).
+
+Every key with pending messages is scheduled to one worker at a time, so
+unlike sharding keys to fixed workers, a slow patient never delays other
+patients while workers are idle. Workers are threads, which suits handlers
+waiting for databases or the network; CPU bound parsing can be moved to
+processes with `hl7parser.hl7_parallel`.
+
+>>> processed = []
+>>> with HL7Pipeline(lambda message: processed.append(
+...         str(message.msh.message_type.trigger_event)), workers=4) as pipeline:
+...     for event in ["A01", "A08", "A03"]:
+...         pipeline.submit(
+...             "MSH|^~\\\\&|A|B|C|D|200001011200||ADT^{0}|1|P|2.5\\r"
+...             "PID|1||4711^^^HOSP^MR".format(event))
+>>> processed
+['A01', 'A08', 'A03']
+"""
+
+import logging
+import queue
+import threading
+from collections import deque
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_path import compile_path
+
+logger = logging.getLogger(__name__)
+
+# path of the default partition key, the ID number of the first patient
+# identifier
+PATIENT_KEY = "PID-3.1"
+
+# tells a worker to stop
+_STOP = object()
+
+
+class HL7Pipeline:
+    """
+        Processes messages (str, bytes or HL7Message) with `handler` in
+        `workers` threads, in order per partition key. Raw messages are
+        parsed in the workers and the handler is called with the
+        HL7Message.
+
+        :param key:
+            Path expression (see `hl7parser.hl7_path`) or function returning
+            the partition key of a message, messages without key (e.g.
+            without PID segment or if the key can't be read) share the empty
+            key
+        :param lazy:
+            Passed on to HL7Message
+        :param max_pending:
+            Maximal number of submitted messages which weren't processed yet,
+            `submit` blocks while it is reached. None for no limit.
+        :param on_error:
+            Called with the message and the exception if parsing or the
+            handler failed, by default the exception is logged. The
+            following messages of the key are processed anyway. Exceptions
+            raised by `on_error` are logged.
+    """
+
+    def __init__(
+        self, handler, workers=8, key=PATIENT_KEY, lazy=False, max_pending=10000, on_error=None
+    ):
+        self.handler = handler
+        self.key = compile_path(key) if isinstance(key, str) else key
+        self.lazy = lazy
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # pending messages by key, the first one is being processed or
+        # waiting for a worker
+        self._pending = {}
+        # keys with pending messages which no worker processes
+        self._ready = queue.SimpleQueue()
+        self._slots = None if max_pending is None else threading.Semaphore(max_pending)
+        self._unfinished = 0
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name="HL7Pipeline-{0}".format(index), daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, message):
+        """ adds a message to the pipeline """
+        if self._closed:
+            raise ValueError("Pipeline is closed")
+        try:
+            key = self.key(message)
+        except Exception:
+            # reported when the message is parsed
+            key = ""
+        if self._slots is not None:
+            self._slots.acquire()
+        with self._lock:
+            self._unfinished += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = deque([message])
+                self._ready.put(key)
+            else:
+                pending.append(message)
+
+    def join(self):
+        """ waits until all submitted messages were processed """
+        with self._idle:
+            while self._unfinished:
+                self._idle.wait()
+
+    def close(self):
+        """ processes the remaining messages and stops the workers """
+        if self._closed:
+            return
+        self.join()
+        self._closed = True
+        for _ in self._workers:
+            self._ready.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _work(self):
+        while True:
+            key = self._ready.get()
+            if key is _STOP:
+                return
+            with self._lock:
+                message = self._pending[key][0]
+
+            try:
+                self._process(message)
+            finally:
+                self._done(key)
+
+    def _done(self, key):
+        """ removes the processed message and schedules the key again """
+        with self._lock:
+            pending = self._pending[key]
+            pending.popleft()
+            if pending:
+                # let the other keys take their turn
+                self._ready.put(key)
+            else:
+                del self._pending[key]
+            self._unfinished -= 1
+            if not self._unfinished:
+                self._idle.notify_all()
+        if self._slots is not None:
+            self._slots.release()
+
+    def _process(self, message):
+        try:
+            if not isinstance(message, HL7Message):
+                message = HL7Message(message, lazy=self.lazy)
+            self.handler(message)
+        except Exception as error:
+            if self.on_error is None:
+                logger.exception("Error processing message")
+                return
+            try:
+                self.on_error(message, error)
+            except Exception:
+                # the worker keeps running
+                logger.exception("Error in on_error callback")
@@ -0,0 +1,126 @@
+"""
+Routing messages by their header without parsing them.
+
+`peek_header` only parses the MSH segment of a raw message and returns it
+together with the span of the remaining segments, which may be parsed later
+(or never). `HL7Dispatcher` passes raw messages to the handler registered for
+their message type and trigger event (MSH-9).
+
+>>> raw = (
+...     "MSH|^~\\\\&|LAB|HOSP|EHR|HOSP|20240101120000||ORU^R01^ORU_R01|MSG1|P|2.5\\r"
+...     "PID|1||4711\\rOBX|1|NM|GLU||95")
+>>> header, (start, end) = peek_header(raw)
+>>> str(header.message_control_id), raw[start:end].split("\\r")[0]
+('MSG1', 'PID|1||4711')
+>>> dispatcher = HL7Dispatcher()
+>>> @dispatcher.register("ORU", "R01")
+... def store_result(header, raw):
+...     return "stored " + str(header.message_control_id)
+>>> dispatcher.dispatch(raw)
+'stored MSG1'
+"""
+
+import codecs
+import re
+
+from hl7parser.hl7 import _BYTE_SAFE_CODECS, HL7Message, HL7Segment, get_delimiters
+
+_LINE_END = re.compile(r"\r\n|[\r\n]")
+_BYTES_LINE_END = re.compile(rb"\r\n|[\r\n]")
+
+
+def peek_header(raw, encoding=None, lazy=False):
+    """
+        Parses only the MSH segment of the raw message `raw` (str or bytes-like
+        object) and returns it as HL7Segment together with the span
+        `(start, end)` of the remaining segments in `raw`.
+
+        Like HL7Message, bytes are decoded with `encoding` or the character
+        set in MSH-18 (utf-8 if neither is set). Messages in encodings which
+        may contain the delimiter bytes inside of other characters (e.g.
+        UTF-16) are decoded as a whole, the span then refers to the decoded
+        text.
+
+        :param lazy:
+            Passed on to HL7Segment, only fields which are accessed are
+            parsed
+    """
+    if isinstance(raw, str):
+        line_end = _LINE_END
+    else:
+        raw = memoryview(raw)
+        if encoding is None:
+            encoding = HL7Message._read_character_set(raw)
+        if codecs.lookup(encoding).name in _BYTE_SAFE_CODECS:
+            line_end = _BYTES_LINE_END
+        else:
+            raw = str(raw, encoding)
+            line_end = _LINE_END
+
+    if raw[:3] not in ("MSH", b"MSH"):
+        raise ValueError("Message doesn't start with a MSH segment")
+    characters = raw[3:8]
+    delimiters = get_delimiters(characters if isinstance(characters, str) else str(
+        characters, "ascii"))
+
+    match = line_end.search(raw)
+    if match is None:
+        line, start = raw, len(raw)
+    else:
+        line, start = raw[:match.start()], match.end()
+    header = HL7Segment(line, delimiters, lazy=lazy, encoding=encoding or "utf-8")
+    return header, (start, len(raw))
+
+
+class HL7Dispatcher:
+    """
+        Passes raw messages to the handler registered for their message code
+        and trigger event (MSH-9.1 and MSH-9.2). Handlers are called with the
+        header (see `peek_header`) and the raw message and may parse the
+        message if they need more than the header.
+
+        Handlers registered without trigger event get all messages of the
+        message code, `default` gets messages without a more specific
+        handler.
+    """
+
+    def __init__(self, default=None):
+        self.default = default
+        # handlers by (message code, trigger event), trigger event is None
+        # for handlers of all events
+        self.handlers = {}
+
+    def register(self, message_code, trigger_event=None, handler=None):
+        """
+            Registers `handler` for messages of `message_code` and
+            `trigger_event`. Without `handler` a decorator is returned.
+        """
+        if handler is None:
+            def decorator(handler):
+                self.register(message_code, trigger_event, handler)
+                return handler
+            return decorator
+        self.handlers[(message_code, trigger_event)] = handler
+        return handler
+
+    def get_handler(self, message_code, trigger_event):
+        """ returns the handler for a message code and trigger event """
+        handlers = self.handlers
+        handler = handlers.get((message_code, trigger_event))
+        if handler is None:
+            handler = handlers.get((message_code, None), self.default)
+        if handler is None:
+            raise ValueError("No handler for {0}^{1} messages".format(
+                message_code, trigger_event))
+        return handler
+
+    def dispatch(self, raw, encoding=None):
+        """
+            Reads the header of the raw message `raw`, passes the header and
+            the message to its handler and returns the handler's result.
+        """
+        header, _ = peek_header(raw, encoding, lazy=True)
+        message_type = header.message_type
+        handler = self.get_handler(
+            str(message_type.message_code), str(message_type.trigger_event))
+        return handler(header, raw)
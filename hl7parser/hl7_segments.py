@@ -26,6 +26,7 @@ segment_maps = {
         make_cell_type("processing_id", options={"required": True, "type": HL7_ProcessingType}),
         make_cell_type("version_id", options={"required": True, "type": HL7_VersionIdentifier}),
         make_cell_type("sequence_number"),
+        make_cell_type("continuation_pointer"),
         make_cell_type("accept_acknowledgment_type"),
         make_cell_type("application_acknowledgment_type"),
         make_cell_type("country_code"),
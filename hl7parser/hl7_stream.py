@@ -0,0 +1,354 @@
+"""
+Reading and writing HL7 messages from and to streams.
+
+`iter_messages` reads a binary file or socket in chunks and yields one
+`HL7Message` at a time, so arbitrarily large captures can be processed with
+bounded memory. Messages may be framed with the minimal lower layer protocol
+(MLLP, i.e. `<VT>message<FS><CR>`) or just follow each other, in which case a
+new message starts with every MSH segment. Batch envelope segments
+(FHS, BHS, BTS and FTS) between unframed messages are skipped.
+`HL7StreamParser` parses messages from chunks pushed to it, e.g. by a
+network protocol.
+
+>>> import io
+>>> stream = io.BytesIO(
+...     b"\\x0bMSH|^~\\\\&|A|B|C|D|200001011200||ADT^A01|1|P|2.5\\rPID|1\\x1c\\r"
+...     b"MSH|^~\\\\&|A|B|C|D|200001011200||ADT^A08|2|P|2.5\\nPID|2\\n"
+... )
+>>> [str(message.msh.message_type) for message in iter_messages(stream)]
+['ADT^A01', 'ADT^A08']
+
+`write_messages` writes messages segment by segment to a file, either MLLP
+framed, as batch file with envelope segments or one per line.
+"""
+
+import io
+import re
+from collections import deque
+
+from hl7parser.hl7 import HL7Message, get_delimiters
+
+MLLP_START = b"\x0b"
+MLLP_END = b"\x1c\r"
+
+# segments wrapping the messages of a batch file
+ENVELOPE_SEGMENTS = (b"FHS", b"BHS", b"BTS", b"FTS")
+
+FRAMINGS = ("mllp", "batch", "newline")
+
+_LINE_END = re.compile(rb"[\r\n]")
+# bytes skipped at the start of a segment, i.e. empty lines and frame ends
+_IGNORED = b"\r\n\t \x1c"
+
+
+class _MessageFramer:
+    """
+        Splits a stream of bytes into the raw data of the contained messages.
+        Data is added with `feed` which returns the messages completed by it.
+        Incomplete frames and lines are only searched for their end in the
+        data added since the last call.
+
+        :param max_message_size:
+            Maximal size of a message in bytes, a ValueError is raised as soon
+            as it is exceeded
+    """
+
+    def __init__(self, max_message_size=None):
+        self.max_message_size = max_message_size
+        self._buffer = bytearray()
+        # segments of the current unframed message and their size
+        self._segments = []
+        self._size = 0
+        # start of the current MLLP frame in the buffer
+        self._frame_start = None
+        # position up to which the buffer was searched for the end of the
+        # current frame or line
+        self._scan = 0
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        position = 0
+
+        while position < len(buffer):
+            if self._frame_start is not None:
+                end = buffer.find(MLLP_END[:1], self._scan)
+                if end == -1:
+                    self._scan = len(buffer)
+                    self._check_size(len(buffer) - self._frame_start)
+                    break
+                self._check_size(end - self._frame_start)
+                messages.append(bytes(buffer[self._frame_start:end]))
+                self._frame_start = None
+                position = self._scan = end + 1
+                continue
+
+            byte = buffer[position]
+            if byte == MLLP_START[0]:
+                self._flush(messages)
+                self._frame_start = self._scan = position + 1
+                position += 1
+                continue
+            if byte in _IGNORED:
+                position += 1
+                continue
+
+            match = _LINE_END.search(buffer, max(position, self._scan))
+            if match is None:
+                self._scan = len(buffer)
+                self._check_size(self._size + len(buffer) - position)
+                break
+            self._add_segment(bytes(buffer[position:match.start()]), messages)
+            position = self._scan = match.end()
+
+        del buffer[:position]
+        self._scan = max(self._scan - position, 0)
+        if self._frame_start is not None:
+            self._frame_start -= position
+        return messages
+
+    def close(self):
+        """
+            Signals the end of the stream and returns the last message.
+        """
+        if self._frame_start is not None:
+            raise ValueError("Stream ended inside of a MLLP frame")
+        messages = []
+        if self._buffer:
+            self._add_segment(bytes(self._buffer), messages)
+            self._buffer.clear()
+            self._scan = 0
+        self._flush(messages)
+        return messages
+
+    def _check_size(self, size):
+        if self.max_message_size is not None and size > self.max_message_size:
+            # the rest of the stream can't be framed reliably
+            self.__init__(self.max_message_size)
+            raise ValueError(
+                "Message exceeds the maximum size of {0} bytes".format(self.max_message_size))
+
+    def _add_segment(self, segment, messages):
+        segment_type = segment[:3]
+        if segment_type == b"MSH" or segment_type in ENVELOPE_SEGMENTS:
+            self._flush(messages)
+        if segment_type not in ENVELOPE_SEGMENTS:
+            self._segments.append(segment)
+            # segments are joined by a carriage return
+            self._size += len(segment) + (len(self._segments) > 1)
+            self._check_size(self._size)
+
+    def _flush(self, messages):
+        if self._segments:
+            messages.append(b"\r".join(self._segments))
+            self._segments = []
+            self._size = 0
+
+
+class HL7StreamParser:
+    """
+        Incremental parser of messages received in chunks of any size, e.g.
+        from a socket. `feed` returns the messages completed by a chunk,
+        `close` the last message at the end of the stream. Messages may be
+        MLLP framed or terminated by the MSH segment of the next message
+        (segments end with a carriage return and/or line feed).
+
+        >>> parser = HL7StreamParser()
+        >>> parser.feed(b"\\x0bMSH|^~\\\\&|A|B|C|D|200001011200||ADT^A01|1|P|2.5\\rPID|1")
+        []
+        >>> [str(message.msh.message_control_id) for message in parser.feed(b"\\x1c\\r")]
+        ['1']
+        >>> parser.close()
+        []
+
+        If a message can't be parsed, the messages completed before it are
+        returned and its exception is raised by the next call of `feed` or
+        `close`, the messages following it are kept until then. With
+        `on_error` the message is skipped instead.
+
+        :param encoding:
+            The encoding used to decode the messages, by default the
+            character set given in MSH-18 of every message or utf-8
+        :param lazy:
+            Passed on to HL7Message
+        :param max_message_size:
+            Maximal size of a message in bytes, if a message exceeds it a
+            ValueError is raised by `feed` and the buffered data is
+            discarded. The rest of the stream can't be parsed reliably
+            afterwards, e.g. the connection should be closed.
+        :param on_error:
+            Called with the raw message (bytes) and the exception if a
+            message can't be parsed
+    """
+
+    def __init__(self, encoding=None, lazy=False, max_message_size=None, on_error=None):
+        self.encoding = encoding
+        self.lazy = lazy
+        self.on_error = on_error
+        self._framer = _MessageFramer(max_message_size)
+        # raw messages which weren't parsed yet
+        self._pending = deque()
+
+    def feed(self, data):
+        """ adds the bytes `data` and returns the completed HL7Messages """
+        self._pending.extend(self._framer.feed(data))
+        return self._parse_pending()
+
+    def close(self):
+        """
+            Signals the end of the stream and returns the last HL7Messages (if
+            any) in a list. Raises a ValueError if a MLLP frame is incomplete.
+        """
+        self._pending.extend(self._framer.close())
+        return self._parse_pending()
+
+    def _parse_pending(self):
+        messages = []
+        pending = self._pending
+        while pending:
+            try:
+                message = HL7Message(pending[0], lazy=self.lazy, encoding=self.encoding)
+            except Exception as error:
+                if self.on_error is not None:
+                    self.on_error(pending.popleft(), error)
+                    continue
+                if messages:
+                    # raised by the next call
+                    return messages
+                pending.popleft()
+                raise
+            pending.popleft()
+            messages.append(message)
+        return messages
+
+
+def _get_reader(source):
+    """ returns a function reading up to n bytes from a file or socket """
+    for name in ("read1", "read", "recv"):
+        read = getattr(source, name, None)
+        if read is not None:
+            return read
+    raise TypeError("{0!r} is neither a binary file nor a socket".format(source))
+
+
+def iter_messages(
+    source, chunk_size=65536, encoding=None, lazy=False, max_message_size=None,
+    on_error=None,
+):
+    """
+        Reads the binary file or socket `source` in chunks of `chunk_size`
+        bytes and yields the contained messages as HL7Message objects.
+
+        :param encoding:
+            The encoding used to decode the messages, by default the
+            character set given in MSH-18 of every message or utf-8
+        :param lazy:
+            Passed on to HL7Message
+        :param max_message_size:
+            Maximal size of a message in bytes, a ValueError is raised if a
+            message exceeds it
+        :param on_error:
+            Called with the raw message (bytes) and the exception if a
+            message can't be parsed, the following messages are read
+            anyway. By default the exception is raised after yielding the
+            preceding messages.
+    """
+    read = _get_reader(source)
+    parser = HL7StreamParser(encoding, lazy, max_message_size, on_error)
+
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+
+    yield from parser.close()
+
+
+def write_messages(
+    fp, messages, framing="mllp", encoding=None, file_header=None, batch_header=None
+):
+    """
+        Writes the HL7Message objects (or raw messages) of the iterable
+        `messages` to the file-like object `fp` and returns the number of
+        written messages. Segments are terminated by a carriage return.
+        Raw messages given as strings are written as they are, only line
+        feeds are replaced by carriage returns.
+
+        :param framing:
+            `mllp` to wrap every message in a MLLP frame, `batch` to write a
+            batch file with FHS, BHS, BTS and FTS segments or `newline` to
+            terminate every message with a line feed
+        :param encoding:
+            The encoding used for binary files, by default the encoding of
+            every message (see `HL7Message.write_to`), raw strings are encoded
+            with the character set of their MSH-18 or utf-8
+        :param file_header:
+            The FHS segment of a batch file, by default only the encoding
+            characters are given
+        :param batch_header:
+            The BHS segment of a batch file
+    """
+    if framing not in FRAMINGS:
+        raise ValueError("Unknown framing {0!r}".format(framing))
+
+    if isinstance(fp, io.TextIOBase):
+        def write_text(text, text_encoding=None):
+            fp.write(text)
+    else:
+        def write_text(text, text_encoding=None):
+            fp.write(text.encode(encoding or text_encoding or "utf-8"))
+
+    messages = (
+        message if isinstance(message, (HL7Message, str)) else HL7Message(message, lazy=True)
+        for message in messages
+    )
+    message = next(messages, None)
+    if framing == "batch":
+        if message is None:
+            delimiters = get_delimiters()
+        elif isinstance(message, str):
+            delimiters = get_delimiters(message[3:8])
+        else:
+            delimiters = message.delimiters
+        characters = str(delimiters)
+        write_text((file_header or "FHS" + characters) + "\r")
+        write_text((batch_header or "BHS" + characters) + "\r")
+
+    count = 0
+    while message is not None:
+        if framing == "mllp":
+            write_text(MLLP_START.decode("ascii"))
+        if isinstance(message, str):
+            text = _raw_text(message)
+            write_text(text, None if encoding else _character_set(text))
+        else:
+            message.write_to(fp, encoding)
+        if framing == "mllp":
+            write_text(MLLP_END.decode("ascii"))
+        elif framing == "newline":
+            write_text("\n")
+        count += 1
+        message = next(messages, None)
+
+    if framing == "batch":
+        separator = delimiters.field_separator
+        write_text("BTS" + separator + str(count) + "\r")
+        write_text("FTS" + separator + "1\r")
+    return count
+
+
+def _character_set(text):
+    """ returns the codec of MSH-18 of the raw message `text` """
+    header = text[:text.find("\r")]
+    return HL7Message._read_character_set(header.encode("utf-8", errors="replace"))
+
+
+def _raw_text(message):
+    """ returns the raw message with carriage returns as segment terminators """
+    if "\n" in message:
+        message = message.replace("\r\n", "\r").replace("\n", "\r")
+    if not message.endswith("\r"):
+        message += "\r"
+    return message
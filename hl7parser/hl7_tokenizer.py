@@ -0,0 +1,226 @@
+"""
+Tokenizing messages into the offsets of their parts.
+
+`tokenize` scans a message once and translates it into a map of the
+delimiters: every byte of the map is the level of the delimiter at this
+position of the message (segment terminator, field, repetition, component or
+subcomponent separator) or `TEXT`. The start and end offsets of the segments
+are kept in an `array('I')`. Fields, repetitions, components and
+subcomponents are found by searching the map for the delimiters of their
+level, values are only sliced from the message when they are read.
+
+Field indexes are the same as those of `HL7Segment`, i.e. 0 is the first
+field after the segment type (MSH-2 for MSH segments), all other indexes
+start at 0 as well.
+
+>>> tokens = tokenize(
+...     "MSH|^~\\\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01|MSG1|P|2.7\\r"
+...     "PID|1||PATID1234^5^M11~123456789^^^USSSA^SS||EVERYMAN^ADAM")
+>>> len(tokens), tokens.segment_type(1)
+(2, 'PID')
+>>> tokens.value(0, 7, component=1)
+'A01'
+>>> tokens.value(1, 2, repetition=1, component=3)
+'USSSA'
+>>> tokens.repetitions(1, 2)
+2
+"""
+
+import codecs
+from array import array
+
+from hl7parser.hl7 import _BYTE_SAFE_CODECS, HL7Message, get_delimiters
+
+# levels of the delimiters, a part of a level is separated into parts of the
+# next level
+SEGMENT = 0
+FIELD = 1
+REPETITION = 2
+COMPONENT = 3
+SUBCOMPONENT = 4
+# all other characters
+TEXT = 255
+
+_LEVEL_MARKERS = [bytes([level]) for level in range(SUBCOMPONENT + 1)]
+
+# translation tables of delimiters to their levels by encoding characters
+_TABLES = {}
+
+
+def _get_table(delimiters):
+    """ returns the table translating the bytes of a message to levels """
+    key = str(delimiters)
+    try:
+        return _TABLES[key]
+    except KeyError:
+        pass
+    table = bytearray([TEXT]) * 256
+    table[ord("\r")] = table[ord("\n")] = SEGMENT
+    for level, character in enumerate([
+        delimiters.field_separator,
+        delimiters.rep_separator,
+        delimiters.component_separator,
+        delimiters.subcomponent_separator,
+    ], FIELD):
+        table[ord(character)] = level
+    table = _TABLES[key] = bytes(table)
+    return table
+
+
+class HL7Tokens:
+    """
+        The tokens of a message created by `tokenize`.
+
+        `levels` is the map of the delimiters in `text` and `segments`
+        contains the start and end offset of every segment, i.e. segment `i`
+        is `text[segments[2 * i]:segments[2 * i + 1]]`. `positions` maps the
+        segment types to the positions of the segments.
+    """
+    __slots__ = ("text", "delimiters", "encoding", "levels", "segments", "positions")
+
+    def __init__(self, text, delimiters, encoding, levels, segments, positions):
+        self.text = text
+        self.delimiters = delimiters
+        self.encoding = encoding
+        self.levels = levels
+        self.segments = segments
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.segments) // 2
+
+    def _text(self, start, end):
+        text = self.text[start:end]
+        if isinstance(text, str):
+            return text
+        return str(text, self.encoding)
+
+    def _child(self, start, end, level, index):
+        """
+            returns the start and end offset of the part `index` of the parts
+            separated by delimiters of `level` between `start` and `end`, None
+            if there are less parts
+        """
+        marker = _LEVEL_MARKERS[level]
+        levels = self.levels
+        for _ in range(index):
+            start = levels.find(marker, start, end)
+            if start == -1:
+                return None
+            start += 1
+        position = levels.find(marker, start, end)
+        return start, end if position == -1 else position
+
+    def _segment(self, segment):
+        """ returns the start and end offset of `segment` """
+        return self.segments[2 * segment], self.segments[2 * segment + 1]
+
+    def segment_type(self, segment):
+        """ returns the type of the segment at position `segment` """
+        return self._text(*self._child(*self._segment(segment), FIELD, 0))
+
+    def segment(self, segment):
+        """ returns the raw text of the segment at position `segment` """
+        return self._text(*self._segment(segment))
+
+    def find(self, segment_type):
+        """ returns the positions of all segments of type `segment_type` """
+        return self.positions.get(segment_type, [])
+
+    def _field(self, segment, field):
+        """
+            returns the offsets of a field and whether it is structured by
+            delimiters, which the encoding characters (MSH-2) aren't
+        """
+        offsets = self._child(*self._segment(segment), FIELD, field + 1)
+        if offsets is None or (field == 0 and self.segment_type(segment) == "MSH"):
+            return offsets, False
+        return offsets, True
+
+    def field(self, segment, field):
+        """ returns the raw text of a field, an empty string if it is missing """
+        offsets, _ = self._field(segment, field)
+        return "" if offsets is None else self._text(*offsets)
+
+    def repetitions(self, segment, field):
+        """ returns the number of repetitions of a field """
+        offsets, structured = self._field(segment, field)
+        if offsets is None:
+            return 0
+        if not structured:
+            return 1
+        return self.levels.count(_LEVEL_MARKERS[REPETITION], *offsets) + 1
+
+    def value(self, segment, field, repetition=0, component=None, subcomponent=None):
+        """
+            returns the raw text of a field, a repetition of it or one of
+            their (sub)components, an empty string if it is missing. The
+            encoding characters (MSH-2) are always returned as a whole.
+        """
+        offsets, structured = self._field(segment, field)
+        if offsets is None:
+            return ""
+        if not structured:
+            return self._text(*offsets)
+        offsets = self._child(*offsets, REPETITION, repetition)
+        if offsets is not None and component is not None:
+            offsets = self._child(*offsets, COMPONENT, component)
+            if offsets is not None and subcomponent is not None:
+                offsets = self._child(*offsets, SUBCOMPONENT, subcomponent)
+        return "" if offsets is None else self._text(*offsets)
+
+
+def tokenize(message, delimiters=None, encoding=None):
+    """
+        Scans the message (str or bytes-like object) once and returns its
+        `HL7Tokens`. The delimiters are read from the MSH segment if not
+        given. Segments may be terminated by carriage returns, line feeds or
+        both.
+
+        Like HL7Message, bytes are decoded with `encoding` or the character
+        set in MSH-18 (utf-8 if neither is set). Messages in encodings which
+        aren't ASCII compatible (e.g. UTF-16) are decoded before scanning them.
+    """
+    if isinstance(message, str):
+        if delimiters is None:
+            delimiters = get_delimiters(message[3:8])
+        encoding = "utf-8"
+        if message.isascii():
+            # offsets in the encoded message are the same
+            data = message.encode("ascii")
+        else:
+            data = message = message.encode("utf-8")
+    else:
+        message = memoryview(message)
+        if encoding is None:
+            encoding = HL7Message._read_character_set(message)
+        if codecs.lookup(encoding).name not in _BYTE_SAFE_CODECS:
+            return tokenize(str(message, encoding), delimiters)
+        data = message.tobytes()
+        if delimiters is None:
+            delimiters = get_delimiters(str(message[3:8], "ascii"))
+
+    # the single pass over the message
+    levels = data.translate(_get_table(delimiters))
+
+    segments = array("I")
+    positions = {}
+    marker = _LEVEL_MARKERS[SEGMENT]
+    field_marker = _LEVEL_MARKERS[FIELD]
+    start = 0
+    length = len(levels)
+    while start < length:
+        end = levels.find(marker, start)
+        if end == -1:
+            end = length
+        type_end = levels.find(field_marker, start, end)
+        segment_type = data[start:end if type_end == -1 else type_end]
+        positions.setdefault(segment_type, []).append(len(segments) // 2)
+        segments.append(start)
+        segments.append(end)
+        start = end + 1
+        if data[end:start + 1] == b"\r\n":
+            start += 1
+    return HL7Tokens(
+        message, delimiters, encoding, levels, segments,
+        {str(segment_type, encoding): found for segment_type, found in positions.items()})
@@ -11,6 +11,7 @@ setup(
     author_email="development@mps-med.de",
     license="BSD",
     packages=find_packages(),
+    extras_require={"numpy": ["numpy"]},
     test_suite="hl7parser.tests",
     zip_safe=True,
     classifiers=[
@@ -23,3 +23,20 @@ def test_datetime(input_string, isoformat, string_repr):
     dt = HL7Datetime(input_string, delimiters)
     assert dt.isoformat() == isoformat
     assert str(dt) == string_repr
+
+
+def test_datetime_cache():
+    delimiters = HL7Delimiters(*"|^~\\&")
+
+    first = HL7Datetime("20250204141403+0100", delimiters)
+    second = HL7Datetime("20250204141403+0100^YYYYMMDDHHMMSS", delimiters)
+    other = HL7Datetime("20250205+0100", delimiters)
+    # parsed values and timezones are shared
+    assert first.datetime is second.datetime
+    assert first.datetime.tzinfo is other.datetime.tzinfo
+    assert str(second) == "20250204141403+0100"
+
+    # invalid values raise every time
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            HL7Datetime("20251304", delimiters)
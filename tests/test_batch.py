@@ -0,0 +1,65 @@
+import pytest
+
+from hl7parser.hl7_batch import HL7BatchEntry, HL7BatchFile
+
+MESSAGE = (
+    "MSH|^~\\&|LAB|FACILITY|RECEIVER|FACILITY|20240101120000||ORU^R01^ORU_R01|{0}|P|2.5\r"
+    "PID|1||{0}^^^HOSP^MR||DOE^JANE\r"
+    "OBX|1|NM|GLU^Glucose||{1}|mg/dl"
+)
+
+
+@pytest.fixture
+def batch_path(tmp_path):
+    path = tmp_path / "batch.hl7"
+    content = (
+        "FHS|^~\\&|LAB\rBHS|^~\\&|LAB\r"
+        + "\r".join(MESSAGE.format("MSG{0}".format(i), 90 + i) for i in range(4))
+        + "\rBTS|4\rFTS|1\r"
+    )
+    path.write_bytes(content.encode("utf-8"))
+    return path
+
+
+def test_batch_index(batch_path):
+    with HL7BatchFile(str(batch_path)) as batch:
+        assert len(batch) == 4
+        assert [entry.control_id for entry in batch.index] == [
+            "MSG0", "MSG1", "MSG2", "MSG3"
+        ]
+        assert batch.index[0].message_type == "ORU^R01^ORU_R01"
+        assert batch.envelope == ["FHS|^~\\&|LAB", "BHS|^~\\&|LAB", "BTS|4", "FTS|1"]
+
+        entry = batch.index[1]
+        assert isinstance(entry, HL7BatchEntry)
+        assert batch.get_raw(1) == batch_path.read_bytes()[entry.start:entry.end]
+        assert batch.get_raw(1).endswith(b"|91|mg/dl")
+
+
+def test_batch_access(batch_path):
+    with HL7BatchFile(str(batch_path), lazy=True) as batch:
+        assert str(batch[2].obx.observation_value) == "92"
+        assert batch[-1].obx.lazy
+        assert [str(m.msh.message_control_id) for m in batch[1:3]] == ["MSG1", "MSG2"]
+        assert len(list(batch)) == 4
+
+
+def test_batch_mllp_file(tmp_path):
+    path = tmp_path / "capture.hl7"
+    path.write_bytes(b"".join(
+        b"\x0b" + MESSAGE.format(i, i).encode("utf-8") + b"\x1c\r" for i in range(3)
+    ) + b"\x0bMSH|^~\\&|SHORT\x1c\r")
+
+    with HL7BatchFile(str(path)) as batch:
+        assert len(batch) == 4
+        assert str(batch[1].pid.patient_identifier_list[0].id_number) == "1"
+        assert batch.index[3].message_type == ""
+
+
+def test_empty_batch_file(tmp_path):
+    path = tmp_path / "empty.hl7"
+    path.write_bytes(b"")
+
+    with HL7BatchFile(str(path)) as batch:
+        assert len(batch) == 0
+        assert batch.envelope == []
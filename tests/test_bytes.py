@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+import pytest
+
+from hl7parser.hl7 import HL7Message, HL7Segment, get_codec
+
+MESSAGE = (
+    "MSH|^~\\&|LAB|FACILITY|RECEIVER|FACILITY|20240101120000||ORU^R01^ORU_R01|MSG1|P|2.5"
+    "||||||{0}\r"
+    "PID|1||4711^^^HOSP^MR||Müller^Jürgen||19700101\r\n"
+    "OBX|1|ED|PDF^Report||^application^pdf^Base64^JVBERi0xLjQK|||\n"
+)
+
+
+@pytest.mark.parametrize("character_set, codec", [
+    ("", "utf-8"),
+    ("UNICODE UTF-8", "utf-8"),
+    ("8859/1", "iso8859-1"),
+    ("8859/15~UNICODE UTF-8", "iso8859-15"),
+    ("latin-1", "iso8859-1"),
+])
+def test_bytes_message(character_set, codec):
+    raw = MESSAGE.format(character_set).encode(codec)
+
+    message = HL7Message(raw, lazy=True)
+
+    assert message.encoding == codec
+    # fields are kept as undecoded views of the input
+    assert isinstance(message.pid.fields[4], memoryview)
+    assert str(message.pid.patient_name[0].given_name) == "Jürgen"
+    assert isinstance(message.obx.fields[4], memoryview)
+    assert str(message.pid) == "PID|1||4711^^^HOSP^MR||Müller^Jürgen||19700101|"
+    assert [segment[0] for segment in message.segments] == ["msh", "pid", "obx"]
+
+
+def test_bytes_message_eager():
+    raw = bytearray(MESSAGE.format("8859/1").encode("latin-1"))
+
+    message = HL7Message(memoryview(raw))
+
+    assert str(message.pid.patient_name[0].family_name) == "Müller"
+    assert str(message.msh.character_set) == "8859/1"
+
+
+def test_bytes_message_explicit_encoding():
+    raw = MESSAGE.format("").encode("cp1252")
+
+    message = HL7Message(raw, lazy=True, encoding="cp1252")
+
+    assert str(message.pid.patient_name[0].given_name) == "Jürgen"
+
+
+@pytest.mark.parametrize("character_set, codec", [
+    ("BIG-5", "big5"),
+    ("UNICODE UTF-16", "utf-16"),
+])
+def test_bytes_message_multibyte(character_set, codec):
+    # the big5 encoding of these characters contains backslashes
+    text = MESSAGE.format(character_set).replace("Müller^Jürgen", "Muller^許蓋功")
+    raw = text.encode(codec)
+
+    if codec == "utf-16":
+        # MSH-18 can't be read without knowing the encoding
+        message = HL7Message(raw, encoding=codec)
+    else:
+        message = HL7Message(raw)
+
+    assert str(message.pid.patient_name[0].given_name) == "許蓋功"
+    # decoded as a whole
+    assert not isinstance(message.obx.fields[4], memoryview)
+
+
+def test_short_header():
+    message = HL7Message(b"MSH|^~\\&|LAB", lazy=True)
+
+    assert message.encoding == "utf-8"
+    assert str(message.msh.sending_application) == "LAB"
+
+
+def test_bytes_segment():
+    segment = HL7Segment(b"PID|1||4711", lazy=True, encoding="ascii")
+
+    assert segment.type == "PID"
+    assert str(segment.patient_identifier_list[0].id_number) == "4711"
+
+
+def test_get_codec():
+    assert get_codec("UNICODE UTF-8") == "utf-8"
+    assert get_codec("cp1252") == "cp1252"
+    assert get_codec("UNKNOWN", default="ascii") == "ascii"
+    assert get_codec(None) == "utf-8"
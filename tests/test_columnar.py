@@ -0,0 +1,87 @@
+import numpy
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_columnar import to_columns
+
+MESSAGES = [
+    "MSH|^~\\&|LAB|FAC|EHR|FAC|20240101120000+0100||ORU^R01|MSG1|P|2.5\r"
+    "PID|1||PATID1234||EVERYMAN^ADAM||19610615\r"
+    "OBX|1|NM|GLU||95|mg/dl\r"
+    "OBX|2|NM|HGB||13",
+    "MSH|^~\\&|LAB|FAC|EHR|FAC|||ORU^R01|MSG2|P|2.5\r"
+    "OBR|1|||GLU|||20240102\r"
+    "OBX|1|NM|GLU||96|mg/dl||||||||20240102\r"
+    "ZZZ|a||c",
+]
+
+
+def test_to_columns():
+    tables = to_columns(MESSAGES)
+    assert sorted(tables) == ["msh", "obr", "obx", "pid", "zzz"]
+
+    obx = tables["obx"]
+    assert obx["message_index"] == [0, 0, 1]
+    assert obx["message_control_id"] == ["MSG1", "MSG1", "MSG2"]
+    assert obx["segment_index"] == [2, 3, 2]
+    assert obx["obx.observation_value"] == ["95", "13", "96"]
+    assert obx["obx.units"] == ["mg/dl", None, "mg/dl"]
+    # not defined as datetime
+    assert obx["obx.observation_datetime"] == [None, None, "20240102"]
+    assert all(len(column) == 3 for column in obx.values())
+
+    assert tables["obr"]["obr.observation_datetime"] == [1704153600000000]
+    assert tables["msh"]["msh.message_datetime"] == [1704106800000000, None]
+    assert tables["msh"]["msh.encoding_characters"] == ["^~\\&", "^~\\&"]
+    assert tables["pid"]["pid.datetime_of_birth"] == [-269740800000000]
+    assert tables["pid"]["pid.patient_name"] == ["EVERYMAN^ADAM"]
+    # fields of segments without definition
+    assert tables["zzz"] == {
+        "message_index": [1],
+        "message_control_id": ["MSG2"],
+        "segment_index": [3],
+        "zzz.1": ["a"],
+        "zzz.2": [None],
+        "zzz.3": ["c"],
+    }
+
+
+def test_to_columns_parsed_messages():
+    raw = [
+        MESSAGES[0].replace("ORU^R01", "ORU^R01^ORU_R01^X")
+        + "\rPV1|1|I|||||004777^ATTEND^AARON^A^^^^^^NPI",
+        MESSAGES[1],
+    ]
+    messages = [HL7Message(raw[0]), HL7Message(raw[1].encode(), lazy=True)]
+    expected = str(messages[0])
+
+    tables = to_columns(messages)
+    assert tables == to_columns(raw)
+    # components which the data types don't define are kept
+    assert tables["msh"]["msh.message_type"][0] == "ORU^R01^ORU_R01^X"
+    assert tables["pv1"]["pv1.attending_doctor"] == ["004777^ATTEND^AARON^A^^^^^^NPI"]
+    # the exported messages aren't modified
+    assert str(messages[0]) == expected
+    assert 5 not in messages[0].msh._returned
+
+
+def test_to_columns_undefined_fields():
+    header = "MSH|^~\\&" + "|" * 23 + "|extra"
+    tables = to_columns([header])
+    assert tables["msh"]["msh.26"] == ["extra"]
+
+
+def test_to_columns_segment_types():
+    tables = to_columns(MESSAGES, segment_types=("pid", "zzz"))
+    assert sorted(tables) == ["pid", "zzz"]
+
+
+def test_to_columns_numpy():
+    tables = to_columns(MESSAGES, as_numpy=True)
+    obx = tables["obx"]
+    assert obx["message_index"].dtype == numpy.int64
+    assert obx["obx.observation_value"].dtype == object
+    assert list(obx["obx.units"]) == ["mg/dl", None, "mg/dl"]
+
+    dates = tables["msh"]["msh.message_datetime"].view("datetime64[us]")
+    assert dates[0] == numpy.datetime64("2024-01-01T11:00:00")
+    assert numpy.isnat(dates[1])
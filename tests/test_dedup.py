@@ -0,0 +1,125 @@
+import pytest
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_dedup import HL7DedupCache, SQLiteDedupCache, message_key
+
+MESSAGE = (
+    "MSH|^~\\&|{app}|HOSP|EHR|HOSP|20240101120000||ORU^R01|{control_id}|P|2.5\r"
+    "PID|1||4711^^^HOSP^MR||DOE^JANE"
+)
+
+
+def make(control_id, app="LAB"):
+    return MESSAGE.format(app=app, control_id=control_id)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    caches = []
+
+    def make_cache(**kwargs):
+        if request.param == "memory":
+            cache = HL7DedupCache(**kwargs)
+        else:
+            cache = SQLiteDedupCache(str(tmp_path / "dedup.sqlite"), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make_cache
+    for cache in caches:
+        if isinstance(cache, SQLiteDedupCache):
+            cache.close()
+
+
+def test_message_key():
+    raw = make("MSG1")
+    assert message_key(raw) == "LAB\x00HOSP\x00MSG1"
+    assert message_key(raw.encode("utf-8")) == "LAB\x00HOSP\x00MSG1"
+    assert message_key(HL7Message(raw)) == "LAB\x00HOSP\x00MSG1"
+    assert message_key(make("")) is None
+    # fields may contain "|" if the message uses other delimiters
+    other = "MSH#^~\\&#{0}#{1}#EHR#HOSP#20240101120000##ORU^R01#MSG1#P#2.5"
+    assert message_key(other.format("A|B", "C")) != message_key(other.format("A", "B|C"))
+    with pytest.raises(ValueError):
+        message_key("PID|1")
+
+
+def test_duplicates(make_cache):
+    cache = make_cache(max_size=10, ttl=60)
+
+    assert not cache.is_duplicate(make("MSG1"))
+    assert cache.is_duplicate(make("MSG1").encode("utf-8"))
+    # same control id from another sender
+    assert not cache.is_duplicate(make("MSG1", app="RAD"))
+    assert cache.is_duplicate(HL7Message(make("MSG1", app="RAD")))
+    # messages without control id are never duplicates
+    assert not cache.is_duplicate(make(""))
+    assert not cache.is_duplicate(make(""))
+
+    assert cache.snapshot() == {
+        "size": 2, "hits": 2, "misses": 2, "evictions": 0, "expirations": 0}
+
+    assert not cache.seen("LAB|HOSP|MSG2")
+    cache.add("LAB|HOSP|MSG2")
+    assert cache.seen("LAB|HOSP|MSG2")
+    cache.add("LAB|HOSP|MSG2")
+    assert len(cache) == 3
+    cache.discard("LAB|HOSP|MSG2")
+    cache.discard("LAB|HOSP|MSG2")
+    assert not cache.seen("LAB|HOSP|MSG2")
+    assert len(cache) == 2
+
+
+def test_eviction(make_cache):
+    cache = make_cache(max_size=3, ttl=None)
+    for control_id in ["1", "2", "3"]:
+        cache.add(control_id)
+    # seeing a key makes it the most recently used one
+    assert cache.seen("1")
+    cache.add("4")
+
+    assert len(cache) == 3
+    assert cache.evictions == 1
+    assert not cache.seen("2")
+    assert [cache.seen(key) for key in ["1", "3", "4"]] == [True, True, True]
+
+
+def test_expiration(make_cache):
+    clock = Clock()
+    cache = make_cache(max_size=100, ttl=10, clock=clock)
+    cache.add("1")
+    clock.now += 5
+    cache.add("2")
+    clock.now += 6
+    # expired, seeing "2" restarts its time to live
+    assert not cache.seen("1")
+    assert cache.seen("2")
+    clock.now += 9
+    assert cache.seen("2")
+    cache.add("3")
+    assert len(cache) == 2
+    assert cache.expirations == 1
+
+    clock.now += 20
+    # expired keys are removed when keys are added
+    cache.add("4")
+    assert len(cache) == 1
+    assert cache.expirations == 3
+
+
+def test_sqlite_persistence(tmp_path):
+    path = str(tmp_path / "dedup.sqlite")
+    with SQLiteDedupCache(path) as cache:
+        assert not cache.is_duplicate(make("MSG1"))
+
+    with SQLiteDedupCache(path) as cache:
+        assert len(cache) == 1
+        assert cache.is_duplicate(make("MSG1"))
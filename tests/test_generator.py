@@ -0,0 +1,98 @@
+import io
+
+import pytest
+
+from hl7parser.hl7 import HL7Message, get_delimiters
+from hl7parser.hl7_generator import HL7Generator
+from hl7parser.hl7_stream import iter_messages
+
+SEGMENTS = ["EVN", "PID", "PV1", "MRG", "IN1", "OBR"]
+
+
+def test_same_seed_same_messages():
+    first = list(HL7Generator(seed=42).messages(5))
+    second = list(HL7Generator(seed=42).messages(5))
+    assert first == second
+    assert first != list(HL7Generator(seed=43).messages(5))
+
+
+def test_messages_can_be_parsed():
+    generator = HL7Generator(
+        seed=7, segments=SEGMENTS, observations=3, fill_ratio=0.8, max_repeats=3,
+        escape_ratio=0.3,
+    )
+    for number, raw in enumerate(generator.messages(100), 1):
+        message = HL7Message(raw)
+        assert str(message.msh.message_control_id) == "{0:08d}".format(number)
+        assert [segment_type for segment_type, _ in message.segments] == (
+            ["msh"] + [segment_type.lower() for segment_type in SEGMENTS] + ["obx"] * 3)
+        assert [str(obx.set_id) for obx in message.obx] == ["1", "2", "3"]
+        # the rendered message is parsed into the same message again
+        assert str(HL7Message(str(message))) == str(message)
+
+
+def test_fill_ratio():
+    empty = HL7Generator(seed=1, segments=["PID"], observations=0, fill_ratio=0).message()
+    full = HL7Generator(seed=1, segments=["PID"], observations=0, fill_ratio=1).message()
+    assert len(empty) < len(full)
+    # only the required patient identifier list and name are filled
+    pid = HL7Message(empty).pid
+    assert str(pid.patient_identifier_list)
+    assert str(pid.patient_name)
+    assert str(pid.datetime_of_birth) == ""
+
+
+def test_escape_sequences():
+    delimiters = get_delimiters("#@*$%")
+    generator = HL7Generator(
+        seed=3, segments=["PID"], escape_ratio=1, fill_ratio=1, delimiters=delimiters)
+    raw = generator.message()
+    assert raw.startswith("MSH#@*$%#")
+    assert "$F$" in raw or "$S$" in raw or "$R$" in raw or "$E$" in raw or "$T$" in raw
+    message = HL7Message(raw)
+    assert message.delimiters is delimiters
+
+
+@pytest.mark.parametrize("precision", [4, 8, 12, 14, 16, 18])
+def test_datetime_precision(precision):
+    generator = HL7Generator(
+        seed=5, segments=["OBR"], observations=0, datetime_precision=precision,
+        timezone="+0100",
+    )
+    message = HL7Message(generator.message())
+    timestamp = str(message.msh.message_datetime)
+    assert len(timestamp) == (precision + 1 if precision > 14 else precision) + 5
+    assert timestamp.endswith("+0100")
+    assert message.msh.message_datetime[0].datetime.utcoffset().total_seconds() == 3600
+
+
+def test_variants():
+    generator = HL7Generator(seed=9, segments=["PID"], observations=2, variants=2)
+    messages = [message.split("\r") for message in generator.messages(20)]
+    assert len({lines[1] for lines in messages}) == 2
+    assert len({lines[2] for lines in messages}) == 2
+    # every message has its own header
+    assert len({lines[0] for lines in messages}) == 20
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        HL7Generator(segments=["XYZ"])
+    with pytest.raises(ValueError):
+        HL7Generator(segments=["MSH"])
+    with pytest.raises(ValueError):
+        HL7Generator(datetime_precision=3)
+
+
+@pytest.mark.parametrize("framing", ["mllp", "batch", "newline"])
+def test_write(framing):
+    generator = HL7Generator(seed=11)
+    binary = io.BytesIO()
+    assert generator.write(binary, 10, framing) == 10
+    binary.seek(0)
+    assert len(list(iter_messages(binary))) == 10
+
+
+def test_endless_messages():
+    messages = HL7Generator(seed=1).messages()
+    assert len([next(messages) for _ in range(3)]) == 3
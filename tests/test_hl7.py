@@ -1,8 +1,14 @@
 import pytest
 import mock
 
-from hl7parser.hl7 import HL7Segment
-from hl7parser.hl7_data_types import HL7DataType, HL7Datetime, make_cell_type
+from hl7parser.hl7 import HL7Delimiters, HL7Message, HL7Segment
+from hl7parser.hl7_data_types import (
+    HL7DataType,
+    HL7Datetime,
+    HL7RepeatingField,
+    compile_schema,
+    make_cell_type,
+)
 
 
 def test_hl7_segment_require_length():
@@ -59,3 +65,97 @@ def test_invalid_segment_definition():
     with mock.patch("hl7parser.hl7.segment_maps", segment_maps):
         with pytest.raises(Exception):
             HL7Segment("foo|1|2|3")
+
+
+def test_hl7_segment_lazy_fields():
+    segment_string = "PV1|1|I|2000^2012^01||||004777^ATTEND^AARON^A^^^^^^^^^^|||SUR|"
+    segment = HL7Segment(segment_string, lazy=True)
+
+    # fields are kept raw until accessed
+    assert segment.fields[2] == "2000^2012^01"
+    assert str(segment.assigned_patient_location.room) == "2012"
+    assert isinstance(segment.fields[2], HL7DataType)
+    assert segment.fields[6] == "004777^ATTEND^AARON^A^^^^^^^^^^"
+
+    # untouched fields are written back verbatim
+    assert str(segment) == segment_string
+
+    # fields missing from the input get their predefined type
+    assert isinstance(segment.admit_date, HL7Datetime)
+    assert not segment.admit_date
+
+    assert str(segment[-1]) == ""
+    assert [str(field) for field in segment[:3]] == ["1", "I", "2000^2012^01"]
+    assert str(segment[6]) == "004777^ATTEND^AARON^A^^^"
+
+
+def test_hl7_message_lazy():
+    message = HL7Message(
+        "MSH|^~\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01^ADT_A01|MSG00001|P|2.7\r"
+        "PID|1||PATID1234^5^M11~123456789^^^USSSA^SS||EVERYMAN^ADAM",
+        lazy=True,
+    )
+
+    assert message.pid.fields[2] == "PATID1234^5^M11~123456789^^^USSSA^SS"
+    assert str(message.pid.patient_identifier_list[1].id_number) == "123456789"
+    assert str(message.msh.message_type.trigger_event) == "A01"
+
+
+def test_compiled_schema():
+    definitions = [
+        make_cell_type('foo'),
+        make_cell_type('bar', options={"repeats": True, "type": HL7Datetime}),
+        make_cell_type('baz', index=4),
+    ]
+    schema = compile_schema(definitions)
+
+    # schemas are compiled once per definition list
+    assert compile_schema(definitions) is schema
+    assert len(schema) == 5
+    assert schema.types == (HL7DataType, HL7Datetime, HL7DataType, HL7DataType, HL7DataType)
+    assert schema.repeats == (False, True, None, None, False)
+    assert dict(schema.named_fields) == {"foo": 0, "bar": 1, "baz": 4}
+
+    with pytest.raises(AttributeError):
+        schema.types = ()
+
+    with pytest.raises(Exception):
+        compile_schema([make_cell_type('foo', index=2), make_cell_type('bar', index=1)])
+
+
+def test_segment_schema_gaps():
+    segment_maps = {
+        "foo": [
+            make_cell_type('foo'),
+            make_cell_type('bar', options={"type": HL7Datetime}, index=3),
+        ]
+    }
+
+    with mock.patch("hl7parser.hl7.segment_maps", segment_maps):
+        segment = HL7Segment("foo|1|a~b|c~d|20010101")
+        other = HL7Segment("foo|2")
+
+    assert segment.schema is other.schema
+    assert segment.field_definitions is segment_maps["foo"]
+    assert segment.named_fields["bar"] == 3
+    # repetitions in gaps are detected from the input
+    assert isinstance(segment[1], HL7RepeatingField)
+    assert str(segment[2]) == "c~d"
+    assert segment.bar.isoformat() == "2001-01-01T00:00:00"
+    assert isinstance(other.bar, HL7Datetime)
+
+
+def test_data_type_schema_gaps():
+    class GapType(HL7DataType):
+        field_map = [
+            make_cell_type('foo'),
+            make_cell_type('bar', index=2),
+        ]
+
+    value = GapType("1^2^3", HL7Delimiters(*"|^~\\&"))
+
+    assert str(value.foo) == "1"
+    assert str(value.bar) == "3"
+    assert str(value) == "1^2^3"
+    assert str(GapType(str(value), value.delimiters).bar) == "3"
+    assert str(GapType("1", value.delimiters)) == "1"
@@ -0,0 +1,81 @@
+import sys
+
+from hl7parser.hl7 import HL7Message
+import hl7parser.hl7_intern as interning
+from hl7parser.hl7_intern import HL7InternPool, disable_interning, enable_interning
+
+MESSAGE = (
+    "MSH|^~\\&|LAB|HOSPITAL|EHR|HOSPITAL|20240101120000||ORU^R01^ORU_R01|{0}|P|2.5\r"
+    "PID|1||{0}^^^HOSPITAL^MR||DOE^JANE\r"
+    "OBX|1|CWE|2345-7^Glucose^LN||95|mg/dl|70-110|N|||F\r"
+    "OBX|2|CWE|2951-2^Sodium^LN||140|mmol/l|135-145|N|||F"
+)
+
+
+def test_shared_values():
+    with HL7InternPool() as pool:
+        first = HL7Message(MESSAGE.format(1))
+        second = HL7Message(MESSAGE.format(2))
+    assert interning._pool is None
+
+    assert str(first.obx[0].units) == "mg/dl"
+    assert first.obx[0].units.value is second.obx[0].units.value
+    identifier = first.obx[1].observation_identifier
+    # the coding systems of the components
+    assert identifier[2].value is second.obx[0].observation_identifier[2].value
+    assert str(identifier) == "2951-2^Sodium^LN"
+    # fields of different messages don't change each other
+    first.obx[0].units.value = "g/l"
+    assert str(second.obx[0].units) == "mg/dl"
+
+    assert pool.hits > 10
+    assert pool.misses == len(pool)
+    assert pool.saved_bytes >= pool.hits * sys.getsizeof("")
+    assert pool.snapshot() == {
+        "size": len(pool), "hits": pool.hits, "misses": pool.misses,
+        "saved_bytes": pool.saved_bytes}
+
+
+def test_unchanged_messages():
+    raw = MESSAGE.format(1)
+    with HL7InternPool():
+        interned = HL7Message(raw)
+        lazy = HL7Message(raw, lazy=True)
+    assert str(lazy.obx[1].units) == "mmol/l"
+    assert str(interned) == str(lazy) == str(HL7Message(raw))
+    assert [str(field) for field in interned.obx[1].fields] == [
+        str(field) for field in HL7Message(raw).obx[1].fields]
+
+
+def test_limits():
+    pool = HL7InternPool(max_size=2, max_length=4)
+    long_value = "".join(["ABCD", "E"])
+    assert pool.intern(long_value) is long_value
+    assert pool.intern("") == "" and pool.intern("A") == "A"
+    assert len(pool) == 0
+
+    values = pool.intern_all(["".join(["A", str(i)]) for i in range(3)])
+    # the pool is full
+    assert len(pool) == 2
+    assert pool.misses == 3
+    assert pool.intern("".join(["A", "0"])) is values[0]
+    assert pool.intern("".join(["A", "2"])) is not values[2]
+    assert pool.hits == 1
+
+    pool.clear()
+    assert len(pool) == 0
+    assert pool.snapshot()["hits"] == 0
+
+
+def test_enable_interning():
+    pool = enable_interning()
+    try:
+        # nested pools restore the installed one
+        with HL7InternPool() as inner:
+            assert interning._pool is inner
+        assert interning._pool is pool
+        HL7Message(MESSAGE.format(1))
+    finally:
+        assert disable_interning() is pool
+    assert interning._pool is None
+    assert pool.misses > 0
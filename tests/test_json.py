@@ -0,0 +1,165 @@
+import io
+import json
+import os
+
+import mock
+import pytest
+
+from hl7parser.hl7 import HL7Message, HL7Segment
+from hl7parser.hl7_data_types import (
+    HL7DataType,
+    HL7Datetime,
+    HL7RepeatingField,
+    HL7_ExtendedPersonName,
+    compile_schema,
+    field_slots,
+    make_cell_type,
+)
+from hl7parser.hl7_generator import HL7Generator
+from hl7parser.hl7_json import segment_to_dict, to_dict, to_json, write_ndjson
+
+MESSAGE = "\r".join([
+    "MSH|^~\\&|LAB|HOSP|EHR|HOSP|20240101120000+0100||ORU^R01^ORU_R01|MSG1|P|2.5",
+    "PID|1||4711^^^HOSP^MR~0815^^^SSA^SS||DOE^JANE^Q|~|19700101|F|||1 MAIN ST^^SPRINGFIELD",
+    "OBX|1|NM|GLU^Glucose^LN||95|mg/dl|70-110|N|||F",
+    "OBX|2|ST|NOTE||A&B^C\\F\\D||||||F||||X|Y",
+])
+
+with open(os.path.join(os.path.dirname(__file__), "messages", "OBR.hl7")) as fp:
+    OBR_MESSAGE = fp.read()
+
+
+def walk(value):
+    """ reference conversion of the parsed data type objects """
+    if isinstance(value, HL7RepeatingField):
+        converted = [walk(repetition) for repetition in value]
+        return converted if any(converted) else None
+    if isinstance(value, HL7Datetime):
+        return value.isoformat()
+    if value.field_map:
+        result = {}
+        for _, name, _ in compile_schema(value.field_map).fields:
+            component = getattr(value, name)
+            converted = None if component is None else walk(component)
+            if converted:
+                result[name] = converted
+        return result
+    if hasattr(value, "value"):
+        return value.value
+    return [walk(component) for component in value.input_fields]
+
+
+def walk_message(message):
+    result = {}
+    for segment_type, segment in message.segments:
+        names = {index: name for name, index in segment.named_fields.items()}
+        fields = {}
+        for index in range(len(segment)):
+            if index == 0 and segment.type == "MSH":
+                converted = segment.raw_field(0)
+            else:
+                converted = walk(segment[index])
+            if converted:
+                number = index + (2 if segment.type == "MSH" else 1)
+                fields[names.get(index, str(number))] = converted
+        result.setdefault(segment_type, []).append(fields)
+    return result
+
+
+def test_to_dict():
+    result = to_dict(MESSAGE)
+
+    msh = result["msh"][0]
+    assert msh["encoding_characters"] == "^~\\&"
+    assert msh["message_datetime"] == ["2024-01-01T12:00:00+01:00"]
+    assert msh["message_type"] == {
+        "message_code": "ORU", "trigger_event": "R01", "message_structure": "ORU_R01"}
+    pid = result["pid"][0]
+    assert pid["patient_identifier_list"] == [
+        {"id_number": "4711", "assigning_authority": "HOSP", "identifier_type_code": "MR"},
+        {"id_number": "0815", "assigning_authority": "SSA", "identifier_type_code": "SS"},
+    ]
+    assert pid["datetime_of_birth"] == "1970-01-01T00:00:00"
+    assert "patient_id" not in pid
+    # only empty repetitions
+    assert "mothers_maiden_name" not in pid
+    assert [obx["set_id"] for obx in result["obx"]] == ["1", "2"]
+    assert result["obx"][0]["observation_identifier"] == ["GLU", "Glucose", "LN"]
+    # subcomponents, escape sequences are kept
+    assert result["obx"][1]["observation_value"] == [[["A", "B"], "C\\F\\D"]]
+    # fields beyond the definition
+    assert result["obx"][1]["15"] == "X"
+    assert result["obx"][1]["16"] == "Y"
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_same_as_object_model(lazy):
+    generator = HL7Generator(
+        seed=7, segments=["EVN", "PID", "PV1", "IN1", "OBR"], fill_ratio=0.7, max_repeats=3,
+        escape_ratio=0.2, timezone="+0200")
+    messages = [MESSAGE, OBR_MESSAGE] + list(generator.messages(20))
+    for raw in messages:
+        expected = walk_message(HL7Message(raw))
+        assert to_dict(HL7Message(raw, lazy=lazy)) == expected
+        assert json.loads(to_json(raw)) == json.loads(json.dumps(expected))
+
+
+def test_modified_fields():
+    message = HL7Message(MESSAGE)
+    message.pid.patient_name[0].given_name = HL7DataType("JOHN", message.delimiters)
+    message.obx[0][4] = "96"
+    message.obx[1].fields[3] = "1"
+
+    result = message.to_dict()
+    assert result["pid"][0]["patient_name"] == [
+        {"family_name": "DOE", "given_name": "JOHN", "middle_name": "Q"}]
+    assert result["obx"][0]["observation_value"] == ["96"]
+    assert result["obx"][1]["observation_sub_id"] == "1"
+    assert json.loads(message.to_json(indent=2)) == result
+
+
+class Coded(HL7DataType):
+    """ data type with its own constructor """
+    field_map = [
+        make_cell_type("code"),
+        make_cell_type("name", options={"type": HL7_ExtendedPersonName}),
+    ]
+    __slots__ = field_slots(field_map)
+
+    def __init__(self, composite, delimiters, use_delimiter="component_separator"):
+        super().__init__(composite.upper(), delimiters, use_delimiter)
+
+
+class Flag(HL7DataType):
+    __slots__ = ()
+
+    def __init__(self, composite, delimiters, use_delimiter="component_separator"):
+        super().__init__(composite or "", delimiters, use_delimiter)
+
+
+def test_custom_data_types():
+    segment_maps = {
+        "ZZZ": [
+            make_cell_type("coded", options={"type": Coded}),
+            make_cell_type("flag", options={"type": Flag}),
+        ]
+    }
+    with mock.patch("hl7parser.hl7.segment_maps", segment_maps):
+        segment = HL7Segment("ZZZ|a^doe&jane||x^y")
+        assert segment_to_dict(segment) == {
+            "coded": {"code": "A", "name": {"family_name": "DOE", "given_name": "JANE"}},
+            "3": ["x", "y"],
+        }
+        assert segment_to_dict(HL7Segment("ZZZ|^|Y")) == {"flag": "Y"}
+
+
+def test_write_ndjson():
+    text = io.StringIO()
+    assert write_ndjson(text, [MESSAGE, HL7Message(OBR_MESSAGE)]) == 2
+    lines = text.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == [to_dict(MESSAGE), to_dict(OBR_MESSAGE)]
+
+    binary = io.BytesIO()
+    assert write_ndjson(binary, [MESSAGE.replace("DOE", "MÜLLER").encode("utf-8")]) == 1
+    assert "MÜLLER" in binary.getvalue().decode("utf-8")
+    assert binary.getvalue().endswith(b"}\n")
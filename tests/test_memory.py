@@ -0,0 +1,79 @@
+import copy
+import os
+import tracemalloc
+
+import pytest
+
+from hl7parser.hl7 import HL7Message, HL7Segment, get_delimiters
+from hl7parser.hl7_data_types import HL7_ExtendedPersonName, HL7Datetime
+
+OBR_MESSAGE = os.path.join(os.path.dirname(__file__), "messages", "OBR.hl7")
+
+# documented memory target (bytes) for holding one parsed copy of OBR.hl7
+MEMORY_PER_MESSAGE = {
+    False: 70 * 1024,
+    True: 16 * 1024,
+}
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_memory_per_message(lazy):
+    with open(OBR_MESSAGE, encoding="utf-8") as f:
+        raw = f.read()
+    count = 100
+
+    tracemalloc.start()
+    try:
+        messages = [HL7Message(raw, lazy=lazy) for _ in range(count)]
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(messages) == count
+    assert allocated / count < MEMORY_PER_MESSAGE[lazy]
+
+
+def test_no_instance_dict():
+    message = HL7Message(
+        "MSH|^~\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01^ADT_A01|MSG00001|P|2.7\r"
+        "PID|1||PATID1234||EVERYMAN^ADAM||19610615"
+    )
+    pid = message.pid
+    for obj in (
+        message.delimiters,
+        pid,
+        pid.patient_identifier_list,
+        pid.patient_name[0],
+        pid.patient_name[0].family_name,
+        pid.datetime_of_birth,
+    ):
+        assert not hasattr(obj, "__dict__")
+
+    # delimiters are shared between messages
+    assert message.delimiters is get_delimiters("|^~\\&")
+    assert pid.delimiters is HL7Segment("PID|1").delimiters
+    # and can't be modified
+    with pytest.raises(AttributeError):
+        message.delimiters.field_separator = "#"
+    with pytest.raises(AttributeError):
+        del message.delimiters.escape_char
+    assert str(get_delimiters()) == "|^~\\&"
+
+    name = pid.patient_name[0]
+    assert isinstance(name, HL7_ExtendedPersonName)
+    assert name.given_name is not None
+    assert name.prefix is None
+    assert not HL7Datetime("", message.delimiters).datetime
+
+
+def test_copy_segment():
+    segment = HL7Segment("PID|1||PATID1234")
+
+    duplicate = copy.copy(segment)
+
+    assert str(duplicate) == str(segment)
+    assert str(duplicate.patient_identifier_list) == "PATID1234"
+
+    # uninitialized segments don't recurse on attribute access
+    with pytest.raises(AttributeError):
+        HL7Segment.__new__(HL7Segment).patient_name
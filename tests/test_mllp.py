@@ -0,0 +1,244 @@
+import asyncio
+import socket
+import struct
+
+from hl7parser.hl7 import HL7Message, HL7Segment
+from hl7parser.hl7_dedup import HL7DedupCache
+from hl7parser.hl7_mllp import ERROR_TEXT, REJECT_TEXT, MLLPServer, make_ack
+
+MESSAGE = (
+    "MSH|^~\\&|SENDER|SENDING FAC|RECEIVER|RECEIVING FAC|20240101120000||ADT^A01^ADT_A01|{0}|P|2.5\r"
+    "EVN|A01|20240101120000\r"
+    "PID|1||{0}^^^HOSP^MR||DOE^JANE"
+)
+
+
+def frame(text):
+    return b"\x0b" + text.encode("utf-8") + b"\x1c\r"
+
+
+async def send(port, data, split=None):
+    """ sends data to the server and returns the acknowledgement """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    if split:
+        writer.write(data[:split])
+        await writer.drain()
+        await asyncio.sleep(0.01)
+        data = data[split:]
+    writer.write(data)
+    await writer.drain()
+    response = await reader.readuntil(b"\x1c\r")
+    writer.close()
+    await writer.wait_closed()
+    assert response.startswith(b"\x0b")
+    return HL7Message(response[1:-2].decode("utf-8"))
+
+
+def test_make_ack():
+    message = HL7Message(MESSAGE.format("MSG1"))
+
+    ack = make_ack(message.header, "AE", text="invalid|field", control_id="ACK1")
+
+    assert str(ack.msh.sending_application) == "RECEIVER"
+    assert str(ack.msh.sending_facility) == "RECEIVING FAC"
+    assert str(ack.msh.receiving_application) == "SENDER"
+    assert str(ack.msh.receiving_facility) == "SENDING FAC"
+    assert str(ack.msh.message_type) == "ACK^A01^ACK"
+    assert str(ack.msh.message_control_id) == "ACK1"
+    assert str(ack.msh.version_id) == "2.5"
+    assert str(ack.msa.acknowledgement_code) == "AE"
+    assert str(ack.msa.message_control_id) == "MSG1"
+    assert str(ack.msa.text_message) == "invalid\\F\\field"
+
+    ack = make_ack(HL7Segment("MSH|^~\\&", lazy=True))
+    assert str(ack.msh.message_type) == "ACK^^ACK"
+    assert len(str(ack.msh.message_control_id)) == 20
+
+
+def test_mllp_server():
+    received = []
+
+    async def handler(message):
+        await asyncio.sleep(0.001)
+        received.append(str(message.msh.message_control_id))
+        if str(message.msh.message_control_id) == "FAIL":
+            raise ValueError("cannot store")
+        if str(message.msh.message_control_id) == "CUSTOM":
+            return make_ack(message.header, "AA", text="custom")
+
+    async def main():
+        async with MLLPServer(handler, port=0, max_concurrency=10) as server:
+            acks = await asyncio.gather(*[
+                send(server.port, frame(MESSAGE.format("MSG{0}".format(i))), split=i % 3 * 20)
+                for i in range(200)
+            ])
+            error = await send(server.port, frame(MESSAGE.format("FAIL")))
+            custom = await send(server.port, frame(MESSAGE.format("CUSTOM")))
+        async with MLLPServer(handler, port=0, error_text=str) as server:
+            error_text = await send(server.port, frame(MESSAGE.format("FAIL")))
+        return acks, error, custom, error_text
+
+    acks, error, custom, error_text = asyncio.run(main())
+
+    assert sorted(received) == sorted(
+        ["MSG{0}".format(i) for i in range(200)] + ["FAIL", "CUSTOM", "FAIL"])
+    for index, ack in enumerate(acks):
+        assert str(ack.msa.acknowledgement_code) == "AA"
+        assert str(ack.msa.message_control_id) == "MSG{0}".format(index)
+    assert str(error.msa.acknowledgement_code) == "AE"
+    # exceptions aren't sent to the remote peer by default
+    assert str(error.msa.text_message) == ERROR_TEXT
+    assert str(error_text.msa.text_message) == "cannot store"
+    assert str(custom.msa.text_message) == "custom"
+
+
+def test_mllp_server_invalid_messages():
+    async def handler(message):
+        return MESSAGE.format("RESPONSE")
+
+    async def main():
+        async with MLLPServer(handler, port=0) as server:
+            # several messages on one connection
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(frame(MESSAGE.format("A")) + frame(MESSAGE.format("B")))
+            responses = [
+                await reader.readuntil(b"\x1c\r"),
+                await reader.readuntil(b"\x1c\r"),
+            ]
+            writer.close()
+            await writer.wait_closed()
+
+            invalid_date = await send(server.port, frame(
+                MESSAGE.format("BAD").replace("EVN|A01|20240101120000", "EVN|A01|20241301")))
+            garbage = await send(server.port, frame("NO HL7"))
+        return responses, invalid_date, garbage
+
+    responses, invalid_date, garbage = asyncio.run(main())
+
+    assert responses == [frame(MESSAGE.format("RESPONSE"))] * 2
+    assert str(invalid_date.msa.acknowledgement_code) == "AR"
+    assert str(invalid_date.msa.message_control_id) == "BAD"
+    assert str(invalid_date.msh.receiving_application) == "SENDER"
+    assert str(garbage.msa.acknowledgement_code) == "AR"
+    assert str(garbage.msa.message_control_id) == ""
+    assert str(garbage.msa.text_message) == REJECT_TEXT
+    assert str(invalid_date.msa.text_message) == REJECT_TEXT
+
+
+def test_mllp_server_responses():
+    names = []
+
+    async def handler(message):
+        names.append(str(message.pid.patient_name[0].given_name))
+        control_id = str(message.msh.message_control_id)
+        if control_id == "MODIFIED":
+            ack = make_ack(message.header)
+            ack.msa[0] = "AE"
+            return ack
+        if control_id == "BYTES":
+            return HL7Message(MESSAGE.format("RESPONSE").encode("utf-8"))
+
+    async def main():
+        async with MLLPServer(handler, port=0) as server:
+            modified = await send(server.port, frame(MESSAGE.format("MODIFIED")))
+            binary = await send(server.port, frame(MESSAGE.format("BYTES")))
+            latin1 = await send(server.port, b"\x0b" + MESSAGE.format("LATIN1").replace(
+                "2.5", "2.5||||||8859/1").replace("JANE", "JÜRGEN").encode("latin-1")
+                + b"\x1c\r")
+        return modified, binary, latin1
+
+    modified, binary, latin1 = asyncio.run(main())
+
+    # modifications of the response are sent
+    assert str(modified.msa.acknowledgement_code) == "AE"
+    assert str(binary.msh.message_control_id) == "RESPONSE"
+    # the message is decoded with the character set in MSH-18
+    assert str(latin1.msa.acknowledgement_code) == "AA"
+    assert names == ["JANE", "JANE", "JÜRGEN"]
+
+
+def test_mllp_server_connection_reset():
+    async def handler(message):
+        await asyncio.sleep(0.05)
+
+    async def main():
+        async with MLLPServer(handler, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(frame(MESSAGE.format("A")))
+            await writer.drain()
+            # close with a reset instead of a regular shutdown
+            writer.get_extra_info("socket").setsockopt(
+                socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            writer.transport.abort()
+            await asyncio.sleep(0.1)
+            return await send(server.port, frame(MESSAGE.format("B")))
+
+    ack = asyncio.run(main())
+
+    assert str(ack.msa.message_control_id) == "B"
+
+
+def test_mllp_server_max_message_size():
+    async def handler(message):
+        pass
+
+    async def main():
+        async with MLLPServer(handler, port=0, max_message_size=200) as server:
+            ack = await send(server.port, frame(MESSAGE.format("A")))
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"\x0b" + b"X" * 500)
+            await writer.drain()
+            # the connection is closed without a response
+            response = await reader.read()
+            writer.close()
+            await writer.wait_closed()
+        return ack, response
+
+    ack, response = asyncio.run(main())
+
+    assert str(ack.msa.acknowledgement_code) == "AA"
+    assert response == b""
+
+
+def test_mllp_serve_forever():
+    async def handler(message):
+        pass
+
+    async def main():
+        server = MLLPServer(handler, port=0, lazy=True)
+        await server.start()
+        task = asyncio.ensure_future(server.serve_forever())
+        ack = await send(server.port, frame(MESSAGE.format("A")))
+        task.cancel()
+        await server.close()
+        return ack
+
+    ack = asyncio.run(main())
+
+    assert str(ack.msa.acknowledgement_code) == "AA"
+
+
+def test_mllp_server_dedup():
+    received = []
+
+    async def handler(message):
+        received.append(str(message.msh.message_control_id))
+        if len(received) == 2:
+            raise ValueError("cannot store")
+
+    async def main():
+        cache = HL7DedupCache()
+        async with MLLPServer(handler, port=0, dedup=cache) as server:
+            acks = [await send(server.port, frame(MESSAGE.format(control_id)))
+                    for control_id in ["A", "A", "B", "B", "B"]]
+            garbage = await send(server.port, frame("NO HL7"))
+        return acks, garbage, cache
+
+    acks, garbage, cache = asyncio.run(main())
+
+    # the failed message is handled again when it is retransmitted
+    assert received == ["A", "B", "B"]
+    assert [str(ack.msa.acknowledgement_code) for ack in acks] == ["AA", "AA", "AE", "AA", "AA"]
+    assert [str(ack.msa.message_control_id) for ack in acks] == ["A", "A", "B", "B", "B"]
+    assert str(garbage.msa.acknowledgement_code) == "AR"
+    assert (cache.hits, cache.misses) == (2, 3)
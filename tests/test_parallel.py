@@ -0,0 +1,51 @@
+import pytest
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_parallel import _parse, parse_many
+
+MESSAGE = (
+    "MSH|^~\\&|LAB|FACILITY|RECEIVER|FACILITY|20240101120000||ORU^R01^ORU_R01|{0}|P|2.5\r"
+    "PID|1||{0}^^^HOSP^MR||DOE^JANE\r"
+    "OBX|1|NM|GLU^Glucose||{0}|mg/dl"
+)
+
+
+def patient_id(message):
+    return str(message.pid.patient_identifier_list[0].id_number)
+
+
+def observation(message):
+    return str(message.msh.message_control_id), str(message.obx.observation_value[0])
+
+
+def test_parse_many_ordered():
+    raw = [MESSAGE.format(i) for i in range(50)]
+
+    result = list(parse_many(raw, observation, workers=2, chunksize=4))
+
+    assert result == [(str(i), str(i)) for i in range(50)]
+
+
+def test_parse_many_func():
+    raw = (MESSAGE.format(i) for i in range(50))
+
+    result = list(parse_many(raw, patient_id, workers=2, ordered=False, lazy=True))
+
+    assert sorted(result, key=int) == [str(i) for i in range(50)]
+
+
+def test_parse_many_error():
+    with pytest.raises(TypeError):
+        list(parse_many(["MSH"], patient_id, workers=1))
+
+
+def test_parse_many_default_workers():
+    assert list(parse_many([MESSAGE.format(1)], func=patient_id)) == ["1"]
+
+
+def test_parse_worker():
+    # the worker function runs in the calling process here
+    raw = MESSAGE.format(7)
+
+    assert _parse(str, False, raw) == str(HL7Message(raw))
+    assert _parse(patient_id, True, raw) == "7"
@@ -0,0 +1,123 @@
+import pytest
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_path import HL7Path, compile_path, evaluate
+from hl7parser.hl7_tokenizer import tokenize
+
+MESSAGE = (
+    "MSH|^~\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01^ADT_A01|MSG00001|P|2.7\r"
+    "PID|1||PATID1234^5^M11~123456789^^^USSSA^SS||EVERYMAN^ADAM||19610615|M||"
+    "|&HOME STREET&2^^Greensboro\r"
+    "OBX|1|NM|GLU^Glucose||95|mg/dl\r"
+    "OBX|2|NM|HGB^Hemoglobin||13~14|g/dl"
+)
+
+PATHS = [
+    ("MSH-1", "|"),
+    ("MSH-2", "^~\\&"),
+    ("MSH-9", "ADT^A01^ADT_A01"),
+    ("MSH-9.2", "A01"),
+    ("MSH-10", "MSG00001"),
+    ("PID-3", "PATID1234^5^M11"),
+    ("PID-3[2].4", "USSSA"),
+    ("PID-3[*].1", ["PATID1234", "123456789"]),
+    ("PID-3[3]", ""),
+    ("PID-3.9", ""),
+    ("PID-5.2", "ADAM"),
+    ("PID-7", "19610615"),
+    ("PID-11.1.2", "HOME STREET"),
+    ("PID-11.1.5", ""),
+    ("PID-99", ""),
+    ("OBX-5", "95"),
+    ("OBX[2]-5", "13"),
+    ("OBX[2]-5[2]", "14"),
+    ("OBX[*]-3.2", ["Glucose", "Hemoglobin"]),
+    ("OBX[*]-5[*]", ["95", "13", "14"]),
+    ("OBX[3]-5", ""),
+    ("NK1-2", ""),
+    ("NK1[*]-2", []),
+    # segments are returned as their raw text
+    ("PID", MESSAGE.split("\r")[1]),
+    ("OBX[2]", MESSAGE.split("\r")[3]),
+    ("OBX[*]", MESSAGE.split("\r")[2:]),
+]
+
+
+@pytest.mark.parametrize("expression, value", PATHS)
+@pytest.mark.parametrize("mode", [
+    {},
+    {"lazy": True},
+    {"fields": ["PID-3"]},
+    {"fields": ["PID-3"], "encoding": "ascii"},
+])
+def test_paths(expression, value, mode):
+    if "encoding" in mode:
+        message = HL7Message(MESSAGE.encode(mode["encoding"]), **mode)
+    else:
+        message = HL7Message(MESSAGE, **mode)
+
+    assert evaluate(message, expression) == value
+
+
+@pytest.mark.parametrize("expression, value", [
+    ("MSH-9.4", "X"),
+    ("PV1-7.10", "NPI"),
+    ("PV1-7", "004777^ATTEND^AARON^A^^^^^^NPI"),
+])
+def test_paths_undefined_components(expression, value):
+    # components which the data type doesn't define are read from the raw text
+    raw = MESSAGE.replace("ADT^A01^ADT_A01", "ADT^A01^ADT_A01^X") + (
+        "\rPV1|1|I|||||004777^ATTEND^AARON^A^^^^^^NPI")
+    for message in (
+        HL7Message(raw),
+        HL7Message(raw.encode("ascii")),
+        HL7Message(raw, lazy=True),
+        raw,
+    ):
+        assert evaluate(message, expression) == value
+
+
+def test_path_modified_segment():
+    message = HL7Message(MESSAGE, lazy=True)
+    message.obx[0][4] = "96"
+
+    # fields which were only read don't change the text
+    str(message.pid.patient_name)
+    assert evaluate(message, "PID") == MESSAGE.split("\r")[1]
+    # modified segments are rendered
+    assert evaluate(message, "OBX") == str(message.obx[0])
+    assert evaluate(message, "OBX").startswith("OBX|1|NM|GLU^Glucose||96|mg/dl")
+
+
+@pytest.mark.parametrize("expression, value", PATHS)
+@pytest.mark.parametrize("message", [
+    MESSAGE,
+    MESSAGE.encode("ascii"),
+    tokenize(MESSAGE.replace("\r", "\r\n")),
+])
+def test_paths_raw_message(expression, value, message):
+    assert evaluate(message, expression) == value
+
+
+def test_path_bytes_message():
+    message = HL7Message(MESSAGE.replace("EVERYMAN", "MÜLLER").encode("utf-8"), lazy=True)
+
+    assert evaluate(message, "PID-5.1") == "MÜLLER"
+    # the field is not parsed by the path
+    assert isinstance(message.pid.fields[4], memoryview)
+
+
+def test_compile_path_cache():
+    path = compile_path("PID-3[*].1")
+
+    assert isinstance(path, HL7Path)
+    assert compile_path("PID-3[*].1") is path
+    assert repr(path) == "HL7Path('PID-3[*].1')"
+
+
+@pytest.mark.parametrize("expression", [
+    "PID-3[0]", "PID-0", "MSH-0", "PID-3..1", "pid-3", "PID-a", "PID-3[x]"
+])
+def test_invalid_paths(expression):
+    with pytest.raises(ValueError):
+        compile_path(expression)
@@ -0,0 +1,157 @@
+import copy
+import copyreg
+import io
+import os
+import pickle
+
+import pytest
+
+from hl7parser.hl7 import HL7Delimiters, HL7Message, HL7Segment, get_delimiters
+from hl7parser.hl7_data_types import (
+    HL7DataType,
+    HL7Datetime,
+    HL7RepeatingField,
+    HL7Schema,
+    compile_schema,
+)
+
+with open(os.path.join(os.path.dirname(__file__), "messages", "OBR.hl7")) as fp:
+    OBR_MESSAGE = fp.read()
+
+MESSAGE = "\r".join([
+    "MSH|^~\\&|LAB|HOSP|EHR|HOSP|20240101120000+0100||ORU^R01^ORU_R01|MSG1|P|2.5",
+    "PID|1||4711^^^HOSP^MR~0815^^^SSA^SS||MÜLLER^JANE^Q",
+    "OBX|1|NM|GLU^Glucose^LN||95|mg/dl|70-110|N|||F",
+])
+
+
+def round_trip(value):
+    return pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def _restore(obj, state):
+    attributes, slots = state
+    if attributes:
+        obj.__dict__.update(attributes)
+    for name, value in slots.items():
+        object.__setattr__(obj, name, value)
+
+
+class GraphPickler(pickle.Pickler):
+    """ pickles the whole object graph, like the default pickling did """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, HL7Schema):
+            return (compile_schema, (obj.definitions,))
+        if not isinstance(
+                obj, (HL7Message, HL7Segment, HL7DataType, HL7RepeatingField, HL7Delimiters)):
+            return NotImplemented
+        slots = {
+            name: getattr(obj, name)
+            for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ())
+            if hasattr(obj, name)
+        }
+        return (
+            copyreg.__newobj__, (type(obj),), (getattr(obj, "__dict__", None), slots),
+            None, None, _restore)
+
+
+def graph_dumps(value):
+    fp = io.BytesIO()
+    GraphPickler(fp, pickle.HIGHEST_PROTOCOL).dump(value)
+    return fp.getvalue()
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("raw, encoding", [
+    (MESSAGE, None),
+    (MESSAGE.encode("utf-8"), None),
+    (MESSAGE.encode("latin-1"), "latin-1"),
+    (MESSAGE.encode("utf-16"), "utf-16"),
+], ids=["str", "utf-8", "latin-1", "utf-16"])
+def test_round_trip(raw, encoding, lazy):
+    message = HL7Message(raw, lazy=lazy, encoding=encoding)
+    copied = round_trip(message)
+
+    assert str(copied) == str(message)
+    assert copied.encoding == message.encoding
+    assert copied.lazy == lazy
+    assert str(copied.pid.patient_name[0].family_name) == "MÜLLER"
+    assert copied.msh.message_datetime[0].datetime == message.msh.message_datetime[0].datetime
+    assert str(copied.type) == str(message.type)
+    # eagerly parsed messages stay eager
+    assert isinstance(copied.obx.fields[4], HL7RepeatingField) is not lazy
+
+
+def test_segments_are_created_on_access():
+    copied = round_trip(HL7Message(OBR_MESSAGE))
+
+    assert [type(segment) for _, segment in copied._segments[1:]] == (
+        [str] * (len(copied._segments) - 1))
+    assert str(copied.pid.patient_name) == str(HL7Message(OBR_MESSAGE).pid.patient_name)
+    assert isinstance(copied._segments[copied.segment_position["pid"]][1], HL7Segment)
+    assert str(copied).replace("\n", "\r") == str(HL7Message(OBR_MESSAGE)).replace("\n", "\r")
+
+    # segments of a projection which weren't created
+    projected = HL7Message(MESSAGE.encode("utf-8"), fields=["PID"])
+    copied = round_trip(projected)
+    assert copied.message.split(b"\r")[1:] == MESSAGE.encode("utf-8").split(b"\r")[1:]
+    assert str(copied.obx.units) == "mg/dl"
+
+
+def test_modifications():
+    message = HL7Message(MESSAGE.encode("utf-8"), fields=["PID-5"])
+    message.pid.patient_name[0].given_name = HL7DataType("JOHN", message.delimiters)
+    message.obx.fields[4] = "96"
+    message.header[9] = "T"
+
+    copied = round_trip(message)
+
+    assert str(copied.pid.patient_name) == "MÜLLER^JOHN^Q"
+    assert str(copied.obx.observation_value) == "96"
+    assert str(copied.msh.processing_id) == "T"
+    assert str(copied) == str(message)
+    assert str(copy.copy(message)) == str(message)
+
+
+def test_segments_and_data_types():
+    message = HL7Message(MESSAGE.encode("utf-8"), lazy=True)
+    segment = message.pid
+    assert str(round_trip(segment)) == str(segment)
+    assert round_trip(segment).encoding == "utf-8"
+    segment[1] = "X"
+    copied = round_trip(segment)
+    assert str(copied) == str(segment)
+    assert copied.lazy
+
+    delimiters = get_delimiters("#$%@!")
+    assert round_trip(delimiters) is delimiters
+
+    fields = [
+        segment.patient_identifier_list,
+        segment.patient_name[0],
+        message.obx.observation_identifier,
+        message.obx.observation_identifier[1],
+        message.msh.message_datetime[0],
+        HL7Datetime("", delimiters),
+    ]
+    for field in fields:
+        copied = round_trip(field)
+        assert type(copied) is type(field)
+        assert str(copied) == str(field)
+    assert str(round_trip(segment.patient_name[0]).family_name) == "MÜLLER"
+    assert round_trip(message.msh.message_datetime[0]).precision == 14
+    assert round_trip(segment.patient_identifier_list).delimiters is message.delimiters
+
+
+def test_size():
+    message = HL7Message(OBR_MESSAGE)
+
+    compact = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    graph = graph_dumps(message)
+    # the object graph can be unpickled, too
+    assert str(pickle.loads(graph)) == str(message)
+
+    assert len(compact) < len(OBR_MESSAGE) + 200
+    assert len(compact) * 10 < len(graph)
+    # the time is measured by benchmarks/bench_pickle.py
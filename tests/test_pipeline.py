@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+
+import pytest
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_pipeline import HL7Pipeline
+
+MESSAGE = (
+    "MSH|^~\\&|ADT|HOSP|LAB|HOSP|20240101120000||ADT^{event}|{control_id}|P|2.5\r"
+    "EVN|{event}|20240101120000\r"
+    "PID|1||{patient}^^^HOSP^MR||DOE^JANE"
+)
+EVENTS = ["A01", "A08", "A03"]
+
+
+def interleaved(patients, seed=21):
+    """ returns the events of all patients randomly interleaved, in order per patient """
+    remaining = {patient: list(EVENTS) for patient in range(patients)}
+    rng = random.Random(seed)
+    messages = []
+    while remaining:
+        patient = rng.choice(list(remaining))
+        event = remaining[patient].pop(0)
+        if not remaining[patient]:
+            del remaining[patient]
+        messages.append(MESSAGE.format(
+            event=event, control_id=len(messages), patient="P{0}".format(patient)))
+    return messages
+
+
+class Recorder:
+    """ handler recording the events per patient and the concurrency """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.events = {}
+        self.active = set()
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, message):
+        patient = str(message.pid.patient_identifier_list[0].id_number)
+        with self.lock:
+            assert patient not in self.active, "patient processed concurrently"
+            self.active.add(patient)
+            self.max_active = max(self.max_active, len(self.active))
+        time.sleep(self.delay)
+        with self.lock:
+            self.active.remove(patient)
+            self.events.setdefault(patient, []).append(str(message.evn[0]))
+
+
+@pytest.mark.parametrize("workers, max_pending", [(1, None), (16, 100)])
+def test_order_per_patient(workers, max_pending):
+    messages = interleaved(2000)
+    recorder = Recorder()
+
+    with HL7Pipeline(recorder, workers=workers, lazy=True, max_pending=max_pending) as pipeline:
+        for message in messages:
+            pipeline.submit(message)
+
+    assert len(recorder.events) == 2000
+    assert all(events == EVENTS for events in recorder.events.values())
+
+
+def test_parallel_patients():
+    # handlers waiting e.g. for a database run in parallel across patients,
+    # the throughput is measured by benchmarks/bench_pipeline.py
+    messages = interleaved(100)
+    recorder = Recorder(delay=0.005)
+
+    with HL7Pipeline(recorder, workers=16, lazy=True) as pipeline:
+        for message in messages:
+            pipeline.submit(message)
+
+    assert all(events == EVENTS for events in recorder.events.values())
+    assert recorder.max_active >= 4
+
+
+def test_single_patient_is_sequential():
+    recorder = Recorder(delay=0.001)
+    with HL7Pipeline(recorder, workers=8) as pipeline:
+        for event in EVENTS * 10:
+            pipeline.submit(MESSAGE.format(event=event, control_id=1, patient="P1"))
+    assert recorder.events["P1"] == EVENTS * 10
+    assert recorder.max_active == 1
+
+
+def test_key_function_and_parsed_messages():
+    keys = []
+    processed = []
+
+    def key(message):
+        keys.append(message)
+        return "all"
+
+    pipeline = HL7Pipeline(processed.append, workers=2, key=key)
+    message = HL7Message(MESSAGE.format(event="A01", control_id=1, patient="P1"))
+    pipeline.submit(message)
+    pipeline.submit(MESSAGE.format(event="A08", control_id=2, patient="P2").encode("utf-8"))
+    pipeline.join()
+    assert processed[0] is message
+    assert str(processed[1].msh.message_control_id) == "2"
+    assert keys[0] is message
+
+    pipeline.close()
+    pipeline.close()
+    with pytest.raises(ValueError):
+        pipeline.submit(message)
+
+
+def test_errors(caplog):
+    calls = []
+    errors = []
+
+    def handler(message):
+        if str(message.evn[0]) == "A08":
+            raise RuntimeError("cannot store")
+        calls.append(str(message.evn[0]))
+
+    with HL7Pipeline(
+        handler, workers=2, on_error=lambda message, error: errors.append((message, error))
+    ) as pipeline:
+        for event in EVENTS:
+            pipeline.submit(MESSAGE.format(event=event, control_id=1, patient="P1"))
+        # the key can't be read and the message can't be parsed
+        pipeline.submit("NO HL7")
+
+    # the following messages of the patient are processed
+    assert calls == ["A01", "A03"]
+    assert len(errors) == 2
+    for message, error in errors:
+        if isinstance(error, RuntimeError):
+            assert str(message.msh.message_type) == "ADT^A08"
+        else:
+            assert message == "NO HL7"
+
+    with caplog.at_level(logging.ERROR), HL7Pipeline(handler) as pipeline:
+        pipeline.submit(MESSAGE.format(event="A08", control_id=1, patient="P1"))
+    assert "Error processing message" in caplog.text
+
+
+def test_failing_error_callback(caplog):
+    def handler(message):
+        raise RuntimeError("cannot store")
+
+    def on_error(message, error):
+        raise ValueError("cannot report")
+
+    def run():
+        with HL7Pipeline(handler, workers=1, max_pending=1, on_error=on_error) as pipeline:
+            for event in EVENTS:
+                pipeline.submit(MESSAGE.format(event=event, control_id=1, patient="P1"))
+        done.append(pipeline)
+
+    done = []
+    with caplog.at_level(logging.ERROR):
+        # the workers survive and the pipeline doesn't hang
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(5)
+
+    assert done
+    assert done[0]._unfinished == 0
+    assert caplog.text.count("Error in on_error callback") == 3
+
+
+def test_default_key_character_set():
+    message = MESSAGE.format(event="A01", control_id=1, patient="P1").replace(
+        "P|2.5", "P|2.5||||||8859/1").replace("JANE", "JÜRGEN").encode("latin-1")
+    with HL7Pipeline(lambda message: None, workers=1) as pipeline:
+        assert pipeline.key(message) == "P1"
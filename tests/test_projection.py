@@ -0,0 +1,57 @@
+import pytest
+
+from hl7parser.hl7 import HL7Message, HL7Segment
+from hl7parser.hl7_data_types import HL7_ExtendedCompositeId, HL7_MessageType
+
+MESSAGE = (
+    "MSH|^~\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01^ADT_A01|MSG00001|P|2.7\r"
+    "EVN|A01|200708181123\r"
+    "PID|1||PATID1234^5^M11~123456789^^^USSSA^SS||EVERYMAN^ADAM\r"
+    "PV1|1|I|2000^2012^01||||004777^ATTEND^AARON^A|||SUR||||ADM|A0||||V100\r"
+    "OBX|1|NM|GLU||95|mg/dl\r"
+    "OBX|2|NM|HGB||13|g/dl"
+)
+
+
+@pytest.mark.parametrize("raw", [MESSAGE, MESSAGE.encode("utf-8")])
+def test_projection(raw):
+    message = HL7Message(raw, fields=["MSH-9", "PID-3", "PV1-19", "PV1-99", "OBX"])
+
+    segments = message._segments
+    # requested fields are parsed, all others are kept raw
+    assert isinstance(message.header.fields[7], HL7_MessageType)
+    assert isinstance(message.header.fields[1], (str, memoryview))
+    pid = segments[2][1]
+    assert isinstance(pid.fields[2][0], HL7_ExtendedCompositeId)
+    assert isinstance(pid.fields[4], (str, memoryview))
+    assert str(segments[3][1].fields[18]) == "V100"
+    assert not isinstance(segments[4][1].fields[4], (str, memoryview))
+    # unrequested segments are kept raw until accessed
+    assert not isinstance(segments[1][1], HL7Segment)
+
+    assert str(message.pid.patient_identifier_list[1].id_number) == "123456789"
+    assert message.evn.recorded_datetime.isoformat() == "2007-08-18T11:23:00"
+    assert str(message.obx[1].observation_value) == "13"
+    assert [segment_type for segment_type, _ in message.segments] == [
+        "msh", "evn", "pid", "pv1", "obx", "obx"
+    ]
+    assert all(isinstance(segment, HL7Segment) for _, segment in message.segments)
+
+
+def test_projection_unrequested_lazy():
+    message = HL7Message(MESSAGE, lazy=True, fields=["PID-5", "PID"])
+
+    assert message.evn.lazy
+    assert not isinstance(message._segments[2][1].fields[2], str)
+    assert isinstance(message.pv1.fields[2], str)
+
+
+@pytest.mark.parametrize("spec", ["PID-x", "PID-0", "MSH-1"])
+def test_invalid_projection(spec):
+    with pytest.raises(ValueError):
+        HL7Message(MESSAGE, fields=[spec])
+
+
+def test_uninitialized_message():
+    with pytest.raises(AttributeError):
+        HL7Message.__new__(HL7Message).pid
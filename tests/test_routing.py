@@ -0,0 +1,91 @@
+import pytest
+
+from hl7parser.hl7 import HL7Message
+from hl7parser.hl7_routing import HL7Dispatcher, peek_header
+
+MESSAGE = "\r".join([
+    "MSH|^~\\&|LAB|HOSP|EHR|HOSP|20240101120000||ORU^R01^ORU_R01|MSG1|P|2.5",
+    "PID|1||4711^^^HOSP^MR||MÜLLER^JANE",
+    "OBX|1|NM|GLU||95",
+])
+
+
+@pytest.mark.parametrize("raw", [
+    MESSAGE,
+    MESSAGE.replace("\r", "\r\n"),
+    MESSAGE.encode("utf-8"),
+    memoryview(MESSAGE.replace("\r", "\n").encode("utf-8")),
+])
+def test_peek_header(raw):
+    header, (start, end) = peek_header(raw)
+
+    assert header.type == "MSH"
+    assert str(header.sending_application) == "LAB"
+    assert str(header.message_type.trigger_event) == "R01"
+    assert str(header.message_control_id) == "MSG1"
+    assert header.message_datetime[0].datetime.year == 2024
+    assert end == len(raw)
+    rest = raw[start:end]
+    if not isinstance(rest, str):
+        rest = str(rest, "utf-8")
+    assert rest.splitlines()[0] == "PID|1||4711^^^HOSP^MR||MÜLLER^JANE"
+    # the rest can be parsed together with the header
+    message = HL7Message(str(header) + "\r" + rest)
+    assert str(message.pid.patient_name[0].family_name) == "MÜLLER"
+
+
+def test_peek_header_lazy():
+    header, _ = peek_header(MESSAGE, lazy=True)
+    assert isinstance(header.fields[9], str)
+    assert str(header.version_id) == "2.5"
+
+
+def test_peek_header_only():
+    header, span = peek_header(MESSAGE.split("\r")[0])
+    assert str(header.message_control_id) == "MSG1"
+    assert span == (len(MESSAGE.split("\r")[0]),) * 2
+
+
+def test_peek_header_encoding():
+    raw = MESSAGE.replace("P|2.5", "P|2.5||||||UNICODE UTF-16")
+    header, (start, end) = peek_header(raw.encode("utf-16"), encoding="utf-16")
+    assert str(header.character_set) == "UNICODE UTF-16"
+    # the message was decoded as a whole
+    assert end == len(raw)
+
+    raw = MESSAGE.replace("EHR", "EHRÄ")
+    header, _ = peek_header(raw.encode("latin-1"), encoding="latin-1")
+    assert str(header.receiving_application) == "EHRÄ"
+
+
+def test_peek_header_invalid():
+    with pytest.raises(ValueError):
+        peek_header("PID|1")
+
+
+def test_dispatcher():
+    dispatcher = HL7Dispatcher()
+    calls = []
+
+    @dispatcher.register("ORU", "R01")
+    def results(header, raw):
+        calls.append(("results", str(header.message_control_id), raw))
+        return "R01"
+
+    @dispatcher.register("ADT")
+    def admissions(header, raw):
+        return "ADT " + str(header.message_type.trigger_event)
+
+    assert dispatcher.dispatch(MESSAGE) == "R01"
+    assert calls == [("results", "MSG1", MESSAGE)]
+    assert dispatcher.dispatch(MESSAGE.replace("ORU^R01", "ADT^A08").encode()) == "ADT A08"
+
+    with pytest.raises(ValueError):
+        dispatcher.dispatch(MESSAGE.replace("ORU^R01", "ORU^R30"))
+
+    dispatcher.default = lambda header, raw: "default"
+    assert dispatcher.dispatch(MESSAGE.replace("ORU^R01", "ORU^R30")) == "default"
+    # specific handlers win over handlers of all events
+    dispatcher.register("ORU", None, lambda header, raw: "ORU")
+    assert dispatcher.dispatch(MESSAGE) == "R01"
+    assert dispatcher.get_handler("ORU", "R30")(None, None) == "ORU"
@@ -0,0 +1,194 @@
+import io
+
+import pytest
+
+from hl7parser.hl7 import HL7Message, HL7Segment
+from hl7parser.hl7_data_types import HL7DataType
+from hl7parser.hl7_stream import iter_messages, write_messages
+
+MESSAGE = "\r".join([
+    "MSH|^~\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01|MSG00001|P|2.7",
+    "PID|1||PATID1234^5^M11||EVERYMAN^ADAM||19610615.0|M||||||||||",
+    "PV1||I|W^389^1||||12345^MORGAN^REX^J^^^MD^0010^UAMC^L",
+    "ZZZ|a|b",
+])
+LINES = MESSAGE.split("\r")
+
+
+def test_unmodified_segments_are_written_verbatim():
+    message = HL7Message(MESSAGE)
+    assert str(message) == "\n".join([
+        LINES[0] + "|",
+        "PID|1||PATID1234^5^M11||EVERYMAN^ADAM||19610615.0|M|",
+        # components not defined in the data type are kept
+        LINES[2] + "|",
+        LINES[3],
+    ])
+
+
+def test_modified_fields_are_rendered():
+    message = HL7Message(MESSAGE)
+    message.header[1] = "NEWAPP"
+    message.pv1[10] = "X"
+    assert str(message.header).startswith("MSH|^~\\&|NEWAPP|HOSPITAL|LAB|")
+    assert str(message.pv1) == (
+        "PV1||I|W^389^1||||12345^MORGAN^REX^J^^^MD^0010^UAMC^L||||X|")
+
+    # returned data types may be modified
+    name = message.pid.patient_name[0]
+    name.family_name = HL7DataType("DOE", message.delimiters)
+    # the other fields are kept as they are
+    assert str(message.pid) == "PID|1||PATID1234^5^M11||DOE^ADAM||19610615.0|M|"
+
+
+def test_read_fields_are_kept():
+    message = HL7Message(MESSAGE.replace("ADT^A01", "ADT^A01^ADT_A01^X"))
+    expected = str(message)
+    # reading fields doesn't change the output, even if their data type
+    # doesn't define all of their components
+    assert str(message.pv1.attending_doctor[0].person_identifier) == "12345"
+    assert str(message.msh.message_type.trigger_event) == "A01"
+    assert str(message) == expected
+    assert "ADT^A01^ADT_A01^X|" in str(message.msh)
+
+    # modifying a returned field renders it
+    message.pv1.attending_doctor[0].person_identifier = HL7DataType("54321", message.delimiters)
+    assert str(message.pv1) == "PV1||I|W^389^1||||54321^MORGAN^REX^J^^^MD|"
+
+
+def test_added_fields_are_rendered():
+    segment = HL7Segment("ZZZ|a|b")
+    segment.require_length(4)
+    assert str(segment) == "ZZZ|a|b|"
+    segment[4] = "e"
+    segment[-3] = "c"
+    assert str(segment) == "ZZZ|a|b|c||e"
+
+
+def test_fields_list_modification():
+    segment = HL7Segment("ZZZ|a|b|c")
+    segment.fields[1] = "B"
+    del segment.fields[2]
+    assert str(segment) == "ZZZ|a|B"
+
+    segment = HL7Segment("ZZZ|a|b|c")
+    segment.fields = ["x"]
+    assert str(segment) == "ZZZ|x"
+
+
+def test_bytes_segment():
+    segment = HL7Segment("ZZZ|Müller|b".encode("utf-8"), lazy=True)
+    assert str(segment) == "ZZZ|Müller|b"
+    segment[1] = "B"
+    assert str(segment) == "ZZZ|Müller|B"
+
+
+def test_raw_field():
+    segment = HL7Segment("ZZZ|a^b|c".encode("utf-8"), lazy=True)
+    assert segment.raw_field(0) == "a^b"
+    segment[1] = "d"
+    assert segment.raw_field(1) == "d"
+    assert segment.raw_field(5) == ""
+    assert str(HL7Segment("ZZZ|a^b|c", lazy=True)) == "ZZZ|a^b|c"
+
+
+def test_message_with_raw_lines():
+    for raw in (MESSAGE, MESSAGE.encode("utf-8")):
+        projected = HL7Message(raw, fields=["PV1-3"])
+        assert not isinstance(projected._segments[1][1], HL7Segment)
+        assert str(projected) == str(HL7Message(MESSAGE, lazy=True))
+
+
+def test_write_to():
+    message = HL7Message(MESSAGE)
+    message.header[1] = "NEWAPP"
+    expected = str(message).replace("\n", "\r") + "\r"
+
+    text = io.StringIO()
+    message.write_to(text)
+    assert text.getvalue() == expected
+
+    binary = io.BytesIO()
+    message.write_to(binary, separator="\n")
+    assert binary.getvalue() == expected.replace("\r", "\n").encode("utf-8")
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "latin-1"])
+def test_write_to_bytes(encoding):
+    raw = (MESSAGE + "\rZZZ|Müller\rZZZ|x||").encode("utf-8")
+    for message in (
+        HL7Message(raw, lazy=True),
+        HL7Message(raw, fields=["PID-3"]),
+        HL7Message(raw.decode("utf-8"), fields=["PID-3"]),
+    ):
+        message.pv1[1] = "O"
+        expected = str(message).replace("\n", "\r") + "\r"
+
+        binary = io.BytesIO()
+        message.write_to(binary, encoding)
+        assert binary.getvalue() == expected.encode(encoding)
+
+        text = io.StringIO()
+        message.write_to(text)
+        assert text.getvalue() == expected
+
+
+@pytest.mark.parametrize("framing", ["mllp", "batch", "newline"])
+def test_write_messages(framing):
+    messages = [MESSAGE, HL7Message(MESSAGE.replace("MSG00001", "MSG00002"))]
+    binary = io.BytesIO()
+    assert write_messages(binary, messages, framing) == 2
+
+    binary.seek(0)
+    control_ids = [
+        str(message.header.message_control_id) for message in iter_messages(binary)]
+    assert control_ids == ["MSG00001", "MSG00002"]
+
+
+def test_write_batch():
+    text = io.StringIO()
+    assert write_messages(text, [MESSAGE] * 3, "batch", batch_header="BHS|^~\\&|LAB") == 3
+    lines = text.getvalue().split("\r")
+    assert lines[:2] == ["FHS|^~\\&", "BHS|^~\\&|LAB"]
+    assert lines[-3:] == ["BTS|3", "FTS|1", ""]
+
+    text = io.StringIO()
+    assert write_messages(text, [], "batch") == 0
+    assert text.getvalue() == "FHS|^~\\&\rBHS|^~\\&\rBTS|0\rFTS|1\r"
+
+
+def test_write_raw_messages():
+    messages = [
+        HL7Message(MESSAGE), MESSAGE.replace("\r", "\r\n"), MESSAGE.replace("\r", "\n")]
+    text = io.StringIO()
+    write_messages(text, messages, "batch")
+    lines = text.getvalue().split("\r")
+    assert lines[0] == "FHS|^~\\&"
+    # raw messages are written as they are, only the line endings are replaced
+    assert lines[-11:-3] == LINES + LINES
+
+
+def test_write_mllp():
+    binary = io.BytesIO()
+    write_messages(binary, [MESSAGE], "mllp")
+    assert binary.getvalue().startswith(b"\x0bMSH|")
+    assert binary.getvalue().endswith(b"|a|b\r\x1c\r")
+
+    with pytest.raises(ValueError):
+        write_messages(binary, [MESSAGE], "xml")
+
+
+def test_write_messages_message_encoding():
+    raw = (
+        "MSH|^~\\&|LAB|FAC|EHR|FAC|20240101120000||ORU^R01|MSG1|P|2.5||||||8859/1\r"
+        "PID|1||4711||Müller")
+    for message in (HL7Message(raw.encode("latin-1")), raw):
+        expected = str(message).replace("\n", "\r") + "\r\n"
+        binary = io.BytesIO()
+        write_messages(binary, [message], "newline")
+        # written in the character set given in MSH-18
+        assert binary.getvalue() == expected.encode("latin-1")
+
+        binary = io.BytesIO()
+        write_messages(binary, [message], "newline", encoding="utf-8")
+        assert binary.getvalue() == expected.encode("utf-8")
@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+from hl7parser import hl7
+from hl7parser.hl7 import HL7Message, HL7Stats, disable_stats, enable_stats
+
+MESSAGE = "\r".join([
+    "MSH|^~\\&|LAB|FAC|EHR|FAC|20240101120000||ORU^R01|MSG1|P|2.5",
+    "PID|1||PATID1234||EVERYMAN^ADAM||19610615",
+    "OBX|1|NM|GLU||95|mg/dl",
+    "OBX|2|NM|HGB||13",
+    "ZZZ|a|b",
+])
+
+
+@pytest.fixture
+def stats():
+    stats = enable_stats()
+    yield stats
+    disable_stats()
+
+
+def test_disabled_by_default():
+    assert hl7._stats is None
+    assert disable_stats() is None
+
+
+def test_phases(stats):
+    message = HL7Message(MESSAGE)
+    str(message)
+    message.write_to(io.BytesIO())
+
+    snapshot = stats.snapshot()
+    phases = snapshot["phases"]
+    assert phases["parse"]["count"] == 1
+    # the lines of the message and the fields of every segment are split
+    assert phases["split"]["count"] == 6
+    assert phases["serialize"]["count"] == 2
+    assert phases["parse"]["seconds"] >= phases["split"]["seconds"] > 0
+    assert snapshot["segments"]["OBX"]["count"] == 2
+    assert snapshot["data_types"]["HL7Datetime"]["count"] == 2
+    assert phases["fields"]["count"] == sum(
+        timer["count"] for timer in snapshot["data_types"].values())
+    # the snapshot can be exported
+    json.dumps(snapshot)
+
+
+def test_lazy_fields(stats):
+    message = HL7Message(MESSAGE, lazy=True)
+    # only the message type is parsed
+    assert list(stats.snapshot()["data_types"]) == ["HL7DataType"]
+    message.pid.datetime_of_birth
+    message.zzz[1]
+    snapshot = stats.snapshot()
+    assert snapshot["phases"]["fields"]["count"] == 3
+    assert snapshot["data_types"]["HL7Datetime"]["count"] == 1
+    assert snapshot["data_types"]["HL7DataType"]["count"] == 2
+
+
+def test_slow_messages():
+    slow = []
+    stats = enable_stats(HL7Stats(0, lambda message, seconds: slow.append(message)))
+    try:
+        message = HL7Message(MESSAGE)
+        stats.slow_threshold = None
+        HL7Message(MESSAGE)
+        stats.slow_threshold = 3600
+        HL7Message(MESSAGE)
+    finally:
+        assert disable_stats() is stats
+    assert slow == [message]
+    assert stats.snapshot()["slow_messages"] == 1
+
+    stats = HL7Stats(slow_threshold=0)
+    stats._message(message, 1.0)
+    assert stats.slow_messages == 1
+
+
+def test_reset(stats):
+    HL7Message(MESSAGE)
+    stats.reset()
+    assert stats.snapshot() == HL7Stats().snapshot()
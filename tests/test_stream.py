@@ -0,0 +1,194 @@
+import io
+import socket
+
+import pytest
+
+from hl7parser import HL7StreamParser, iter_messages
+from hl7parser.hl7_stream import _MessageFramer
+
+MESSAGE = (
+    "MSH|^~\\&|SENDER|FACILITY|RECEIVER|FACILITY|20240101120000||ADT^A01^ADT_A01|{0}|P|2.5\r"
+    "EVN|A01|20240101120000\r"
+    "PID|1||{0}^^^HOSP^MR||DOE^JANE"
+)
+
+
+def messages(count):
+    return [MESSAGE.format("MSG{0}".format(index)) for index in range(count)]
+
+
+def mllp(message):
+    return b"\x0b" + message.encode("utf-8") + b"\x1c\r"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_iter_mllp_messages(chunk_size):
+    raw = messages(5)
+    stream = io.BytesIO(b"".join(mllp(message) for message in raw))
+
+    result = list(iter_messages(stream, chunk_size=chunk_size))
+
+    assert [str(message.msh.message_control_id) for message in result] == [
+        "MSG0", "MSG1", "MSG2", "MSG3", "MSG4"
+    ]
+    assert str(result[2].pid.patient_name[0].given_name) == "JANE"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 65536])
+def test_iter_unframed_messages(chunk_size):
+    raw = messages(3)
+    data = (
+        "FHS|^~\\&|SENDER\r\nBHS|^~\\&|SENDER\r\n"
+        + "\r\n".join(raw)
+        + "\r\n\r\nBTS|3\r\nFTS|1"
+    )
+
+    result = list(iter_messages(io.BytesIO(data.encode("utf-8")), chunk_size=chunk_size))
+
+    assert [str(message.msh.message_control_id) for message in result] == [
+        "MSG0", "MSG1", "MSG2"
+    ]
+    assert [segment[0] for segment in result[1].segments] == ["msh", "evn", "pid"]
+
+
+def test_iter_mixed_messages():
+    raw = messages(3)
+    data = (raw[0] + "\n").encode("utf-8") + mllp(raw[1]) + raw[2].encode("utf-8")
+
+    result = list(iter_messages(io.BytesIO(data), chunk_size=4, lazy=True))
+
+    assert [str(message.msh.message_control_id) for message in result] == [
+        "MSG0", "MSG1", "MSG2"
+    ]
+    assert result[0].pid.lazy
+
+
+def test_iter_messages_encoding():
+    raw = MESSAGE.format("MSG0").replace("JANE", "JÜRGEN")
+
+    data = b"\x0b" + raw.encode("latin-1") + b"\x1c\r"
+
+    result = list(iter_messages(io.BytesIO(data), encoding="latin-1"))
+
+    assert str(result[0].pid.patient_name[0].given_name) == "JÜRGEN"
+
+
+def test_iter_messages_socket():
+    raw = messages(2)
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        sender.sendall(b"".join(mllp(message) for message in raw))
+        sender.shutdown(socket.SHUT_WR)
+
+        result = list(iter_messages(receiver, chunk_size=16))
+
+    assert len(result) == 2
+
+
+def test_iter_messages_invalid_source():
+    with pytest.raises(TypeError):
+        list(iter_messages("MSH|^~\\&"))
+
+
+def test_incomplete_frame():
+    framer = _MessageFramer()
+
+    assert framer.feed(mllp(messages(1)[0])[:-2]) == []
+
+    with pytest.raises(ValueError):
+        framer.close()
+
+
+def test_stream_parser():
+    raw = messages(3)
+    data = mllp(raw[0]) + (raw[1] + "\r\n").encode("utf-8") + raw[2].encode("utf-8")
+    parser = HL7StreamParser(lazy=True)
+
+    result = []
+    for position in range(0, len(data), 5):
+        result.extend(parser.feed(data[position:position + 5]))
+    # the last message is only complete at the end of the stream
+    assert len(result) == 2
+    result.extend(parser.close())
+
+    assert [str(message.msh.message_control_id) for message in result] == [
+        "MSG0", "MSG1", "MSG2"
+    ]
+    assert result[1].pid.lazy
+
+
+def test_stream_parser_errors():
+    raw = messages(4)
+    raw[1] = raw[1].replace("20240101120000||", "20241301||")
+    data = b"".join(mllp(message) for message in raw)
+
+    parser = HL7StreamParser()
+    # the messages before the invalid one are returned
+    result = parser.feed(data)
+    assert [str(message.msh.message_control_id) for message in result] == ["MSG0"]
+    with pytest.raises(ValueError):
+        parser.feed(b"")
+    # the following messages are kept
+    result = parser.close()
+    assert [str(message.msh.message_control_id) for message in result] == ["MSG2", "MSG3"]
+
+    errors = []
+    result = list(iter_messages(
+        io.BytesIO(data), on_error=lambda message, error: errors.append(message)))
+    assert [str(message.msh.message_control_id) for message in result] == [
+        "MSG0", "MSG2", "MSG3"]
+    assert errors == [raw[1].encode("utf-8")]
+
+    with pytest.raises(ValueError):
+        list(iter_messages(io.BytesIO(mllp(raw[1]))))
+
+
+def test_stream_parser_character_set():
+    raw = MESSAGE.format("MSG0").replace("2.5", "2.5||||||8859/1").replace("JANE", "JÜRGEN")
+
+    result = HL7StreamParser().feed(b"\x0b" + raw.encode("latin-1") + b"\x1c\r")
+
+    assert str(result[0].pid.patient_name[0].given_name) == "JÜRGEN"
+
+
+def test_stream_parser_scans_incrementally():
+    framer = _MessageFramer()
+    segment = b"PID|" + b"X" * 100
+
+    for position in range(0, len(segment), 10):
+        assert framer.feed(segment[position:position + 10]) == []
+        # the partial line was searched up to its end
+        assert framer._scan == len(framer._buffer)
+    assert framer.feed(b"\r") == []
+    assert framer._segments == [segment]
+    assert framer._scan == 0
+
+
+@pytest.mark.parametrize("data", [
+    # unfinished frame
+    mllp(MESSAGE.format("A" * 300))[:-2],
+    # frame
+    mllp(MESSAGE.format("A" * 300)),
+    # unfinished line
+    MESSAGE.format("A" * 300).encode("utf-8"),
+    # message of several lines
+    (MESSAGE.format("A") + "\r" + "NTE|1|" + "A" * 30 + "\r") * 3,
+])
+def test_max_message_size(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    parser = HL7StreamParser(max_message_size=200)
+    assert len(parser.feed(mllp(messages(1)[0]))) == 1
+
+    with pytest.raises(ValueError):
+        for position in range(0, len(data), 64):
+            parser.feed(data[position:position + 64])
+    # the buffered data is discarded
+    assert parser.close() == []
+
+
+def test_iter_messages_max_message_size():
+    data = b"".join(mllp(message) for message in messages(2))
+    assert len(list(iter_messages(io.BytesIO(data), max_message_size=len(data)))) == 2
+    with pytest.raises(ValueError):
+        list(iter_messages(io.BytesIO(data), max_message_size=10))
@@ -0,0 +1,127 @@
+import pytest
+
+from hl7parser.hl7 import HL7Message, get_delimiters
+from hl7parser.hl7_generator import HL7Generator
+from hl7parser.hl7_path import evaluate
+from hl7parser.hl7_tokenizer import FIELD, SEGMENT, TEXT, tokenize
+
+MESSAGE = (
+    "MSH|^~\\&|ADT1|HOSPITAL|LAB||198808181126||ADT^A01^ADT_A01|MSG00001|P|2.7\r"
+    "PID|1||PATID1234^5^M11~123456789^^^USSSA^SS||EVERYMAN^ADAM||19610615|M||"
+    "|&HOME STREET&2^^Greensboro\r"
+    "OBX|1|NM|GLU^Glucose||95|mg/dl\r"
+    "OBX|2|NM|HGB^Hemoglobin||13~14|g/dl\r"
+)
+
+
+def test_tokenize():
+    tokens = tokenize(MESSAGE)
+    assert len(tokens) == 4
+    assert [tokens.segment(position) for position in range(4)] == MESSAGE.split("\r")[:4]
+    assert tokens.positions == {"MSH": [0], "PID": [1], "OBX": [2, 3]}
+    assert tokens.find("OBX") == [2, 3]
+    assert tokens.find("NK1") == []
+    assert tokens.delimiters is get_delimiters()
+
+    # the map of the delimiters has one level per character
+    assert len(tokens.levels) == len(MESSAGE)
+    assert tokens.levels[:4] == bytes([TEXT, TEXT, TEXT, FIELD])
+    assert tokens.levels[MESSAGE.index("\r")] == SEGMENT
+    assert list(tokens.segments[:4]) == [0, MESSAGE.index("\r"), MESSAGE.index("\r") + 1,
+                                         MESSAGE.index("\rOBX")]
+
+
+def test_values():
+    tokens = tokenize(MESSAGE)
+    assert tokens.field(0, 0) == "^~\\&"
+    # the encoding characters aren't split
+    assert tokens.value(0, 0, component=1) == "^~\\&"
+    assert tokens.repetitions(0, 0) == 1
+    assert tokens.field(1, 2) == "PATID1234^5^M11~123456789^^^USSSA^SS"
+    assert tokens.repetitions(1, 2) == 2
+    assert tokens.value(1, 2) == "PATID1234^5^M11"
+    assert tokens.value(1, 2, 1, 3) == "USSSA"
+    assert tokens.value(1, 10, 0, 0, 1) == "HOME STREET"
+    assert tokens.value(1, 10, 0, 0, 5) == ""
+    assert tokens.value(1, 2, 2) == ""
+    assert tokens.value(1, 99) == ""
+    assert tokens.field(1, 99) == ""
+    assert tokens.repetitions(1, 99) == 0
+
+
+@pytest.mark.parametrize("message", [
+    MESSAGE.replace("\r", "\n"),
+    MESSAGE.replace("\r", "\r\n"),
+    MESSAGE.encode("ascii"),
+    bytearray(MESSAGE.replace("\r", "\r\n").encode("ascii")),
+    memoryview(MESSAGE.encode("ascii")),
+])
+def test_line_endings_and_types(message):
+    tokens = tokenize(message)
+    assert len(tokens) == 4
+    assert tokens.segment_type(3) == "OBX"
+    assert tokens.segment(2) == "OBX|1|NM|GLU^Glucose||95|mg/dl"
+    assert tokens.value(3, 4, 1) == "14"
+
+
+def test_encoding():
+    message = MESSAGE.replace("EVERYMAN", "MÜLLER")
+    assert tokenize(message).value(1, 4, component=0) == "MÜLLER"
+    tokens = tokenize(message.encode("latin-1"), encoding="latin-1")
+    assert tokens.value(1, 4, component=0) == "MÜLLER"
+    assert tokens.value(1, 6) == "19610615"
+
+
+@pytest.mark.parametrize("character_set, codec", [
+    ("8859/1", "latin-1"),
+    ("UNICODE UTF-8", "utf-8"),
+])
+def test_character_set(character_set, codec):
+    # the encoding is read from MSH-18 like for HL7Message
+    message = MESSAGE.replace("EVERYMAN", "MÜLLER").replace(
+        "P|2.7", "P|2.7||||||" + character_set)
+    data = message.encode(codec)
+    assert evaluate(data, "PID-5") == "MÜLLER^ADAM"
+    assert evaluate(data, "MSH-18") == character_set
+
+
+def test_multibyte_encoding():
+    message = MESSAGE.replace("EVERYMAN", "MÜLLER")
+    # decoded before scanning it
+    tokens = tokenize(message.encode("utf-16"), encoding="utf-16")
+    assert tokens.value(1, 4, component=0) == "MÜLLER"
+
+
+def test_delimiters():
+    message = MESSAGE.replace("|", "#").replace("^", "@")
+    tokens = tokenize(message)
+    assert tokens.value(2, 2, component=1) == "Glucose"
+    # delimiters may be given for messages without MSH segment
+    tokens = tokenize("PID#1##A@B", get_delimiters("#@~\\&"))
+    assert tokens.value(0, 2, component=1) == "B"
+
+
+def test_empty_lines():
+    tokens = tokenize("MSH|^~\\&|A\r\rPID|1")
+    assert len(tokens) == 3
+    assert tokens.segment(1) == ""
+    assert tokens.segment_type(1) == ""
+    assert tokens.field(1, 0) == ""
+
+
+def test_paths_match_parsed_messages():
+    generator = HL7Generator(
+        seed=18, segments=["EVN", "PID", "PV1", "MRG", "IN1", "OBR"], observations=3,
+        fill_ratio=0.8, max_repeats=3, escape_ratio=0.3,
+    )
+    for raw in generator.messages(20):
+        message = HL7Message(raw, lazy=True)
+        tokens = tokenize(raw)
+        for segment_type in tokens.positions:
+            path = "{0}[*]".format(segment_type)
+            assert evaluate(tokens, path) == evaluate(message, path)
+            assert evaluate(tokens, path) == evaluate(HL7Message(raw), path)
+            for field in range(1, 25):
+                for suffix in ("", ".1", ".2.1", "[*]", "[2].3"):
+                    path = "{0}[*]-{1}{2}".format(segment_type, field, suffix)
+                    assert evaluate(tokens, path) == evaluate(message, path)